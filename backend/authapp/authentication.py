@@ -0,0 +1,22 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from .denylist import is_denied
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """JWT auth for hot endpoints that never touches the users table.
+
+    ``request.user`` is a ``TokenUser`` built from the access token claims
+    (``user_id``, ``email``, ``is_staff``, ``is_superuser``); workspace roles
+    come from :func:`core.utils.workspace_roles`. Revoked/deactivated users
+    are rejected via the cached denylist. Opt in per view with
+    ``authentication_classes = [StatelessJWTAuthentication]``.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if is_denied(validated_token):
+            raise AuthenticationFailed(_("Token has been revoked."), code="token_revoked")
+        return user
@@ -0,0 +1,60 @@
+"""Cache-backed token denylist.
+
+Deactivating a user, changing their password or their staff flags records
+"tokens issued before <now> are revoked" for that user; logging out revokes
+the presented access and refresh tokens by ``jti`` until they expire.
+Stateless authentication honours both with one cache round trip, never a
+user query.
+"""
+import math
+import time
+
+from django.core.cache import cache
+
+# simplejwt's settings are imported on use: authapp.signals loads this module
+# in every process, and importing them drags in DRF and django.test
+
+
+def _key(user_id):
+    return f"jwt:denied-before:{user_id}"
+
+
+def deny_user(user_id):
+    from rest_framework_simplejwt.settings import api_settings
+
+    # refresh tokens are checked too, so keep the entry for their whole lifetime
+    timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    cache.set(_key(user_id), math.ceil(time.time()), timeout)
+
+
+def _token_key(jti):
+    return f"jwt:denied:{jti}"
+
+
+def deny_token(token):
+    """Revoke one token (access or refresh) until it expires."""
+    from rest_framework_simplejwt.settings import api_settings
+
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti is None:
+        return
+    remaining = math.ceil(token.get("exp", 0) - time.time())
+    if remaining > 0:
+        cache.set(_token_key(jti), 1, remaining)
+
+
+def is_denied(token):
+    from rest_framework_simplejwt.settings import api_settings
+
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    if user_id is None:
+        return True
+    keys = [_key(user_id)]
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti is not None:
+        keys.append(_token_key(jti))
+    found = cache.get_many(keys)
+    if jti is not None and _token_key(jti) in found:
+        return True
+    denied_before = found.get(_key(user_id))
+    return denied_before is not None and token.get("iat", 0) < denied_before
@@ -1,5 +1,11 @@
+from dj_rest_auth.jwt_auth import CookieTokenRefreshSerializer
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .denylist import is_denied
 
 
 User = get_user_model()
@@ -33,3 +39,31 @@ class RegisterSerializer(serializers.ModelSerializer):
         workspace = Workspace.objects.create(name=workspace_name, owner=user)
         Membership.objects.create(user=user, workspace=workspace, role=Membership.OWNER)
         return user
+
+
+class WorkspaceTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Adds the claims ``StatelessJWTAuthentication`` exposes on ``TokenUser``."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["email"] = user.email
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        return token
+
+
+class DenylistRefreshMixin:
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if is_denied(RefreshToken(attrs["refresh"])):
+            raise InvalidToken("Token has been revoked.")
+        return data
+
+
+class DenylistTokenRefreshSerializer(DenylistRefreshMixin, TokenRefreshSerializer):
+    pass
+
+
+class DenylistCookieTokenRefreshSerializer(DenylistRefreshMixin, CookieTokenRefreshSerializer):
+    pass
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .denylist import deny_user
+
+User = get_user_model()
+
+CLAIM_FIELDS = {"is_staff", "is_superuser"}
+
+
+@receiver(pre_save, sender=User)
+def flag_token_revocation(sender, instance, update_fields=None, **kwargs):
+    instance._revoke_tokens = False
+    if instance.pk is None:
+        return
+    if not instance.is_active or instance._password is not None:
+        instance._revoke_tokens = True
+        return
+    if update_fields is not None and not CLAIM_FIELDS & set(update_fields):
+        return  # e.g. last_login updates on every login
+    old = User.objects.filter(pk=instance.pk).values("is_staff", "is_superuser").first()
+    if old and (old["is_staff"], old["is_superuser"]) != (instance.is_staff, instance.is_superuser):
+        instance._revoke_tokens = True
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens(sender, instance, created, **kwargs):
+    if getattr(instance, "_revoke_tokens", False):
+        deny_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    deny_user(instance.pk)
@@ -1,3 +1,68 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import Membership, Workspace
+from users.models import User
+
+from .denylist import is_denied
+from .serializers import WorkspaceTokenObtainPairSerializer
+
+
+class StatelessAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="stateless@example.com", password="secret-pass-1")
+        self.workspace = Workspace.objects.create(name="Token shop", owner=self.user)
+        Membership.objects.create(user=self.user, workspace=self.workspace, role=Membership.OWNER)
+
+    def tokens(self):
+        refresh = WorkspaceTokenObtainPairSerializer.get_token(self.user)
+        return refresh, refresh.access_token
+
+    def get(self, access):
+        client = APIClient(HTTP_AUTHORIZATION=f"Bearer {access}", HTTP_X_WORKSPACE_ID=str(self.workspace.pk))
+        return client.get("/api/orders/")
+
+    def refresh(self, refresh):
+        return APIClient().post("/api/auth/token/refresh/", {"refresh": str(refresh)}, format="json")
+
+    def test_valid_token_never_reads_the_users_table(self):
+        _, access = self.tokens()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(access).status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if User._meta.db_table in q["sql"]])
+
+    def test_password_change_revokes_earlier_tokens(self):
+        refresh, access = self.tokens()
+        self.user.set_password("secret-pass-2")
+        self.user.save()
+        self.assertEqual(self.get(access).status_code, 401)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_tokens_issued_before_the_cutoff_are_rejected(self):
+        # a revocation recorded a minute ago
+        cutoff = int(time.time()) - 60
+        cache.set(f"jwt:denied-before:{self.user.pk}", cutoff)
+        _, older = self.tokens()
+        older["iat"] = cutoff - 1
+        self.assertTrue(is_denied(older))
+        self.assertEqual(self.get(older).status_code, 401)
+        # a token issued after the cutoff (a new login) is accepted
+        _, newer = self.tokens()
+        self.assertFalse(is_denied(newer))
+        self.assertEqual(self.get(newer).status_code, 200)
 
-# Create your tests here.
+    def test_logout_revokes_the_tokens_it_was_given(self):
+        refresh, access = self.tokens()
+        _, other_session = self.tokens()
+        client = APIClient(HTTP_AUTHORIZATION=f"Bearer {access}")
+        response = client.post("/api/auth/logout/", {"refresh": str(refresh)}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(access).status_code, 401)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+        self.assertEqual(self.get(other_session).status_code, 200)
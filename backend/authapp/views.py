@@ -1,9 +1,41 @@
 from django.shortcuts import render
 
 # Create your views here.
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from dj_rest_auth.jwt_auth import get_refresh_view
+from dj_rest_auth.views import LogoutView
 from rest_framework import generics, permissions
-from .serializers import RegisterSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import StatelessJWTAuthentication
+from .denylist import deny_token
+from .serializers import DenylistCookieTokenRefreshSerializer, RegisterSerializer
 
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+
+
+class DenylistTokenRefreshView(get_refresh_view()):
+    """dj-rest-auth's refresh view, refusing refresh tokens of revoked users."""
+    serializer_class = DenylistCookieTokenRefreshSerializer
+
+
+class DenylistLogoutView(LogoutView):
+    """dj-rest-auth's logout, also revoking the access token used and the refresh token sent."""
+    authentication_classes = [StatelessJWTAuthentication]
+
+    def logout(self, request):
+        if request.auth is not None:
+            deny_token(request.auth)
+        raw = request.data.get("refresh") or request.COOKIES.get(rest_auth_settings.JWT_AUTH_REFRESH_COOKIE or "")
+        if raw:
+            try:
+                deny_token(RefreshToken(raw))
+            except TokenError:
+                pass  # expired or invalid: nothing left to revoke
+        response = super().logout(request)
+        if response.status_code == 200:
+            response.data = {"detail": "Successfully logged out."}
+        return response
@@ -12,5 +12,15 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# no per-thread persistent connections under ASGI (see core.dbpool)
+os.environ.setdefault('SERVER_INTERFACE', 'asgi')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402  (needs the app loaded)
+
+if settings.DEBUG:
+    # runserver used to serve the admin's static files; keep that under uvicorn
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
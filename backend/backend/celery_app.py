@@ -1,7 +1,52 @@
 import os
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_process_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 app = Celery("backend")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@task_prerun.connect
+def reset_db_routing(**kwargs):
+    # each task starts unpinned; writes inside it pin reads to the primary
+    from core.db_routers import reset_routing
+
+    reset_routing()
+
+
+@task_prerun.connect
+def start_task_metrics(task_id=None, task=None, **kwargs):
+    from core import metrics
+
+    metrics.task_started(task_id, task)
+
+
+@task_postrun.connect
+def record_task_metrics(task_id=None, task=None, state=None, **kwargs):
+    from core import metrics
+
+    metrics.task_finished(task_id, task, state)
+
+
+@task_prerun.connect
+def start_task_profile(task_id=None, task=None, **kwargs):
+    from core import profiling
+
+    profiling.task_started(task_id, task)
+
+
+@task_postrun.connect
+def finish_task_profile(task_id=None, task=None, state=None, **kwargs):
+    from core import profiling
+
+    profiling.task_finished(task_id, task, state)
+
+
+@worker_process_init.connect
+def reset_db_connections(**kwargs):
+    # prefork children must not reuse the parent's sockets or pool threads
+    from core.dbpool import reset_after_fork
+
+    reset_after_fork()
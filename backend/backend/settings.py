@@ -7,6 +7,10 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
+from core.dbpool import configure as configure_connections
+
 # Paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -61,6 +65,7 @@ INSTALLED_APPS = [
     
     "orders.apps.OrdersConfig",
     "production.apps.ProductionConfig",
+    "integrations.apps.IntegrationsConfig",
 
 
 ]
@@ -92,17 +97,44 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "3dprintflow@example.com")
 
 # Middleware
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",       # outermost, so it times everything below
+    "core.middleware.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",   # keep CORS high in the list
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.WorkspaceMiddleware",
+    "core.middleware.ReplicaPinMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Metrics (core.metrics, scraped at /metrics): a directory shared by all web
+# and Celery worker processes lets one scrape cover all of them
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# flag a request / task running the same SQL more often than this
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", "10"))
+
+# Profiling (core.profiling): off unless PROFILING_DIR is set. Requests are
+# profiled at PROFILING_SAMPLE_RATE, when they send "X-Profile: $PROFILING_TOKEN"
+# or target one of PROFILING_WORKSPACES; tasks at PROFILING_TASK_SAMPLE_RATE
+# or when listed in PROFILING_TASKS
+PROFILING_DIR = os.getenv("PROFILING_DIR") or None
+PROFILING_MODE = os.getenv("PROFILING_MODE", "sample")  # sample | cprofile
+if PROFILING_MODE not in ("sample", "cprofile"):
+    raise ImproperlyConfigured("PROFILING_MODE must be 'sample' or 'cprofile'")
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_WORKSPACES = [w.strip() for w in os.getenv("PROFILING_WORKSPACES", "").split(",") if w.strip()]
+PROFILING_TASK_SAMPLE_RATE = float(os.getenv("PROFILING_TASK_SAMPLE_RATE", "0"))
+PROFILING_TASKS = [t.strip() for t in os.getenv("PROFILING_TASKS", "").split(",") if t.strip()]
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -128,21 +160,135 @@ WSGI_APPLICATION = "backend.wsgi.application"
 if os.getenv("POSTGRES_HOST"):
     DATABASES = {
         "default": {
-            "ENGINE": "django.db.backends.postgresql",
+            # Django's backends plus connect metrics (core.dbpool)
+            "ENGINE": "core.backends.postgresql",
             "NAME": os.getenv("POSTGRES_DB", "app"),
             "USER": os.getenv("POSTGRES_USER", "app"),
             "PASSWORD": os.getenv("POSTGRES_PASSWORD", "app"),
             "HOST": os.getenv("POSTGRES_HOST", "db"),
             "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            "OPTIONS": {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5"))},
         }
     }
+    for i, host in enumerate(h for h in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",") if h):
+        DATABASES[f"replica_{i}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "TEST": {"MIRROR": "default"},
+        }
 else:
     DATABASES = {
         "default": {
-            "ENGINE": "django.db.backends.sqlite3",
+            "ENGINE": "core.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+        },
+        # stand-in replica (same file) so replica routing can be exercised locally
+        "replica": {
+            "ENGINE": "core.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        },
+        # stand-in shard (in memory, so nothing is written locally) for the
+        # sharding tests; real shards are listed in WORKSPACE_SHARDS
+        "shard": {
+            "ENGINE": "core.backends.sqlite3",
+            "NAME": ":memory:",
+        },
+    }
+
+# Workspace shards (routed by core.sharding.TenantRouter): "alias=host" pairs,
+# or plain aliases with SQLite (one file per shard)
+WORKSPACE_SHARDS = []
+for _spec in filter(None, os.getenv("WORKSPACE_SHARDS", "").split(",")):
+    _alias, _, _host = _spec.partition("=")
+    if DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+        DATABASES[_alias] = {
+            "ENGINE": "core.backends.sqlite3",
+            "NAME": BASE_DIR / f"db_{_alias}.sqlite3",
+        }
+    else:
+        DATABASES[_alias] = {**DATABASES["default"], "HOST": _host or DATABASES["default"]["HOST"]}
+    WORKSPACE_SHARDS.append(_alias)
+
+# Connection reuse (see core.dbpool): "persistent" keeps one health-checked
+# connection per thread for DB_CONN_MAX_AGE seconds (WSGI / Celery prefork),
+# "pool" uses a psycopg 3 pool per process (needs psycopg[pool]; use it under
+# ASGI, where per-thread connections would pile up), "none" reconnects per
+# request; pool falls back to persistent on SQLite or without psycopg_pool,
+# and under ASGI (SERVER_INTERFACE=asgi, set by backend/asgi.py) persistent
+# means pool where available (else it stays persistent, with a warning)
+DB_CONN_MODE = configure_connections(
+    DATABASES, os.getenv("DB_CONN_MODE", "persistent"), asgi=os.getenv("SERVER_INTERFACE") == "asgi"
+)
+
+# Read replicas (routed by core.db_routers.ReplicaRouter); the local SQLite
+# stand-in is only used when READ_REPLICAS=replica is set explicitly
+READ_REPLICAS = [
+    a for a in os.getenv("READ_REPLICAS", "").split(",") if a
+] or [a for a in DATABASES if a.startswith("replica_")]
+# after a write, the client keeps reading from the primary this long
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+DATABASE_ROUTERS = ["core.sharding.TenantRouter", "core.db_routers.ReplicaRouter"]
+
+# Cache (Redis in docker-compose; per-process memory when not configured)
+if os.getenv("CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL"),
         }
     }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Order numbers for orders created without one (orders.numbering); a
+# workspace's OrderNumberSequence.number_format overrides the pattern
+ORDER_NUMBER_FORMAT = os.getenv("ORDER_NUMBER_FORMAT", "ORD-{number:06d}")
+ORDER_NUMBER_START = int(os.getenv("ORDER_NUMBER_START", "1"))
+
+# Invoice PDFs (orders.invoices), stored by content digest under this
+# directory of the default storage; one Celery message renders a chunk
+INVOICE_STORAGE_DIR = os.getenv("INVOICE_STORAGE_DIR", "invoices")
+INVOICE_CHUNK_SIZE = int(os.getenv("INVOICE_CHUNK_SIZE", "50"))
+
+# Admin (core.admin_performance)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ADMIN_ESTIMATED_COUNT_THRESHOLD", "50000"))  # rows, PostgreSQL only
+ADMIN_FILTER_CACHE_TIMEOUT = int(os.getenv("ADMIN_FILTER_CACHE_TIMEOUT", "300"))  # filter sidebar choices
+ADMIN_INLINE_MAX_ROWS = int(os.getenv("ADMIN_INLINE_MAX_ROWS", "20"))
+
+# bulk create endpoints (core.api.BulkCreateView) take at most this many items per request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+# polled API listings are cached per workspace version (core.response_cache);
+# entries are never stale, the timeout only bounds memory
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", "600"))
+# the floor dashboard (production.dashboard) is recomputed at most this often per workspace
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "15"))
+
+# Printer agents and long-polls (production.agent, async views)
+AGENT_POLL_INTERVAL = int(os.getenv("AGENT_POLL_INTERVAL", "10"))  # seconds between agent check-ins
+AGENT_TELEMETRY_MAX_SAMPLES = int(os.getenv("AGENT_TELEMETRY_MAX_SAMPLES", "500"))
+TELEMETRY_RETENTION_DAYS = int(os.getenv("TELEMETRY_RETENTION_DAYS", "7"))
+
+# Filament stock (production.stock): rebuilds start from the latest checkpoint;
+# older transactions move to compressed archive blocks
+FILAMENT_CHECKPOINT_EVERY = int(os.getenv("FILAMENT_CHECKPOINT_EVERY", "500"))  # transactions per spool
+FILAMENT_ARCHIVE_MONTHS = int(os.getenv("FILAMENT_ARCHIVE_MONTHS", "12"))
+LONGPOLL_MAX_WAIT = float(os.getenv("LONGPOLL_MAX_WAIT", "30"))
+LONGPOLL_TICK = float(os.getenv("LONGPOLL_TICK", "0.5"))  # how often a waiting long-poll checks the cache
+
+# Event streams (core.events, served by production.agent.event_stream): Redis
+# pub/sub when a URL is set (the cache's Redis by default), else in-process
+EVENTS_BROKER_URL = os.getenv("EVENTS_BROKER_URL", os.getenv("CACHE_URL", ""))
+EVENTS_COALESCE_WINDOW = float(os.getenv("EVENTS_COALESCE_WINDOW", "0.25"))  # seconds a burst is merged
+EVENTS_MAX_PENDING = int(os.getenv("EVENTS_MAX_PENDING", "1000"))  # per stream, then the client resyncs
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "20"))  # keeps proxies from closing idle streams
+# streams end after this long so clients reconnect with a fresh access token
+EVENTS_STREAM_MAX_AGE = float(os.getenv("EVENTS_STREAM_MAX_AGE", "300"))
 
 # Auth / DRF / JWT
 REST_FRAMEWORK = {
@@ -159,6 +305,7 @@ REST_AUTH = {
     "USE_JWT": True,
     "JWT_AUTH_RETURN_EXPIRATION": True,
     "REGISTER_SERIALIZER": "users.serializers.WorkspaceRegisterSerializer",
+    "JWT_TOKEN_CLAIMS_SERIALIZER": "authapp.serializers.WorkspaceTokenObtainPairSerializer",
 }
 REST_AUTH_TOKEN_MODEL = None
 SIMPLE_JWT = {
@@ -169,6 +316,9 @@ SIMPLE_JWT = {
         days=int(os.getenv("REFRESH_TOKEN_LIFETIME_DAYS", "7"))
     ),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # claims used by authapp.authentication.StatelessJWTAuthentication
+    "TOKEN_OBTAIN_SERIALIZER": "authapp.serializers.WorkspaceTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "authapp.serializers.DenylistTokenRefreshSerializer",
 }
 
 SOCIALACCOUNT_PROVIDERS = {
@@ -211,3 +361,53 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Celery (Redis in docker-compose)
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/1")
+CELERY_BEAT_SCHEDULE = {
+    "resume-stalled-task-runs": {
+        "task": "integrations.tasks.resume_stalled_runs",
+        "schedule": 600.0,
+    },
+    "sync-marketplaces": {
+        "task": "integrations.tasks.sync_marketplaces",
+        "schedule": float(os.getenv("MARKETPLACE_SYNC_INTERVAL", "300")),
+    },
+    "drain-webhooks": {
+        "task": "integrations.tasks.drain_webhooks",
+        "schedule": float(os.getenv("WEBHOOK_DRAIN_INTERVAL", "5")),
+    },
+    "prune-webhook-inbox": {
+        "task": "integrations.tasks.prune_webhook_inbox",
+        "schedule": 3600.0,
+    },
+    "prune-printer-telemetry": {
+        "task": "production.tasks.prune_printer_telemetry",
+        "schedule": 3600.0,
+    },
+    "compact-filament-transactions": {
+        "task": "production.tasks.compact_filament_transactions",
+        "schedule": 86400.0,
+    },
+    "relay-outbox": {
+        "task": "integrations.tasks.relay_outbox",
+        "schedule": float(os.getenv("OUTBOX_RELAY_INTERVAL", "2")),
+    },
+    "prune-outbox": {
+        "task": "integrations.tasks.prune_outbox",
+        "schedule": 3600.0,
+    },
+}
+# processed / duplicate webhook deliveries are kept this long
+WEBHOOK_RETENTION_DAYS = int(os.getenv("WEBHOOK_RETENTION_DAYS", "14"))
+# syncs that fail a record before it is parked and the watermark moves past it
+SYNC_MAX_ATTEMPTS = int(os.getenv("SYNC_MAX_ATTEMPTS", "5"))
+
+# Transactional outbox (integrations.outbox)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))  # events per webhook POST / XADD round
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))  # then the delivery is dead-lettered
+OUTBOX_RETRY_BACKOFF = int(os.getenv("OUTBOX_RETRY_BACKOFF", "5"))  # seconds, doubled per attempt
+OUTBOX_RETRY_BACKOFF_MAX = int(os.getenv("OUTBOX_RETRY_BACKOFF_MAX", "3600"))
+OUTBOX_HTTP_TIMEOUT = float(os.getenv("OUTBOX_HTTP_TIMEOUT", "10"))
+OUTBOX_HTTP_POOL_SIZE = int(os.getenv("OUTBOX_HTTP_POOL_SIZE", "10"))  # kept-alive connections per host
+OUTBOX_REDIS_URL = os.getenv("OUTBOX_REDIS_URL", os.getenv("CACHE_URL", ""))
+OUTBOX_STREAM_MAXLEN = int(os.getenv("OUTBOX_STREAM_MAXLEN", "100000"))  # approximate trim of Redis streams
+# delivered events are kept this long; dead letters until retried or deleted
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
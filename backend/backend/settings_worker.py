@@ -0,0 +1,38 @@
+"""
+Lean settings for processes that never serve HTTP: the Celery worker and
+beat, and batch management commands (``--settings=backend.settings_worker``).
+
+Same configuration as ``backend.settings`` minus the web-only apps (admin,
+allauth / Google login, dj_rest_auth, CORS, sessions, messages, static
+files) and all middleware, so a worker neither imports nor initialises
+them. Measure the difference with ``python manage.py importtime_report``.
+
+Rows of the dropped apps are unknown to the ORM here: deleting a user from
+a worker would not cascade to its login tokens, e-mail addresses or admin
+log entries (the database refuses instead). User deletion belongs in the
+web process or the admin.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS
+
+WEB_ONLY_APPS = {
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "django.contrib.sites",
+    "corsheaders",
+    "rest_framework",
+    "rest_framework.authtoken",
+    "dj_rest_auth",
+    "dj_rest_auth.registration",
+    "allauth",
+    "allauth.account",
+    "allauth.socialaccount",
+    "allauth.socialaccount.providers.google",
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]
+MIDDLEWARE = []
+ROOT_URLCONF = "backend.urls_worker"
+AUTHENTICATION_BACKENDS = ("django.contrib.auth.backends.ModelBackend",)
@@ -2,7 +2,10 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.http import JsonResponse
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from authapp.views import DenylistLogoutView, DenylistTokenRefreshView
+from core.views import metrics_view
 
 def root(_request):
     return JsonResponse({
@@ -15,10 +18,19 @@ def root(_request):
 urlpatterns = [
     path("", root, name="root"),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
+    # shadows dj_rest_auth's token/refresh so revoked users cannot mint new access tokens
+    re_path(r"^api/auth/token/refresh/?$", DenylistTokenRefreshView.as_view(), name="token_refresh"),
+    # shadows dj_rest_auth's logout so the tokens used are revoked server side
+    path("api/auth/logout/", DenylistLogoutView.as_view(), name="rest_logout"),
     path("api/auth/", include("dj_rest_auth.urls")),
     path("api/auth/registration/", include("dj_rest_auth.registration.urls")),
     path("api/auth/legacy/", include("authapp.urls")),
     path("accounts/", include("allauth.urls")),
+    path("api/ops/", include("core.urls")),
+    path("api/integrations/", include("integrations.urls")),
+    path("api/", include("orders.urls")),
+    path("api/", include("production.urls")),
 ]
 
 if settings.DEBUG:
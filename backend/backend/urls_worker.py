@@ -0,0 +1,2 @@
+"""URLconf of ``backend.settings_worker``: workers serve no HTTP and reverse no URLs."""
+urlpatterns = []
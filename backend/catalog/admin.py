@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Color, Material, Product, ProductDocument, ProductType
+from core.admin_performance import BoundedInlineMixin, FastAdminMixin
+
+from .models import Color, MeshAnalysis, Material, Product, ProductDocument, ProductType
 
 @admin.register(ProductType)
 class ProductTypeAdmin(admin.ModelAdmin):
@@ -8,28 +10,29 @@ class ProductTypeAdmin(admin.ModelAdmin):
     search_fields = ("type_name",)
 
 @admin.register(Material)
-class MaterialAdmin(admin.ModelAdmin):
+class MaterialAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("material_name", "material_code", "is_available", "cost_per_kg", "density", "workspace", "created_at")
     list_filter = ("is_available", "workspace")
     search_fields = ("material_name", "material_code")
     autocomplete_fields = ("workspace",)
 
 @admin.register(Color)
-class ColorAdmin(admin.ModelAdmin):
+class ColorAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("color_name", "color_code", "hex_value", "is_available", "workspace", "created_at")
     list_filter = ("is_available", "workspace")
     search_fields = ("color_name", "color_code", "hex_value")
     autocomplete_fields = ("workspace",)
 
-class ProductDocumentInline(admin.TabularInline):
+class ProductDocumentInline(BoundedInlineMixin, admin.TabularInline):
     model = ProductDocument
+    ordering = ("-uploaded_at", "-pk")
     extra = 1
     fields = ("kind", "version", "file", "is_primary", "size", "checksum", "uploaded_at")
     readonly_fields = ("size", "checksum", "uploaded_at")
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("title", "sku", "ean", "product_type", "price", "is_personalized", "workspace", "updated_at")
     list_filter = ("product_type", "is_personalized", "workspace")
     search_fields = ("title", "sku", "ean")
@@ -39,7 +42,27 @@ class ProductAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductDocument)
-class ProductDocumentAdmin(admin.ModelAdmin):
+class ProductDocumentAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("product", "kind", "version", "is_primary", "size", "uploaded_at")
     list_filter = ("kind", "is_primary")
     search_fields = ("product__title", "version", "checksum")
+    readonly_fields = ("size", "checksum", "mesh_summary")
+
+    @admin.display(description="Mesh")
+    def mesh_summary(self, obj):
+        from .mesh import MeshError
+
+        try:
+            analysis = obj.analyze() if obj and obj.pk else None
+        except MeshError as exc:
+            return f"Could not analyse this file: {exc}"
+        if analysis is None:
+            return "-"
+        return f"{analysis} · {analysis.triangle_count} triangles · {analysis.volume_cm3:.2f} cm³"
+
+
+@admin.register(MeshAnalysis)
+class MeshAnalysisAdmin(admin.ModelAdmin):
+    list_display = ("checksum", "file_format", "triangle_count", "volume_mm3", "size_x_mm", "size_y_mm", "size_z_mm", "analyzed_at")
+    list_filter = ("file_format",)
+    search_fields = ("checksum",)
@@ -0,0 +1,256 @@
+"""Streaming catalog import (products, materials, colors).
+
+Rows are read lazily from CSV or JSON Lines, validated a chunk at a time and
+upserted with ``bulk_create(update_conflicts=True)`` on each model's natural
+key, so memory stays bounded by ``chunk_size`` no matter how big the file is.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from core.response_cache import bump_resource_version
+
+from .models import Color, Material, Product, ProductType
+
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+FALSE_VALUES = {"0", "false", "no", "n", "f", ""}
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    model: type
+    key: str                 # natural key column, unique together with workspace
+    columns: tuple           # accepted columns besides the key
+    required: tuple = ()
+
+
+SPECS = {
+    "products": ImportSpec(
+        model=Product,
+        key="sku",
+        columns=(
+            "title", "ean", "description", "price", "billbee_id",
+            "is_personalized", "assembly_time_minutes", "product_type",
+        ),
+        required=("title",),
+    ),
+    "materials": ImportSpec(
+        model=Material,
+        key="material_name",
+        columns=("material_code", "cost_per_kg", "density", "is_available"),
+    ),
+    "colors": ImportSpec(
+        model=Color,
+        key="color_name",
+        columns=("color_code", "hex_value", "is_available"),
+    ),
+}
+
+
+@dataclass
+class RowError:
+    line: int
+    key: str
+    errors: dict
+
+    def as_dict(self):
+        return {"line": self.line, "key": self.key, "errors": self.errors}
+
+
+@dataclass
+class ImportReport:
+    kind: str
+    rows: int = 0
+    upserted: int = 0
+    unchanged: int = 0  # already present, nothing to update (key-only rows)
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    max_errors: int = 1000
+
+    def add_error(self, line, key, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(RowError(line, key or "", errors))
+
+    def as_dict(self):
+        return {
+            "kind": self.kind,
+            "rows": self.rows,
+            "upserted": self.upserted,
+            "unchanged": self.unchanged,
+            "error_count": self.error_count,
+            "errors": [e.as_dict() for e in self.errors],
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def iter_rows(stream, fmt):
+    """Yield ``(line_number, dict)`` pairs from a text stream without reading it all."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt in ("jsonl", "ndjson", "json"):
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_no, exc
+                continue
+            yield line_no, row
+    else:
+        raise ValueError(f"Unsupported import format: {fmt!r}")
+
+
+class CatalogImporter:
+    """Validate and upsert one kind of catalog row for a single workspace."""
+
+    def __init__(self, workspace, kind, chunk_size=1000, max_errors=1000):
+        if kind not in SPECS:
+            raise ValueError(f"Unknown catalog kind {kind!r}; expected one of {sorted(SPECS)}")
+        self.workspace = workspace
+        self.kind = kind
+        self.spec = SPECS[kind]
+        self.chunk_size = chunk_size
+        self.report = ImportReport(kind=kind, max_errors=max_errors)
+        self._product_types = None
+
+    # ---- public API ----
+
+    def run(self, stream, fmt="csv"):
+        if isinstance(stream, (bytes, bytearray)):
+            stream = io.StringIO(stream.decode("utf-8-sig"))
+        rows = iter_rows(stream, fmt)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+        if self.report.upserted:
+            # bulk upserts send no signals: invalidate listings showing catalog fields
+            bump_resource_version(self.workspace.pk, "catalog")
+        return self.report
+
+    # ---- internals ----
+
+    def _import_chunk(self, chunk):
+        by_key = {}
+        for line_no, raw in chunk:
+            self.report.rows += 1
+            if isinstance(raw, Exception):
+                self.report.add_error(line_no, "", {"__all__": [f"Invalid JSON: {raw}"]})
+                continue
+            if not isinstance(raw, dict):
+                self.report.add_error(line_no, "", {"__all__": ["Expected an object with named columns."]})
+                continue
+            key = raw.get(self.spec.key)
+            # JSON may carry SKUs / EANs as numbers
+            key = "" if key is None else str(key).strip()
+            try:
+                values = self._validate(raw, key)
+            except ValidationError as exc:
+                self.report.add_error(line_no, key, exc.message_dict)
+                continue
+            # the same key twice in one chunk would hit the row twice in a
+            # single ON CONFLICT statement; merge them, later columns win
+            if key in by_key:
+                values = {**by_key[key][1], **values}
+            by_key[key] = (line_no, values)
+
+        groups = {}
+        for line_no, values in by_key.values():
+            groups.setdefault(tuple(sorted(values)), []).append((line_no, values))
+        for fields, members in groups.items():
+            self._upsert(fields, members)
+
+    def _validate(self, raw, key):
+        errors = {}
+        if not key:
+            errors[self.spec.key] = ["This field is required."]
+        values = {self.spec.key: key}
+        for column in self.spec.columns:
+            if column not in raw or raw[column] is None:
+                continue
+            value = raw[column]
+            try:
+                values.update(self._clean_column(column, value))
+            except ValidationError as exc:
+                errors[column] = exc.messages
+        for column in self.spec.required:
+            if not values.get(column) and column not in errors:
+                errors[column] = ["This field is required."]
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def _clean_column(self, column, value):
+        if column == "product_type":
+            name = str(value).strip()
+            if not name:
+                return {"product_type_id": None}
+            try:
+                return {"product_type_id": self.product_types[name]}
+            except KeyError:
+                raise ValidationError(f"Unknown product type {name!r}.")
+
+        model_field = self.spec.model._meta.get_field(column)
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, float):
+            value = str(value)  # keep JSON numbers exact for DecimalField
+        if model_field.get_internal_type() == "BooleanField" and isinstance(value, str):
+            lowered = value.lower()
+            if lowered not in TRUE_VALUES | FALSE_VALUES:
+                raise ValidationError(f"{value!r} is not a boolean.")
+            value = lowered in TRUE_VALUES
+        elif value == "" and model_field.null:
+            value = None
+        return {column: model_field.clean(value, None)}
+
+    @property
+    def product_types(self):
+        if self._product_types is None:
+            self._product_types = dict(ProductType.objects.values_list("type_name", "type_id"))
+        return self._product_types
+
+    def _upsert(self, fields, members):
+        model = self.spec.model
+        objs = [model(workspace=self.workspace, **values) for _, values in members]
+        update_fields = [f for f in fields if f != self.spec.key]
+        if model is Product:
+            update_fields.append("updated_at")
+        if update_fields:
+            kwargs = {
+                "update_conflicts": True,
+                "unique_fields": ["workspace", self.spec.key],
+                "update_fields": update_fields,
+            }
+        else:
+            kwargs = {"ignore_conflicts": True}
+        existing = 0
+        try:
+            with transaction.atomic():
+                if not update_fields:
+                    # ignore_conflicts skips these silently; count them as unchanged
+                    existing = model.objects.filter(
+                        workspace=self.workspace, **{f"{self.spec.key}__in": [values[self.spec.key] for _, values in members]}
+                    ).count()
+                model.objects.bulk_create(objs, batch_size=self.chunk_size, **kwargs)
+        except DatabaseError as exc:
+            for line_no, values in members:
+                self.report.add_error(line_no, values[self.spec.key], {"__all__": [str(exc)]})
+            return
+        self.report.upserted += len(objs) - existing
+        self.report.unchanged += existing
+
+
+def import_catalog(workspace, kind, stream, fmt="csv", **options):
+    return CatalogImporter(workspace, kind, **options).run(stream, fmt)
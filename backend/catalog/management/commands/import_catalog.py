@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importers import SPECS, import_catalog
+from core.models import Workspace
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV / JSON Lines file of products, materials or colors into a workspace (upsert)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("workspace", help="Workspace id or name")
+        parser.add_argument("kind", choices=sorted(SPECS))
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--report", help="Write the full JSON report to this path")
+
+    def handle(self, *args, **opts):
+        workspace = self._workspace(opts["workspace"])
+        path = Path(opts["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        fmt = opts["format"] or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+
+        with path.open(encoding="utf-8-sig", newline="") as fh:
+            report = import_catalog(workspace, opts["kind"], fh, fmt, chunk_size=opts["chunk_size"])
+
+        data = report.as_dict()
+        if opts["report"]:
+            Path(opts["report"]).write_text(json.dumps(data, indent=2))
+        for err in data["errors"][:20]:
+            self.stderr.write(f"line {err['line']} ({err['key'] or '-'}): {err['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.kind}: {report.rows} rows, {report.upserted} upserted, "
+            f"{report.unchanged} unchanged, {report.error_count} errors"
+        ))
+
+    def _workspace(self, value):
+        lookup = {"pk": value} if value.isdigit() else {"name": value}
+        try:
+            return Workspace.objects.get(**lookup)
+        except Workspace.DoesNotExist:
+            raise CommandError(f"Workspace {value!r} not found")
@@ -0,0 +1,306 @@
+"""Mesh analysis for STL (binary + ASCII) and 3MF models.
+
+Everything is computed with vectorised NumPy over fixed-size chunks of
+triangles; binary STL files on disk are memory-mapped so a multi-million
+triangle model never has to be copied into Python objects.
+"""
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from xml.etree import ElementTree
+
+import numpy as np
+
+CHUNK_TRIANGLES = 1 << 18
+
+STL_HEADER = 84
+STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("v", "<f4", (3, 3)), ("attr", "<u2")])
+
+NS_3MF = "{http://schemas.microsoft.com/3dmanufacturing/core/2015/02}"
+UNIT_TO_MM = {
+    "micron": 0.001,
+    "millimeter": 1.0,
+    "centimeter": 10.0,
+    "inch": 25.4,
+    "foot": 304.8,
+    "meter": 1000.0,
+}
+
+_ASCII_VERTEX = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+class MeshError(ValueError):
+    pass
+
+
+@dataclass
+class MeshStats:
+    file_format: str
+    triangle_count: int
+    volume_mm3: float
+    surface_area_mm2: float
+    bbox_min: tuple
+    bbox_max: tuple
+
+    @property
+    def size(self):
+        return tuple(hi - lo for lo, hi in zip(self.bbox_min, self.bbox_max))
+
+
+def _cross(a, b):
+    # np.cross is noticeably slower than spelling it out on (n, 3) arrays
+    out = np.empty_like(a)
+    out[:, 0] = a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1]
+    out[:, 1] = a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2]
+    out[:, 2] = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    return out
+
+
+class _Accumulator:
+    """Running totals over batches of triangles shaped ``(n, 3, 3)``."""
+
+    def __init__(self):
+        self.count = 0
+        self.volume = 0.0
+        self.area = 0.0
+        self.origin = None
+        self.lo = np.full(3, np.inf)
+        self.hi = np.full(3, -np.inf)
+
+    def add(self, tris):
+        if not len(tris):
+            return
+        # STL stores float32; keep per-triangle math in float32 and only
+        # accumulate the sums in float64
+        tris = np.ascontiguousarray(tris, dtype=np.float32)
+        if self.origin is None:
+            self.origin = tris[0, 0].copy()
+        v0, v1, v2 = tris[:, 0], tris[:, 1], tris[:, 2]
+        e1, e2 = v1 - v0, v2 - v0
+        normal = _cross(e1, e2)
+        self.area += float(np.sqrt(np.einsum("ij,ij->i", normal, normal)).sum(dtype=np.float64)) / 2.0
+        # signed tetrahedron volumes against a fixed reference point inside the
+        # model's coordinate range (divergence theorem); keeps float32 precise
+        # for meshes placed far from the origin
+        self.volume += float(np.einsum("ij,ij->i", v0 - self.origin, normal).sum(dtype=np.float64)) / 6.0
+        self.lo = np.minimum(self.lo, tris.min(axis=(0, 1)))
+        self.hi = np.maximum(self.hi, tris.max(axis=(0, 1)))
+        self.count += len(tris)
+
+    def result(self, file_format, scale=1.0):
+        if not self.count:
+            raise MeshError("Mesh contains no triangles.")
+        return MeshStats(
+            file_format=file_format,
+            triangle_count=self.count,
+            volume_mm3=abs(self.volume) * scale ** 3,
+            surface_area_mm2=self.area * scale ** 2,
+            bbox_min=tuple(float(v) * scale for v in self.lo),
+            bbox_max=tuple(float(v) * scale for v in self.hi),
+        )
+
+
+# ---- STL ----
+
+def _binary_stl_records(source, size):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        count = int(np.frombuffer(source, "<u4", count=1, offset=80)[0])
+        return np.frombuffer(source, STL_RECORD, count=count, offset=STL_HEADER)
+    with open(source, "rb") as fh:
+        fh.seek(80)
+        count = int(np.frombuffer(fh.read(4), "<u4")[0])
+    if STL_HEADER + count * STL_RECORD.itemsize != size:
+        raise MeshError("Truncated binary STL.")
+    if not count:
+        return np.empty(0, STL_RECORD)
+    return np.memmap(source, STL_RECORD, mode="r", offset=STL_HEADER, shape=(count,))
+
+
+def _is_binary_stl(head, size):
+    if size < STL_HEADER:
+        return False
+    count = int(np.frombuffer(head[80:84], "<u4")[0])
+    return STL_HEADER + count * STL_RECORD.itemsize == size
+
+
+def analyze_stl(source):
+    """``source`` is a filesystem path or the raw file bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head, size = bytes(source[:STL_HEADER]), len(source)
+    else:
+        with open(source, "rb") as fh:
+            head = fh.read(STL_HEADER)
+            fh.seek(0, 2)
+            size = fh.tell()
+
+    acc = _Accumulator()
+    if _is_binary_stl(head, size):
+        records = _binary_stl_records(source, size)
+        for start in range(0, len(records), CHUNK_TRIANGLES):
+            acc.add(records["v"][start:start + CHUNK_TRIANGLES])
+        return acc.result("stl")
+
+    if not head.lstrip().lower().startswith(b"solid"):
+        raise MeshError("Not an STL file.")
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        with open(source, "rb") as fh:
+            source = fh.read()
+    coords = _ASCII_VERTEX.findall(bytes(source))
+    if len(coords) % 3:
+        raise MeshError("ASCII STL facets must have exactly three vertices.")
+    try:
+        tris = np.array(coords, dtype=np.float64).reshape(-1, 3, 3)
+    except ValueError as exc:
+        raise MeshError(f"Invalid ASCII STL vertex: {exc}") from exc
+    for start in range(0, len(tris), CHUNK_TRIANGLES):
+        acc.add(tris[start:start + CHUNK_TRIANGLES])
+    return acc.result("stl")
+
+
+# ---- 3MF ----
+
+def _transform(value):
+    if not value:
+        return None
+    m = np.array([float(v) for v in value.split()], dtype=np.float64)
+    if m.size != 12:
+        raise MeshError(f"Invalid 3MF transform {value!r}.")
+    return m.reshape(4, 3)  # rows: x, y, z, translation
+
+
+def _apply(matrix, points):
+    if matrix is None:
+        return points
+    return points @ matrix[:3] + matrix[3]
+
+
+def _compose(outer, inner):
+    """Transform applying ``inner`` first, then ``outer``."""
+    if outer is None:
+        return inner
+    if inner is None:
+        return outer
+    linear = inner[:3] @ outer[:3]
+    return np.vstack([linear, inner[3] @ outer[:3] + outer[3]])
+
+
+def _read_3mf_model(data):
+    """Objects and build items of one model part, with coordinates converted to millimetres."""
+    try:
+        return _parse_3mf_model(data)
+    except (ElementTree.ParseError, TypeError, ValueError) as exc:
+        if isinstance(exc, MeshError):
+            raise
+        raise MeshError(f"Invalid 3MF model: {exc}") from exc
+
+
+def _to_mm(matrix, scale):
+    if matrix is None or scale == 1.0:
+        return matrix
+    matrix = matrix.copy()
+    matrix[3] *= scale  # only the translation carries the part's unit
+    return matrix
+
+
+def _parse_3mf_model(data):
+    objects, build, unit = {}, [], "millimeter"
+    vertices, triangles, components, current = [], [], [], None
+    scale = UNIT_TO_MM[unit]
+    for event, elem in ElementTree.iterparse(io.BytesIO(data), events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == NS_3MF + "model":
+                unit = elem.get("unit", unit)
+                if unit not in UNIT_TO_MM:
+                    raise MeshError(f"Unsupported 3MF unit {unit!r}.")
+                scale = UNIT_TO_MM[unit]
+            elif tag == NS_3MF + "object":
+                current = elem.get("id")
+                vertices, triangles, components = [], [], []
+            continue
+        if tag == NS_3MF + "vertex":
+            vertices.append((float(elem.get("x")), float(elem.get("y")), float(elem.get("z"))))
+        elif tag == NS_3MF + "triangle":
+            triangles.append((int(elem.get("v1")), int(elem.get("v2")), int(elem.get("v3"))))
+        elif tag == NS_3MF + "component":
+            components.append((elem.get("objectid"), _to_mm(_transform(elem.get("transform")), scale)))
+        elif tag == NS_3MF + "object":
+            mesh = None
+            if triangles:
+                mesh = (np.array(vertices, dtype=np.float64) * scale, np.array(triangles, dtype=np.int64))
+            objects[current] = (mesh, components)
+            current = None
+        elif tag == NS_3MF + "item":
+            build.append((elem.get("objectid"), _to_mm(_transform(elem.get("transform")), scale)))
+        if tag in (NS_3MF + "vertex", NS_3MF + "triangle", NS_3MF + "object"):
+            elem.clear()
+    return objects, build
+
+
+def analyze_3mf(source):
+    try:
+        archive = zipfile.ZipFile(source if not isinstance(source, (bytes, bytearray)) else io.BytesIO(source))
+    except zipfile.BadZipFile as exc:
+        raise MeshError("Not a 3MF archive.") from exc
+    with archive:
+        names = [n for n in archive.namelist() if n.lower().endswith(".model")]
+        if not names:
+            raise MeshError("3MF archive has no model part.")
+        objects, build = {}, []
+        for name in names:
+            try:
+                part = archive.read(name)
+            except (zipfile.BadZipFile, EOFError) as exc:
+                raise MeshError(f"Corrupt 3MF part {name!r}.") from exc
+            # each part has its own unit; coordinates come back in millimetres
+            objs, items = _read_3mf_model(part)
+            objects.update(objs)
+            build.extend(items)
+
+    if not build:
+        build = [(oid, None) for oid, (mesh, _) in objects.items() if mesh is not None]
+
+    acc = _Accumulator()
+
+    def emit(object_id, matrix, depth=0):
+        if object_id not in objects or depth > 16:
+            raise MeshError(f"3MF references unknown object {object_id!r}.")
+        mesh, components = objects[object_id]
+        if mesh is not None:
+            verts, tris = mesh
+            if tris.size and (tris.min() < 0 or tris.max() >= len(verts)):
+                raise MeshError(f"3MF object {object_id} has out-of-range vertex indices.")
+            verts = _apply(matrix, verts)
+            for start in range(0, len(tris), CHUNK_TRIANGLES):
+                acc.add(verts[tris[start:start + CHUNK_TRIANGLES]])
+        for child_id, child_matrix in components:
+            emit(child_id, _compose(matrix, child_matrix), depth + 1)
+
+    for object_id, matrix in build:
+        emit(object_id, matrix)
+    return acc.result("3mf")
+
+
+def analyze_mesh(source, name=""):
+    """Dispatch on extension (falling back to sniffing) and return :class:`MeshStats`."""
+    lowered = name.lower() if name else (str(source).lower() if isinstance(source, str) else "")
+    if lowered.endswith(".3mf"):
+        return analyze_3mf(source)
+    if lowered.endswith(".stl"):
+        return analyze_stl(source)
+    if isinstance(source, (bytes, bytearray)):
+        head = bytes(source[:4])
+    else:
+        with open(source, "rb") as fh:
+            head = fh.read(4)
+    return analyze_3mf(source) if head.startswith(b"PK") else analyze_stl(source)
+
+
+def parse_build_volume(value):
+    """``"220x220x250"`` / ``"256 × 256 × 256 mm"`` -> ``(220.0, 220.0, 250.0)``; ``None`` if unparsable."""
+    numbers = [float(n.replace(",", ".")) for n in _NUMBER.findall(value or "")]
+    if len(numbers) != 3:
+        return None
+    return tuple(numbers)
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_remove_product_pdf_fiche_technique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeshAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checksum', models.CharField(max_length=64, unique=True)),
+                ('file_format', models.CharField(max_length=10)),
+                ('triangle_count', models.BigIntegerField()),
+                ('volume_mm3', models.FloatField()),
+                ('surface_area_mm2', models.FloatField()),
+                ('size_x_mm', models.FloatField()),
+                ('size_y_mm', models.FloatField()),
+                ('size_z_mm', models.FloatField()),
+                ('analyzed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'mesh analyses',
+                'db_table': 'mesh_analyses',
+            },
+        ),
+        migrations.AlterField(
+            model_name='productdocument',
+            name='kind',
+            field=models.CharField(choices=[('spec', 'Spec / Fiche technique'), ('manual', 'Manual'), ('datasheet', 'Datasheet'), ('model', '3D model (STL/3MF)'), ('other', 'Other')], default='spec', max_length=20),
+        ),
+    ]
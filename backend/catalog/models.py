@@ -1,11 +1,20 @@
 import hashlib
+import logging
+from decimal import Decimal
 
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from core.managers import WorkspaceManager
+
+logger = logging.getLogger(__name__)
+
 # If your Workspace model lives elsewhere, keep the string 'core.Workspace' and ensure 'core' is in INSTALLED_APPS.
 class WorkspaceScopedModel(models.Model):
     workspace = models.ForeignKey('core.Workspace', on_delete=models.CASCADE)
+
+    objects = WorkspaceManager()
+
     class Meta:
         abstract = True
 
@@ -69,6 +78,19 @@ class Product(WorkspaceScopedModel):
         unique_together = (("workspace", "sku"),)
     def __str__(self): return f"{self.title} ({self.sku or 'no-sku'})"
 
+    def mesh_analysis(self):
+        """Analysis of the primary 3D model document (falls back to the newest one)."""
+        doc = (
+            self.documents.filter(kind=ProductDocument.Kind.MODEL)
+            .order_by("-is_primary", "-uploaded_at")
+            .first()
+        )
+        return doc.analyze() if doc else None
+
+    def estimated_grams(self, material):
+        analysis = self.mesh_analysis()
+        return analysis.grams_for(material) if analysis else None
+
 
 def product_doc_upload_to(instance, filename):
     # media/product_docs/<product_id>/<filename>
@@ -80,6 +102,7 @@ class ProductDocument(models.Model):
         SPEC = "spec", "Spec / Fiche technique"
         MANUAL = "manual", "Manual"
         DATASHEET = "datasheet", "Datasheet"
+        MODEL = "model", "3D model (STL/3MF)"
         OTHER = "other", "Other"
 
     id = models.BigAutoField(primary_key=True)
@@ -94,6 +117,10 @@ class ProductDocument(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    workspace_lookup = "product__workspace"
+    objects = WorkspaceManager()
+    str_related = ("product",)
+
     class Meta:
         db_table = "product_documents"
         indexes = [
@@ -113,10 +140,27 @@ class ProductDocument(models.Model):
         version = f" {self.version}" if self.version else ""
         return f"{self.product.title} [{self.get_kind_display()}{version}]"
 
+    MODEL_EXTENSIONS = (".stl", ".3mf")
+
     def clean(self):
-        if self.file and not self.file.name.lower().endswith(".pdf"):
+        if not self.file:
+            return
+        name = self.file.name.lower()
+        if self.kind == self.Kind.MODEL:
+            if not name.endswith(self.MODEL_EXTENSIONS):
+                raise ValidationError({"file": "3D models must be STL or 3MF files."})
+        elif not name.endswith(".pdf"):
             raise ValidationError({"file": "Only PDF files are allowed."})
 
+    def analyze(self):
+        """Mesh analysis for a model document, cached per file checksum."""
+        if self.kind != self.Kind.MODEL or not self.checksum:
+            return None
+        analysis = MeshAnalysis.objects.filter(checksum=self.checksum).first()
+        if analysis is None:
+            analysis = MeshAnalysis.from_file(self.file, self.checksum)
+        return analysis
+
     def save(self, *args, **kwargs):
         # compute size and checksum when file is present
         if self.file:
@@ -146,3 +190,80 @@ class ProductDocument(models.Model):
             elif file_length is not None:
                 self.size = file_length
         super().save(*args, **kwargs)
+
+        if self.kind == self.Kind.MODEL:
+            from .mesh import MeshError
+
+            try:
+                self.analyze()
+            except MeshError as exc:
+                logger.warning("Mesh analysis failed for document %s: %s", self.pk, exc)
+
+
+class MeshAnalysis(models.Model):
+    """Geometry of an STL/3MF file, keyed by the file's SHA-256 so identical uploads share it."""
+    checksum = models.CharField(max_length=64, unique=True)
+    file_format = models.CharField(max_length=10)
+    triangle_count = models.BigIntegerField()
+    volume_mm3 = models.FloatField()
+    surface_area_mm2 = models.FloatField()
+    size_x_mm = models.FloatField()
+    size_y_mm = models.FloatField()
+    size_z_mm = models.FloatField()
+    analyzed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "mesh_analyses"
+        verbose_name_plural = "mesh analyses"
+
+    def __str__(self):
+        return f"{self.file_format.upper()} {self.size_x_mm:.1f}×{self.size_y_mm:.1f}×{self.size_z_mm:.1f} mm"
+
+    @classmethod
+    def from_file(cls, file, checksum):
+        from .mesh import analyze_mesh
+
+        try:
+            source = file.path  # memory-mapped when the storage is on local disk
+        except NotImplementedError:
+            file.open("rb")
+            try:
+                source = file.read()
+            finally:
+                file.close()
+        stats = analyze_mesh(source, name=file.name)
+        size_x, size_y, size_z = stats.size
+        analysis, _ = cls.objects.get_or_create(
+            checksum=checksum,
+            defaults=dict(
+                file_format=stats.file_format,
+                triangle_count=stats.triangle_count,
+                volume_mm3=stats.volume_mm3,
+                surface_area_mm2=stats.surface_area_mm2,
+                size_x_mm=size_x,
+                size_y_mm=size_y,
+                size_z_mm=size_z,
+            ),
+        )
+        return analysis
+
+    @property
+    def volume_cm3(self):
+        return self.volume_mm3 / 1000.0
+
+    def grams_for(self, material):
+        """Solid weight in grams from ``Material.density`` (g/cm³); ``None`` when density is unknown."""
+        if material is None or material.density is None:
+            return None
+        grams = Decimal(str(self.volume_cm3)) * material.density
+        return grams.quantize(Decimal("0.001"))
+
+    def fits_build_volume(self, printer_type):
+        """``True``/``False`` against ``PrinterType.max_build_volume``; ``None`` if it is not parsable."""
+        from .mesh import parse_build_volume
+
+        limits = parse_build_volume(printer_type.max_build_volume)
+        if limits is None:
+            return None
+        size = (self.size_x_mm, self.size_y_mm, self.size_z_mm)
+        return all(dim <= limit for dim, limit in zip(size, limits))
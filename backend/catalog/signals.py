@@ -0,0 +1,6 @@
+from core.response_cache import track_changes
+
+from .models import Color, Material, Product
+
+for model in (Product, Material, Color):
+    track_changes(model, "catalog")
@@ -1,3 +1,156 @@
-from django.test import TestCase
+import io
+import struct
+import tempfile
+import zipfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.models import Workspace
+from users.models import User
+
+from .importers import import_catalog
+from .mesh import MeshError, analyze_3mf, analyze_mesh, analyze_stl
+from .models import Color, Material, Product, ProductDocument
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="catalog@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Catalog shop", owner=owner)
+
+    def test_csv_upserts_and_reports_bad_rows(self):
+        Product.objects.create(workspace=self.workspace, sku="MUG", title="Old mug", price=1)
+        data = (
+            "sku,title,price,is_personalized\n"
+            "MUG,Mug,9.50,yes\n"
+            "CLIP,Clip,0.20,no\n"
+            ",No sku,1,no\n"
+            "BAD,Bad price,cheap,no\n"
+            "CLIP,Clip v2,0.25,no\n"
+        ).encode()
+        report = import_catalog(self.workspace, "products", data, "csv", chunk_size=2)
+        self.assertEqual((report.rows, report.upserted, report.error_count), (5, 3, 2))
+        self.assertEqual([(e.line, e.key, sorted(e.errors)) for e in report.errors],
+                         [(4, "", ["sku"]), (5, "BAD", ["price"])])
+        mug = Product.objects.get(sku="MUG")
+        self.assertEqual((mug.title, str(mug.price), mug.is_personalized), ("Mug", "9.50", True))
+        self.assertEqual(Product.objects.get(sku="CLIP").title, "Clip v2")
+
+    def test_jsonl_reports_malformed_rows_and_counts_unchanged(self):
+        Color.objects.create(workspace=self.workspace, color_name="Black")
+        lines = [
+            '{"color_name": "Black"}',
+            '{"color_name": "White"}',
+            '{"color_name": 7}',
+            '["not", "an", "object"]',
+            '{"color_name": ',
+        ]
+        report = import_catalog(self.workspace, "colors", io.StringIO("\n".join(lines)), "jsonl")
+        self.assertEqual(report.as_dict()["rows"], 5)
+        self.assertEqual((report.upserted, report.unchanged, report.error_count), (2, 1, 2))
+        self.assertEqual([e.line for e in report.errors], [4, 5])
+        self.assertEqual(
+            sorted(Color.objects.filter(workspace=self.workspace).values_list("color_name", flat=True)),
+            ["7", "Black", "White"],
+        )
+
+    def test_numeric_sku_in_json(self):
+        report = import_catalog(self.workspace, "products", io.StringIO('{"sku": 12345, "title": "Bolt"}\n'), "jsonl")
+        self.assertEqual((report.upserted, report.error_count), (1, 0))
+        self.assertTrue(Product.objects.filter(sku="12345").exists())
+
+
+# a 10 mm cube, outward-facing triangles
+CUBE_VERTICES = [(x, y, z) for x in (0, 10) for y in (0, 10) for z in (0, 10)]
+CUBE_TRIANGLES = [
+    (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+    (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+]
+
+
+def ascii_stl():
+    lines = ["solid cube"]
+    for tri in CUBE_TRIANGLES:
+        lines += ["facet normal 0 0 0", "outer loop"]
+        lines += ["vertex %s %s %s" % CUBE_VERTICES[i] for i in tri]
+        lines += ["endloop", "endfacet"]
+    return "\n".join(lines + ["endsolid cube"]).encode()
+
+
+def binary_stl():
+    out = bytearray(b"\0" * 80) + struct.pack("<I", len(CUBE_TRIANGLES))
+    for tri in CUBE_TRIANGLES:
+        out += struct.pack("<3f", 0, 0, 0)
+        for i in tri:
+            out += struct.pack("<3f", *CUBE_VERTICES[i])
+        out += b"\0\0"
+    return bytes(out)
+
+
+def model_part(unit, object_id, extra=""):
+    vertices = "".join(f'<vertex x="{x}" y="{y}" z="{z}"/>' for x, y, z in CUBE_VERTICES)
+    triangles = "".join(f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in CUBE_TRIANGLES)
+    return (
+        f'<model unit="{unit}" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+        f'<resources><object id="{object_id}" type="model"><mesh><vertices>{vertices}{extra}</vertices>'
+        f'<triangles>{triangles}</triangles></mesh></object></resources>'
+        f'<build><item objectid="{object_id}"/></build></model>'
+    ).encode()
+
+
+def three_mf(*parts):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for n, part in enumerate(parts):
+            archive.writestr(f"3D/part{n}.model", part)
+    return buffer.getvalue()
+
+
+class MeshAnalysisTests(TestCase):
+    def test_stl_ascii_and_binary(self):
+        for data in (ascii_stl(), binary_stl()):
+            stats = analyze_stl(data)
+            self.assertEqual(stats.triangle_count, 12)
+            self.assertAlmostEqual(stats.volume_mm3, 1000.0, places=3)
+            self.assertAlmostEqual(stats.surface_area_mm2, 600.0, places=3)
+            self.assertEqual(stats.size, (10.0, 10.0, 10.0))
+
+    def test_3mf_units_are_resolved_per_part(self):
+        # a 10 mm cube in millimetres next to a 10 cm cube in centimetres
+        stats = analyze_3mf(three_mf(model_part("millimeter", "1"), model_part("centimeter", "2")))
+        self.assertEqual(stats.triangle_count, 24)
+        self.assertAlmostEqual(stats.volume_mm3, 1000.0 + 100.0 ** 3, places=0)
+        self.assertEqual(stats.size, (100.0, 100.0, 100.0))
+
+    def test_corrupt_files_raise_mesh_error(self):
+        for data in (
+            three_mf(b"<model><resources>"),                              # malformed XML
+            three_mf(model_part("millimeter", "1", extra='<vertex x="1"/>')),  # missing attributes
+            three_mf(model_part("parsec", "1")),
+            b"PK not a zip",
+            b"garbage",
+        ):
+            with self.assertRaises(MeshError):
+                analyze_mesh(data)
+
+    def test_corrupt_upload_is_saved_and_shown(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        owner = User.objects.create_user(email="mesh@example.com", password="x", is_staff=True, is_superuser=True)
+        workspace = Workspace.objects.create(name="Mesh shop", owner=owner)
+        product = Product.objects.create(workspace=workspace, sku="CUBE", title="Cube")
+        good = ProductDocument.objects.create(
+            product=product, kind="model", version="1", file=ContentFile(binary_stl(), name="cube.stl")
+        )
+        self.assertEqual(good.analyze().volume_cm3, 1.0)
+        self.assertEqual(product.estimated_grams(Material(density=Decimal("1.24"))), Decimal("1.240"))
+
+        broken = ProductDocument.objects.create(
+            product=product, kind="model", version="2", file=ContentFile(three_mf(b"<model"), name="broken.3mf")
+        )
+        self.client.force_login(owner)
+        response = self.client.get(f"/admin/catalog/productdocument/{broken.pk}/change/")
+        self.assertContains(response, "Could not analyse this file")
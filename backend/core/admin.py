@@ -1,16 +1,17 @@
 from django.contrib import admin
 
+from .admin_performance import FastAdminMixin
 from .models import Workspace, Membership
 
 
 @admin.register(Workspace)
-class WorkspaceAdmin(admin.ModelAdmin):
+class WorkspaceAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("name", "owner", "created_at")
     search_fields = ("name", "owner__email")
 
 
 @admin.register(Membership)
-class MembershipAdmin(admin.ModelAdmin):
+class MembershipAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("user", "workspace", "role")
     list_filter = ("role",)
     search_fields = ("user__email", "workspace__name")
@@ -0,0 +1,202 @@
+"""Admin pages whose query count does not grow with the table.
+
+:class:`FastAdminMixin` (before ``admin.ModelAdmin``):
+
+* ``list_select_related`` is derived from ``list_display``: every forward
+  relation shown is joined, together with the relations its ``__str__``
+  reads (the model's ``str_related`` paths). An explicit tuple is merged
+  in, ``True`` is kept as is.
+* Text, JSON and binary columns not shown in the list are deferred.
+* :class:`EstimatedCountPaginator` takes the row count from the planner
+  on PostgreSQL once it exceeds ``ADMIN_ESTIMATED_COUNT_THRESHOLD``, and
+  the unfiltered total is not counted at all.
+* Filters on relations and on free-form columns cache their choices for
+  ``ADMIN_FILTER_CACHE_TIMEOUT`` seconds instead of loading every
+  workspace, customer or distinct value on each render.
+* With sharding on, changelists of workspace-scoped models say that they
+  only list rows stored on ``default`` (the admin has no workspace to route
+  by; see :mod:`core.sharding`).
+
+:class:`BoundedInlineMixin` (before ``admin.TabularInline``) shows at most
+``max_rows`` (``ADMIN_INLINE_MAX_ROWS``) related rows and links to the
+related changelist, which is paginated, for the rest.
+"""
+import json
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin import AllValuesFieldListFilter, RelatedFieldListFilter
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.forms.models import BaseInlineFormSet
+from django.urls import NoReverseMatch, reverse
+from django.utils.functional import cached_property
+
+HEAVY_FIELDS = (models.TextField, models.JSONField, models.BinaryField)
+
+
+def estimated_count(queryset):
+    """Planner row estimate for ``queryset``; ``None`` where the database has none."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Exact counts for small results, the planner's estimate for large ones."""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return self.object_list.count()
+        return estimate
+
+
+def _cache_key(kind, model_admin, field_path):
+    return f"adminfilter:{kind}:{model_admin.model._meta.label_lower}:{field_path}"
+
+
+class CachedRelatedFieldListFilter(RelatedFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        key = _cache_key("related", model_admin, self.field_path)
+        choices = cache.get(key)
+        if choices is None:
+            choices = [(pk, str(label)) for pk, label in super().field_choices(field, request, model_admin)]
+            cache.set(key, choices, settings.ADMIN_FILTER_CACHE_TIMEOUT)
+        return choices
+
+
+class CachedAllValuesFieldListFilter(AllValuesFieldListFilter):
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        key = _cache_key("values", model_admin, field_path)
+        values = cache.get(key)
+        if values is None:
+            values = list(self.lookup_choices)
+            cache.set(key, values, settings.ADMIN_FILTER_CACHE_TIMEOUT)
+        self.lookup_choices = values
+
+
+def _forward_relation(field):
+    return field.is_relation and field.concrete and (field.many_to_one or field.one_to_one)
+
+
+class FastChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        shown = {name for name in self.list_display if isinstance(name, str)}
+        heavy = [
+            f.name for f in self.model._meta.concrete_fields
+            if isinstance(f, HEAVY_FIELDS) and f.name not in shown and not f.primary_key
+        ]
+        return queryset.defer(*heavy) if heavy else queryset
+
+
+class FastAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return FastChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        from .sharding import is_sharded, shards
+
+        if shards() and is_sharded(self.model):
+            messages.warning(
+                request,
+                f"Only workspaces stored on the default database are listed; "
+                f"workspaces on {', '.join(shards())} are not.",
+            )
+        return super().changelist_view(request, extra_context)
+
+    def get_list_select_related(self, request):
+        explicit = self.list_select_related
+        if explicit is True:
+            return True
+        paths = set(explicit or ())
+        for name in self.get_list_display(request):
+            if name == "__str__":
+                paths.update(getattr(self.model, "str_related", ()))
+            if not isinstance(name, str):
+                continue
+            try:
+                fields = get_fields_from_path(self.model, name)
+            except (FieldDoesNotExist, LookupError):
+                continue
+            prefix = []
+            for field in fields:
+                if not _forward_relation(field):
+                    break
+                prefix.append(field.name)
+                path = "__".join(prefix)
+                paths.add(path)
+                if field is fields[-1]:
+                    paths.update(f"{path}__{p}" for p in getattr(field.related_model, "str_related", ()))
+        return tuple(sorted(paths))
+
+    def get_list_filter(self, request):
+        filters = []
+        for entry in super().get_list_filter(request):
+            if isinstance(entry, str):
+                entry = self._cached_filter(entry)
+            filters.append(entry)
+        return filters
+
+    def _cached_filter(self, field_path):
+        try:
+            field = get_fields_from_path(self.model, field_path)[-1]
+        except (FieldDoesNotExist, LookupError):
+            return field_path
+        if field.remote_field is not None:
+            return field_path, CachedRelatedFieldListFilter
+        if field.choices or isinstance(field, (models.BooleanField, models.DateField)):
+            return field_path
+        return field_path, CachedAllValuesFieldListFilter
+
+
+class BoundedInlineFormSet(BaseInlineFormSet):
+    """The first ``max_rows`` related rows in the inline's ordering instead of all of them."""
+
+    max_rows = 20
+    truncated = False
+
+    def get_queryset(self):
+        if not hasattr(self, "_bounded"):
+            queryset = super().get_queryset()
+            ids = list(queryset.values_list("pk", flat=True)[:self.max_rows + 1])
+            self.truncated = len(ids) > self.max_rows
+            self._bounded = queryset.filter(pk__in=ids[:self.max_rows])
+        return self._bounded
+
+    def changelist_url(self):
+        """The related changelist filtered to this parent, where all rows are paginated."""
+        opts = self.model._meta
+        try:
+            url = reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist")
+        except NoReverseMatch:
+            return None
+        return f"{url}?{self.fk.name}={self.instance.pk}"
+
+
+class BoundedInlineMixin:
+    formset = BoundedInlineFormSet
+    template = "admin/edit_inline/bounded_tabular.html"
+    max_rows = None
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.max_rows = self.max_rows or settings.ADMIN_INLINE_MAX_ROWS
+        return formset
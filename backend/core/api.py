@@ -0,0 +1,242 @@
+"""Base classes for the workspace-scoped REST API."""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import permissions, serializers, status, viewsets
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from authapp.authentication import StatelessJWTAuthentication
+
+from .permissions import CanWriteWorkspace, IsWorkspaceMember
+from .response_cache import resource_versions
+
+
+class CachedResponseMixin:
+    """Versioned caching and ETag revalidation for ``list`` / ``retrieve``.
+
+    Set ``cache_resources`` to the resources the serialized output depends
+    on; ``workspace_id`` must be resolved (and access checked) by the
+    permission classes before the handler runs.
+    """
+
+    cache_resources = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        workspace_id = self.workspace_id
+        versions = resource_versions(workspace_id, self.cache_resources)
+        accepted = getattr(request, "accepted_media_type", "")
+        digest = hashlib.sha1(
+            f"{request.get_full_path()}|{accepted}|{versions}".encode()
+        ).hexdigest()
+        etag = f'W/"{digest[:32]}"'
+        if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+            return self._conditional(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        key = f"respcache:{self.basename}:{workspace_id}:{digest}"
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        else:
+            response = Response(data)
+        return self._conditional(response, etag)
+
+    def _conditional(self, response, etag):
+        response["ETag"] = etag
+        # let clients keep a copy but always revalidate it
+        response["Cache-Control"] = "private, no-cache"
+        response["Vary"] = "Authorization, X-Workspace-ID"
+        return response
+
+
+class WorkspaceReadOnlyViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    """Read-only listing / detail of one workspace's rows, built for polling.
+
+    Authentication never reads the users table and responses are served from
+    the versioned response cache, so polling a quiet workspace costs no
+    queries. Subclasses set ``queryset`` (its model must use
+    ``WorkspaceManager``), ``serializer_class`` and ``cache_resources``;
+    ``filter_fields`` lists query parameters matched exactly.
+    """
+
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated, IsWorkspaceMember]
+    filter_fields = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset().for_workspace(self.workspace_id)
+        for field in self.filter_fields:
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
+
+
+class BulkRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key of a row in the request's workspace.
+
+    Under :class:`BulkCreateView` the rows a whole batch refers to are loaded
+    beforehand, one query per field, and looked up here instead of once per
+    item.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().for_workspace(self.context["workspace_id"])
+
+    def to_internal_value(self, data):
+        rows = self.context.get("related", {}).get(self.field_name)
+        if rows is None:
+            return super().to_internal_value(data)
+        try:
+            obj = rows.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+        return obj
+
+
+class BulkCreateView(APIView):
+    """Create a list of rows in the selected workspace with one ``bulk_create``.
+
+    The body is ``{"mode": "atomic" | "partial", "items": [...]}`` (or just
+    the list, with ``?mode=``). Every item is validated by
+    ``serializer_class`` and the model's ``clean()``, with the rows its
+    :class:`BulkRelatedField` fields point to loaded once for the batch.
+    ``atomic`` (the default) creates all items or none; ``partial`` creates
+    the valid ones and reports the others. The response lists one result per
+    item, in request order: ``{"index", "id"}`` or ``{"index", "errors"}``.
+
+    Bulk inserts send no signals: subclasses do what the model's signals
+    would have done in :meth:`after_create`, once per affected parent row,
+    inside the same transaction. :meth:`build` adds values the request does
+    not carry.
+    """
+
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated, CanWriteWorkspace]
+    serializer_class = None
+    ATOMIC, PARTIAL = "atomic", "partial"
+    CONFLICT = "Conflicts with an existing row or another item of the batch."
+
+    @property
+    def model(self):
+        return self.serializer_class.Meta.model
+
+    def get_queryset(self):
+        return self.model.objects.for_workspace(self.workspace_id)
+
+    def build(self, validated_data):
+        return self.model(**validated_data)
+
+    def after_create(self, objs):
+        pass
+
+    def post(self, request):
+        data = request.data
+        if isinstance(data, list):
+            items, mode = data, request.query_params.get("mode", self.ATOMIC)
+        elif isinstance(data, dict):
+            items, mode = data.get("items"), data.get("mode", self.ATOMIC)
+        else:
+            return Response({"items": ["Send a non-empty list."]}, status.HTTP_400_BAD_REQUEST)
+        if mode not in (self.ATOMIC, self.PARTIAL):
+            return Response({"mode": [f'Use "{self.ATOMIC}" or "{self.PARTIAL}".']}, status.HTTP_400_BAD_REQUEST)
+        if not isinstance(items, list) or not items:
+            return Response({"items": ["Send a non-empty list."]}, status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.BULK_MAX_ITEMS:
+            return Response(
+                {"items": [f"Send at most {settings.BULK_MAX_ITEMS} items per request."]}, status.HTTP_400_BAD_REQUEST
+            )
+
+        objs, errors = self._validate(items)
+        if errors and mode == self.ATOMIC:
+            return self._response(mode, items, {}, errors, status.HTTP_400_BAD_REQUEST)
+        scoped = self.get_queryset()
+        try:
+            with transaction.atomic(using=scoped.db):
+                created, conflicts = self._insert(scoped, objs, mode)
+                if created:
+                    self.after_create(list(created.values()))
+        except IntegrityError:
+            return Response({"detail": self.CONFLICT}, status.HTTP_409_CONFLICT)
+        errors.update(conflicts)
+        code = status.HTTP_207_MULTI_STATUS if errors else status.HTTP_201_CREATED
+        return self._response(mode, items, created, errors, code)
+
+    def _validate(self, items):
+        context = {"request": self.request, "view": self, "workspace_id": self.workspace_id}
+        context["related"] = self._related(self.serializer_class(context=context), items)
+        objs, errors = {}, {}
+        for index, item in enumerate(items):
+            serializer = self.serializer_class(data=item, context=context)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            obj = self.build(serializer.validated_data)
+            try:
+                obj.clean()
+            except DjangoValidationError as exc:
+                errors[index] = serializers.as_serializer_error(exc)
+                continue
+            objs[index] = obj
+        return objs, errors
+
+    def _related(self, serializer, items):
+        """``{field: {pk: row}}`` for the rows the batch refers to, one query per field."""
+        related = {}
+        for name, field in serializer.fields.items():
+            if not isinstance(field, BulkRelatedField) or field.read_only:
+                continue
+            pks = set()
+            for item in items:
+                try:
+                    pks.add(int(item[name]))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            related[name] = field.get_queryset().in_bulk(pks) if pks else {}
+        return related
+
+    def _insert(self, scoped, objs, mode):
+        if mode == self.ATOMIC:
+            scoped.bulk_create(objs.values())
+            return objs, {}
+        try:
+            with transaction.atomic(using=scoped.db):
+                scoped.bulk_create(objs.values())
+            return objs, {}
+        except IntegrityError:
+            pass
+        # find the conflicting items, one savepoint each
+        created, conflicts = {}, {}
+        for index, obj in objs.items():
+            obj.pk, obj._state.adding = None, True
+            try:
+                with transaction.atomic(using=scoped.db):
+                    scoped.bulk_create([obj])
+            except IntegrityError:
+                conflicts[index] = {"non_field_errors": [self.CONFLICT]}
+            else:
+                created[index] = obj
+        return created, conflicts
+
+    def _response(self, mode, items, created, errors, code):
+        results = [
+            {"index": index, "errors": errors[index]} if index in errors
+            else {"index": index, "id": created[index].pk} if index in created
+            else {"index": index}
+            for index in range(len(items))
+        ]
+        return Response({"mode": mode, "created": len(created), "failed": len(errors), "results": results}, code)
@@ -0,0 +1,23 @@
+from core import dbpool, metrics
+
+
+class ConnectionMetricsMixin:
+    """Record connect latency and open connections in :mod:`core.dbpool`.
+
+    Every connection also carries :func:`core.metrics.record_query`, so query
+    metrics cover whichever thread a request's queries run in.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.execute_wrappers.append(metrics.record_query)
+
+    def get_new_connection(self, conn_params):
+        # with a pool this is the checkout (including any wait for a free slot)
+        with dbpool.track_connect(self.alias):
+            return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if self.connection is not None:
+            dbpool.record_close(self.alias)
+        return super()._close()
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from core.backends.base import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,226 @@
+"""Benchmarks of the hot paths on a generated dataset (see :mod:`core.datagen`).
+
+Each benchmark is a function ``bench(ctx)`` registered with :func:`benchmark`;
+it is run ``repeat`` times inside a transaction that is rolled back, so
+writes do not change the dataset between runs. Wall time and the queries
+issued on every database alias are recorded per run::
+
+    report = run_benchmarks(workspace, repeat=5)
+    json.dump(report, fh)
+
+Query counts are deterministic for a dataset and are what :func:`compare`
+gates on; wall times are reported for trend tracking.
+"""
+import csv
+import io
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+import django
+from django.contrib import admin
+from django.db import connections, transaction
+from django.test import RequestFactory
+
+from catalog.importers import import_catalog
+from catalog.models import Product
+from orders.models import Order, OrderItem
+from production.models import Filament, FilamentTransaction, PrintJob
+from users.models import User
+
+from .metrics import QueryRecorder
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+class _Rollback(Exception):
+    pass
+
+
+@dataclass
+class BenchContext:
+    workspace: object
+    alias: str
+    superuser: object
+
+    def scoped(self, model):
+        return model.objects.for_workspace(self.workspace)
+
+
+# ---- benchmarks ----
+
+@benchmark
+def order_item_save(ctx):
+    """Add a line to a manual order: item save plus the order total recompute signal."""
+    order = ctx.scoped(Order).filter(totals_locked=False).order_by("pk").first()
+    used = order.items.values_list("product_id", flat=True)
+    product = ctx.scoped(Product).exclude(pk__in=list(used)).order_by("pk").first()
+    OrderItem(order=order, product=product, quantity=Decimal(2)).save()
+
+
+@benchmark
+def filament_transaction_post(ctx):
+    """Post one stock movement: insert plus the stock recompute signal."""
+    filament = ctx.scoped(Filament).order_by("pk").first()
+    FilamentTransaction.objects.create(
+        filament=filament, kind=FilamentTransaction.Kind.WASTE, quantity_grams=Decimal("12.5"),
+        created_by="bench",
+    )
+
+
+@benchmark
+def job_queue_list(ctx):
+    """First page of the open print job queue with what a listing renders."""
+    jobs = (
+        ctx.scoped(PrintJob)
+        .filter(status__in=[PrintJob.Status.PENDING, PrintJob.Status.QUEUED])
+        .select_related("product", "printer", "filament_used", "order_item__order")[:50]
+    )
+    return [
+        (job.pk, job.product.title, job.printer and job.printer.machine_name,
+         job.order_item.order.order_number, job.status, job.priority)
+        for job in jobs
+    ]
+
+
+@benchmark
+def product_import(ctx):
+    """Catalog import of 500 product rows; SKUs already in the dataset are updated."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["sku", "title", "price", "is_personalized"])
+    for n in range(500):
+        writer.writerow([f"SKU-{n * 2:06d}", f"Imported {n}", f"{n % 50 + 5}.90", "no"])
+    buffer.seek(0)
+    report = import_catalog(ctx.workspace, "products", buffer, "csv", chunk_size=250)
+    assert not report.error_count, report.as_dict()["errors"][:3]
+
+
+@benchmark
+def order_export(ctx):
+    """Stream every order line of the workspace as CSV (what an export runs)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = (
+        ctx.scoped(OrderItem)
+        .values_list(
+            "order__order_number", "order__created_at", "order__status__status_name",
+            "order__customer__name", "product__sku", "quantity", "unit_price", "total_price",
+        )
+        .order_by("order_id", "pk")
+        .iterator(chunk_size=2000)
+    )
+    writer.writerows(rows)
+    return buffer.tell()
+
+
+def _changelist(ctx, model):
+    request = RequestFactory().get(f"/admin/{model._meta.app_label}/{model._meta.model_name}/")
+    request.user = ctx.superuser
+    response = admin.site._registry[model].changelist_view(request)
+    response.render()
+    return len(response.content)
+
+
+@benchmark
+def admin_order_changelist(ctx):
+    """Admin order changelist (default page, no filters)."""
+    return _changelist(ctx, Order)
+
+
+@benchmark
+def admin_printjob_changelist(ctx):
+    """Admin print job changelist (default page, no filters)."""
+    return _changelist(ctx, PrintJob)
+
+
+# ---- running ----
+
+def _measure(func, ctx):
+    recorder = QueryRecorder()
+    try:
+        with transaction.atomic(using=ctx.alias):
+            with recorder.install():
+                start = time.perf_counter()
+                func(ctx)
+                elapsed = time.perf_counter() - start
+            raise _Rollback
+    except _Rollback:
+        pass
+    return elapsed, recorder
+
+
+def run_benchmarks(workspace, repeat=5, only=None, warmup=1):
+    """Run the benchmarks (all, or the names in ``only``) against ``workspace``."""
+    names = list(only or BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise KeyError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    superuser = User.objects.filter(is_superuser=True, is_active=True).order_by("pk").first()
+    if superuser is None:
+        superuser = User(email="bench@example.com", is_staff=True, is_superuser=True)
+    ctx = BenchContext(workspace=workspace, alias=Order.objects.for_workspace(workspace).db, superuser=superuser)
+
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name]
+        for _ in range(warmup):
+            _measure(func, ctx)
+        times, queries, db_seconds = [], [], []
+        for _ in range(repeat):
+            elapsed, recorder = _measure(func, ctx)
+            times.append(elapsed)
+            queries.append(recorder.count)
+            db_seconds.append(recorder.seconds)
+        results[name] = {
+            "description": (func.__doc__ or "").strip(),
+            "runs": repeat,
+            "queries": max(queries),
+            "wall_ms": {
+                "min": round(min(times) * 1000, 3),
+                "median": round(statistics.median(times) * 1000, 3),
+                "max": round(max(times) * 1000, 3),
+            },
+            "db_ms_median": round(statistics.median(db_seconds) * 1000, 3),
+        }
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connections[ctx.alias].vendor,
+        },
+        "workspace": {"id": workspace.pk, "name": workspace.name, "alias": ctx.alias},
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=1.5):
+    """Differences against a previous report.
+
+    Returns ``(rows, regressions)``: one row per benchmark present in both,
+    and the names whose query count grew or whose median wall time exceeds
+    the baseline by more than ``tolerance`` times.
+    """
+    rows, regressions = [], []
+    for name, result in report["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = result["wall_ms"]["median"] / max(before["wall_ms"]["median"], 1e-6)
+        row = {
+            "name": name,
+            "queries": (before["queries"], result["queries"]),
+            "median_ms": (before["wall_ms"]["median"], result["wall_ms"]["median"]),
+            "ratio": round(ratio, 2),
+        }
+        rows.append(row)
+        if result["queries"] > before["queries"] or ratio > tolerance:
+            regressions.append(name)
+    return rows, regressions
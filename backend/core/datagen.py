@@ -0,0 +1,338 @@
+"""Synthetic datasets for benchmarks and load tests.
+
+:func:`generate` fills fresh workspaces with customers, catalog, orders,
+printers, filament stock and print jobs using ``bulk_create`` only. Values
+that signals would normally maintain (line totals, order totals, filament
+stock and transaction balances) are computed here, so the data looks like
+what the application itself writes. Output is reproducible for a given seed.
+"""
+import random
+from dataclasses import asdict, dataclass, replace
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.models import Color, Material, Product, ProductType
+from orders.models import Customer, Order, OrderItem, OrderStatus, PlatformSource
+from production.models import Filament, FilamentTransaction, Printer, PrinterType, PrintJob
+from users.models import User
+
+from .models import Membership, Workspace
+
+BATCH_SIZE = 2000
+CENT = Decimal("0.01")
+
+MATERIALS = [
+    ("PLA", Decimal("1.24"), Decimal("20.00")),
+    ("PETG", Decimal("1.27"), Decimal("24.00")),
+    ("ABS", Decimal("1.04"), Decimal("22.00")),
+    ("ASA", Decimal("1.07"), Decimal("28.00")),
+    ("TPU", Decimal("1.21"), Decimal("35.00")),
+    ("PA-CF", Decimal("1.15"), Decimal("70.00")),
+]
+COLORS = [
+    ("Black", "#000000"), ("White", "#FFFFFF"), ("Grey", "#808080"), ("Red", "#C62828"),
+    ("Blue", "#1565C0"), ("Green", "#2E7D32"), ("Yellow", "#F9A825"), ("Orange", "#EF6C00"),
+    ("Purple", "#6A1B9A"), ("Natural", "#F5F0E1"),
+]
+STATUSES = ["New", "Paid", "In production", "Shipped", "Cancelled"]
+PLATFORMS = ["Manual", "Billbee", "Etsy", "Shopify"]
+PRINTER_TYPES = [("Prusa MK4", "250x210x220"), ("Bambu X1C", "256x256x256"), ("Voron 2.4", "350x350x340")]
+WORDS = [
+    "Planter", "Hook", "Stand", "Clip", "Box", "Tray", "Holder", "Lamp", "Vase", "Bracket",
+    "Mini", "Desk", "Wall", "Cable", "Phone", "Hex", "Twist", "Modular", "Round", "Slim",
+]
+
+
+@dataclass(frozen=True)
+class Scale:
+    workspaces: int
+    customers: int          # per workspace, likewise below
+    products: int
+    orders: int
+    items_per_order: int    # upper bound; each order gets 1..n lines
+    printers: int
+    filaments: int
+    transactions: int       # per filament
+    jobs_per_item: float    # share of order lines that have a print job
+
+
+SCALES = {
+    "tiny": Scale(1, 20, 15, 40, 3, 2, 4, 5, 0.5),
+    "small": Scale(1, 500, 200, 2000, 4, 5, 20, 50, 0.6),
+    "medium": Scale(2, 5000, 1000, 25000, 4, 20, 60, 200, 0.6),
+    "large": Scale(4, 25000, 5000, 150000, 5, 50, 120, 500, 0.6),
+}
+
+
+def scaled(name, factor):
+    """``SCALES[name]`` with every per-workspace count multiplied by ``factor``."""
+    base = SCALES[name]
+    return replace(
+        base,
+        customers=max(1, int(base.customers * factor)),
+        products=max(1, int(base.products * factor)),
+        orders=max(1, int(base.orders * factor)),
+        printers=max(1, int(base.printers * factor)),
+        filaments=max(1, int(base.filaments * factor)),
+    )
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _bulk(queryset, objs):
+    return queryset.bulk_create(objs, batch_size=BATCH_SIZE)
+
+
+def reference_data():
+    """Global catalogs every dataset points at (created once, reused)."""
+    statuses = [OrderStatus.objects.get_or_create(status_name=name, defaults={"sort_order": i})[0]
+                for i, name in enumerate(STATUSES)]
+    platforms = [PlatformSource.objects.get_or_create(platform_name=name)[0] for name in PLATFORMS]
+    printer_types = [
+        PrinterType.objects.get_or_create(type_name=name, defaults={"max_build_volume": volume})[0]
+        for name, volume in PRINTER_TYPES
+    ]
+    product_type = ProductType.objects.get_or_create(type_name="Printed part")[0]
+    return statuses, platforms, printer_types, product_type
+
+
+def generate(scale, seed=0, prefix="bench"):
+    """Create ``scale.workspaces`` populated workspaces; returns a summary dict."""
+    if isinstance(scale, str):
+        scale = SCALES[scale]
+    rng = random.Random(seed)
+    statuses, platforms, printer_types, product_type = reference_data()
+    run = timezone.now().strftime("%Y%m%d%H%M%S")
+    summary = {"scale": asdict(scale), "seed": seed, "workspaces": []}
+    for n in range(scale.workspaces):
+        owner = User.objects.create_user(email=f"{prefix}-{run}-{n}@example.com", password=None)
+        workspace = Workspace.objects.create(name=f"{prefix} {run} #{n}", owner=owner)
+        Membership.objects.create(user=owner, workspace=workspace, role=Membership.OWNER)
+        builder = _WorkspaceBuilder(workspace, scale, rng, statuses, platforms, printer_types, product_type)
+        with transaction.atomic(using=Order.objects.for_workspace(workspace).db):
+            counts = builder.build()
+        summary["workspaces"].append({"id": workspace.pk, "name": workspace.name, **counts})
+    return summary
+
+
+class _WorkspaceBuilder:
+    def __init__(self, workspace, scale, rng, statuses, platforms, printer_types, product_type):
+        self.workspace = workspace
+        self.scale = scale
+        self.rng = rng
+        self.statuses = statuses
+        self.platforms = platforms
+        self.printer_types = printer_types
+        self.product_type = product_type
+        self.now = timezone.now()
+
+    def scoped(self, model):
+        return model.objects.for_workspace(self.workspace)
+
+    def build(self):
+        materials, colors = self.materials(), self.colors()
+        products = self.products()
+        customers = self.customers()
+        orders, items = self.orders(customers, products)
+        printers = self.printers()
+        filaments = self.filaments(materials, colors)
+        jobs = self.jobs(items, printers, filaments)
+        transactions = self.transactions(filaments, jobs)
+        return {
+            "materials": len(materials), "colors": len(colors), "products": len(products),
+            "customers": len(customers), "orders": len(orders), "order_items": len(items),
+            "printers": len(printers), "filaments": len(filaments), "print_jobs": len(jobs),
+            "filament_transactions": transactions,
+        }
+
+    # ---- catalog ----
+
+    def materials(self):
+        return _bulk(self.scoped(Material), [
+            Material(workspace=self.workspace, material_name=name, material_code=name.lower(),
+                     density=density, cost_per_kg=cost)
+            for name, density, cost in MATERIALS
+        ])
+
+    def colors(self):
+        return _bulk(self.scoped(Color), [
+            Color(workspace=self.workspace, color_name=name, color_code=name[:3].upper(), hex_value=hex_value)
+            for name, hex_value in COLORS
+        ])
+
+    def products(self):
+        rng = self.rng
+        return _bulk(self.scoped(Product), [
+            Product(
+                workspace=self.workspace,
+                sku=f"SKU-{n:06d}",
+                ean=f"{rng.randrange(10**12, 10**13)}",
+                title=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {n}",
+                description="Synthetic product. " * rng.randint(1, 8),
+                product_type=self.product_type,
+                price=_money(rng.uniform(4, 80)),
+                is_personalized=rng.random() < 0.2,
+                assembly_time_minutes=rng.choice([0, 0, 5, 10, 20]),
+            )
+            for n in range(self.scale.products)
+        ])
+
+    # ---- orders ----
+
+    def customers(self):
+        rng = self.rng
+        return _bulk(self.scoped(Customer), [
+            Customer(
+                workspace=self.workspace,
+                platform=rng.choice(self.platforms),
+                external_id=f"C{n}",
+                name=f"Customer {n}",
+                # a share of marketplace customers come without an email
+                email=f"customer{n}@example.com" if rng.random() < 0.8 else None,
+                phone=f"+216{rng.randrange(10**7, 10**8)}",
+                address=f"{rng.randint(1, 200)} Rue {rng.choice(WORDS)}, Tunis",
+            )
+            for n in range(self.scale.customers)
+        ])
+
+    def orders(self, customers, products):
+        rng, scale = self.rng, self.scale
+        orders, lines = [], []
+        for n in range(scale.orders):
+            customer = rng.choice(customers)
+            locked = customer.platform.platform_name != "Manual"
+            created = self.now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+            chosen = rng.sample(products, rng.randint(1, min(scale.items_per_order, len(products))))
+            order_lines = []
+            for product in chosen:
+                quantity = Decimal(rng.choice([1, 1, 1, 2, 3, 5]))
+                line = OrderItem(
+                    product=product, quantity=quantity, unit_price=product.price,
+                    total_price=_money(product.price * quantity), is_personalized=product.is_personalized,
+                    attributes={"text": f"Name {n}"} if product.is_personalized else {},
+                )
+                order_lines.append(line)
+            total = sum(line.total_price for line in order_lines)
+            status = rng.choice(self.statuses)
+            orders.append(Order(
+                workspace=self.workspace,
+                order_number=f"{n + 1:07d}",
+                customer=customer,
+                status=status,
+                platform=customer.platform,
+                external_id=f"O{n}" if locked else None,
+                total_cost=total,
+                external_total_cost=total if locked else None,
+                totals_locked=locked,
+                currency="EUR" if locked else "TND",
+                paid_at=created + timedelta(minutes=5) if status.status_name != "New" else None,
+                is_personalized=any(line.is_personalized for line in order_lines),
+                shipping_address=customer.address,
+            ))
+            lines.append((created, order_lines))
+
+        orders = _bulk(self.scoped(Order), orders)
+        # auto_now_add ignores given values; spread creation times afterwards
+        for order, (created, _) in zip(orders, lines):
+            order.created_at = order.updated_at = created
+        self.scoped(Order).bulk_update(orders, ["created_at", "updated_at"], batch_size=BATCH_SIZE)
+
+        items = []
+        for order, (_, order_lines) in zip(orders, lines):
+            for line in order_lines:
+                line.order = order
+                items.append(line)
+        return orders, _bulk(self.scoped(OrderItem), items)
+
+    # ---- production ----
+
+    def printers(self):
+        rng = self.rng
+        return _bulk(self.scoped(Printer), [
+            Printer(
+                workspace=self.workspace,
+                machine_name=f"P{n:03d}",
+                printer_type=rng.choice(self.printer_types),
+                location=f"Rack {n // 10 + 1}",
+                status=rng.choice(Printer.Status.values),
+            )
+            for n in range(self.scale.printers)
+        ])
+
+    def filaments(self, materials, colors):
+        rng = self.rng
+        return _bulk(self.scoped(Filament), [
+            Filament(
+                workspace=self.workspace,
+                material=rng.choice(materials),
+                color=rng.choice(colors),
+                filament_name=f"Spool {n}",
+                filament_code=f"{self.workspace.pk}-F{n:05d}",
+                cost_per_gram=Decimal(rng.randint(150, 800)) / 10000,
+                location=f"Shelf {n % 8 + 1}",
+            )
+            for n in range(self.scale.filaments)
+        ])
+
+    def jobs(self, items, printers, filaments):
+        rng = self.rng
+        jobs = []
+        for item in items:
+            if rng.random() >= self.scale.jobs_per_item:
+                continue
+            status = rng.choice(PrintJob.Status.values)
+            done = status in (PrintJob.Status.COMPLETED, PrintJob.Status.FAILED)
+            estimate = rng.randint(20, 600)
+            jobs.append(PrintJob(
+                workspace=self.workspace,
+                order_item=item,
+                product_id=item.product_id,
+                printer=rng.choice(printers) if status != PrintJob.Status.PENDING and printers else None,
+                filament_used=rng.choice(filaments) if filaments else None,
+                status=status,
+                priority=rng.randint(1, 5),
+                estimated_print_time=estimate,
+                actual_print_time=int(estimate * rng.uniform(0.8, 1.3)) if done else None,
+                material_used_grams=Decimal(rng.randint(10, 400)) if done else None,
+            ))
+        return _bulk(self.scoped(PrintJob), jobs)
+
+    def transactions(self, filaments, jobs):
+        """Stock movements per spool, with running balances like the posting signal keeps."""
+        rng = self.rng
+        jobs_by_filament = {}
+        for job in jobs:
+            if job.material_used_grams:
+                jobs_by_filament.setdefault(job.filament_used_id, []).append(job)
+        scoped, batch, total = self.scoped(FilamentTransaction), [], 0
+        for filament in filaments:
+            stock = Decimal(0)
+            used = jobs_by_filament.get(filament.pk, [])
+            for n in range(self.scale.transactions):
+                if n == 0 or stock < 300:
+                    kind, quantity, job = FilamentTransaction.Kind.IN, Decimal(1000 * rng.randint(1, 5)), None
+                elif used and rng.random() < 0.8:
+                    job = used.pop()
+                    kind, quantity = FilamentTransaction.Kind.OUT, min(job.material_used_grams, stock)
+                else:
+                    kind, quantity, job = FilamentTransaction.Kind.WASTE, Decimal(rng.randint(1, 40)), None
+                    quantity = min(quantity, stock)
+                previous = stock
+                stock += quantity if kind == FilamentTransaction.Kind.IN else -quantity
+                batch.append(FilamentTransaction(
+                    filament=filament, kind=kind, quantity_grams=quantity, previous_stock=previous,
+                    new_stock=stock, print_job=job, created_by="datagen",
+                ))
+            filament.current_stock_grams = stock
+            if len(batch) >= BATCH_SIZE:
+                total += len(_bulk(scoped, batch))
+                batch = []
+        total += len(_bulk(scoped, batch))
+        self.scoped(Filament).bulk_update(filaments, ["current_stock_grams"], batch_size=BATCH_SIZE)
+        return total
+
@@ -0,0 +1,78 @@
+"""Database routing: read replicas with read-your-writes stickiness.
+
+Reads go to a random alias in ``settings.READ_REPLICAS`` unless the current
+request/task is pinned to the primary. Any write pins the rest of the
+request, and :class:`~core.middleware.ReplicaPinMiddleware` keeps the client
+on the primary for ``REPLICA_PIN_SECONDS`` afterwards (via a cookie) so it
+never reads data older than its own writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_routing = ContextVar("db_routing", default=None)
+
+
+class RoutingState:
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def _state():
+    state = _routing.get()
+    if state is None:
+        # outside a request (shell, commands): pin lazily on first write
+        state = RoutingState()
+        _routing.set(state)
+    return state
+
+
+def reset_routing(pinned=False):
+    """Start a fresh routing scope (per request / per Celery task)."""
+    state = RoutingState(pinned)
+    _routing.set(state)
+    return state
+
+
+@contextmanager
+def use_primary():
+    state = _state()
+    previous, state.pinned = state.pinned, True
+    try:
+        yield
+    finally:
+        state.pinned = previous
+
+
+def read_replicas():
+    return getattr(settings, "READ_REPLICAS", [])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = read_replicas()
+        if not replicas or _state().pinned:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state()
+        state.pinned = True
+        state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {"default", *read_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in read_replicas():
+            return False
+        return None
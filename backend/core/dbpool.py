@@ -0,0 +1,205 @@
+"""Database connection metrics for persistent and pooled connections.
+
+``settings.DB_CONN_MODE`` picks how connections are reused:
+
+* ``persistent`` – one connection per worker thread, kept for
+  ``CONN_MAX_AGE`` seconds and health-checked before reuse;
+* ``pool`` – a psycopg 3 ``ConnectionPool`` per alias and process (idle and
+  old connections are recycled by the pool itself);
+* ``none`` – a new connection per request / task (Django's default).
+
+Under ASGI ``persistent`` means ``pool`` where psycopg's pool is
+installed: sync code runs in executor threads that outlive requests, so
+every one of them holds its own connection for ``CONN_MAX_AGE``. Without
+the pool it stays ``persistent`` (with a warning) rather than reconnecting
+on every request.
+
+:func:`configure` applies the mode to ``DATABASES`` from the settings
+module. Connect timings are collected by the ``core.backends`` engines;
+counters are per process.
+"""
+import importlib.util
+import os
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+MODES = ("persistent", "pool", "none")
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def pooling_available():
+    """Whether psycopg 3 and its pool package are installed."""
+    return all(importlib.util.find_spec(name) is not None for name in ("psycopg", "psycopg_pool"))
+
+
+def configure(databases, mode, environ=os.environ, asgi=False):
+    """Apply connection reuse ``mode`` to ``databases`` in place; return the mode in effect.
+
+    ``pool`` falls back to ``persistent`` on SQLite (pooling is a PostgreSQL
+    backend feature) and, with a warning, when psycopg 3's pool is missing.
+    With ``asgi``, ``persistent`` becomes ``pool`` where available and
+    otherwise stays, with a warning.
+    """
+    if mode not in MODES:
+        raise ImproperlyConfigured(f"DB_CONN_MODE must be persistent, pool or none, not {mode!r}")
+    sqlite = databases["default"]["ENGINE"].endswith("sqlite3")
+    if mode == "pool" and not sqlite and not pooling_available():
+        warnings.warn("DB_CONN_MODE=pool needs psycopg[pool]; using persistent connections", RuntimeWarning)
+        mode = "persistent"
+    if mode == "pool" and sqlite:
+        mode = "persistent"
+    if mode == "persistent" and asgi and not sqlite:
+        if pooling_available():
+            mode = "pool"
+        else:
+            warnings.warn(
+                "Under ASGI persistent connections are kept per executor thread; "
+                "install psycopg[pool] to pool them", RuntimeWarning,
+            )
+    for db in databases.values():
+        db["CONN_HEALTH_CHECKS"] = True
+        if mode == "persistent":
+            db["CONN_MAX_AGE"] = int(environ.get("DB_CONN_MAX_AGE", "60"))
+        elif mode == "pool":
+            db["CONN_MAX_AGE"] = 0
+            db.setdefault("OPTIONS", {})["pool"] = {
+                "min_size": int(environ.get("DB_POOL_MIN_SIZE", "2")),
+                "max_size": int(environ.get("DB_POOL_MAX_SIZE", "10")),
+                # seconds a request waits for a free connection before erroring
+                "timeout": float(environ.get("DB_POOL_TIMEOUT", "10")),
+                # idle connections above min_size are closed after this long, and
+                # every connection is replaced after max_lifetime (+-5% jitter)
+                "max_idle": float(environ.get("DB_POOL_MAX_IDLE", "300")),
+                "max_lifetime": float(environ.get("DB_POOL_MAX_LIFETIME", "1800")),
+            }
+        else:
+            db["CONN_MAX_AGE"] = 0
+    return mode
+
+
+def _alias_stats(alias):
+    stats = _stats.get(alias)
+    if stats is None:
+        stats = _stats.setdefault(alias, {
+            "connects": 0,
+            "connect_errors": 0,
+            "connect_ms_total": 0.0,
+            "connect_ms_max": 0.0,
+            "connect_ms_last": 0.0,
+            "open": 0,
+            "closes": 0,
+        })
+    return stats
+
+
+@contextmanager
+def track_connect(alias):
+    """Time opening (or, with a pool, checking out) a connection."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        with _lock:
+            _alias_stats(alias)["connect_errors"] += 1
+        raise
+    elapsed = (time.perf_counter() - start) * 1000
+    with _lock:
+        stats = _alias_stats(alias)
+        stats["connects"] += 1
+        stats["open"] += 1
+        stats["connect_ms_total"] += elapsed
+        stats["connect_ms_last"] = elapsed
+        stats["connect_ms_max"] = max(stats["connect_ms_max"], elapsed)
+
+
+def record_close(alias):
+    with _lock:
+        stats = _alias_stats(alias)
+        stats["open"] = max(stats["open"] - 1, 0)
+        stats["closes"] += 1
+
+
+def _pool_of(alias):
+    conn = connections[alias]
+    return getattr(conn, "pool", None) if conn.vendor == "postgresql" else None
+
+
+def pool_stats(alias):
+    """psycopg_pool gauges for ``alias`` or ``None`` when it is not pooled."""
+    try:
+        pool = _pool_of(alias)
+    except Exception:
+        return None
+    if pool is None:
+        return None
+    raw = pool.get_stats()
+    return {
+        "size": raw.get("pool_size", 0),
+        "available": raw.get("pool_available", 0),
+        "in_use": raw.get("pool_size", 0) - raw.get("pool_available", 0),
+        "waiting": raw.get("requests_waiting", 0),
+        "min_size": raw.get("pool_min", pool.min_size),
+        "max_size": raw.get("pool_max", pool.max_size),
+        "wait_ms_total": raw.get("requests_wait_ms", 0),
+        "timeouts": raw.get("requests_errors", 0),
+        "connect_ms_total": raw.get("connections_ms", 0),
+        "connections_lost": raw.get("connections_lost", 0),
+    }
+
+
+def snapshot():
+    """Per-alias connection metrics for this process."""
+    with _lock:
+        local = {alias: dict(stats) for alias, stats in _stats.items()}
+    result = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        stats = local.get(alias, {})
+        connects = stats.get("connects", 0)
+        entry = {
+            "mode": settings.DB_CONN_MODE,
+            "conn_max_age": settings_dict.get("CONN_MAX_AGE", 0),
+            "health_checks": settings_dict.get("CONN_HEALTH_CHECKS", False),
+            "connects": connects,
+            "connect_errors": stats.get("connect_errors", 0),
+            "connect_ms_avg": round(stats["connect_ms_total"] / connects, 3) if connects else None,
+            "connect_ms_max": round(stats.get("connect_ms_max", 0.0), 3),
+            "connect_ms_last": round(stats.get("connect_ms_last", 0.0), 3),
+            "open": stats.get("open", 0),
+        }
+        pool = pool_stats(alias) if settings_dict.get("OPTIONS", {}).get("pool") else None
+        if pool is not None:
+            entry["pool"] = pool
+            entry["in_use"] = pool["in_use"]
+            entry["waiting"] = pool["waiting"]
+        else:
+            entry["in_use"] = entry["open"]
+            entry["waiting"] = 0
+        result[alias] = entry
+    return result
+
+
+def reset_after_fork():
+    """Forget connections and pools inherited from a parent process.
+
+    Nothing is closed: closing would send a terminate message on sockets the
+    parent still uses. The child opens its own on first use.
+    """
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+    for alias in list(connections):
+        settings_dict = connections.settings[alias]
+        if settings_dict.get("OPTIONS", {}).get("pool"):
+            pools = getattr(type(connections[alias]), "_connection_pools", None)
+            if pools is not None:
+                pools.pop(alias, None)
+    with _lock:
+        _stats.clear()
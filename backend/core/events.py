@@ -0,0 +1,279 @@
+"""Workspace event streams: push compact change deltas to connected clients.
+
+Writers publish lists of events (``{"type": "job", "id": 7, "status": ...}``)
+for a workspace; :func:`publish_changes` does it for a model's saves and
+deletes after commit. The broker fans them out to every web process, where
+the :class:`Hub` hands them to the :class:`Subscription` of each open
+stream (``production.agent.event_stream``).
+
+Subscriptions coalesce: pending events are keyed by ``(type, id)``, so a
+burst of changes to one job reaches the client as a single event with the
+latest state, and a slow client holds at most one entry per object. When
+even that exceeds ``EVENTS_MAX_PENDING`` the backlog is dropped and the
+client is sent ``resync`` (refetch its listings, which revalidate cheaply
+against :mod:`core.response_cache`).
+
+Brokers:
+
+* Redis pub/sub (``EVENTS_BROKER_URL``): one connection per process
+  subscribes to every workspace channel on behalf of all its streams, so an
+  idle stream costs a dict entry and a suspended coroutine, not a socket or
+  a thread.
+* In-process (no URL): the local stand-in. It only reaches streams of the
+  process that published, which is enough for runserver and tests.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .response_cache import _instance_workspace_id
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "events"
+
+
+# ---- local fan-out ----
+
+class Subscription:
+    """One open stream's view of a workspace's events; lives on its event loop."""
+
+    def __init__(self, hub, workspace_id):
+        self.hub = hub
+        self.workspace_id = workspace_id
+        self.loop = asyncio.get_running_loop()
+        self.pending = {}
+        self.overflow = False
+        self._ready = asyncio.Event()
+
+    def put(self, events):
+        for event in events:
+            key = (event["type"], event.get("id"))
+            # re-insert so events leave in the order of their latest change
+            self.pending.pop(key, None)
+            self.pending[key] = event
+        if len(self.pending) > settings.EVENTS_MAX_PENDING:
+            self.pending.clear()
+            self.overflow = True
+        self._ready.set()
+
+    def resync(self):
+        self.pending.clear()
+        self.overflow = True
+        self._ready.set()
+
+    async def get(self, timeout):
+        """Wait up to ``timeout`` seconds for events; returns ``(events, overflow)``.
+
+        After the first event arrives, waits ``EVENTS_COALESCE_WINDOW`` more
+        so the rest of a burst goes out in the same write.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return [], False
+        if settings.EVENTS_COALESCE_WINDOW:
+            await asyncio.sleep(settings.EVENTS_COALESCE_WINDOW)
+        self._ready.clear()
+        events, overflow = list(self.pending.values()), self.overflow
+        self.pending, self.overflow = {}, False
+        return ([] if overflow else events), overflow
+
+    def close(self):
+        self.hub.remove(self)
+
+
+class Hub:
+    """Open subscriptions of this process, by workspace."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, workspace_id):
+        subscription = Subscription(self, workspace_id)
+        with self._lock:
+            self._subscriptions[workspace_id].add(subscription)
+        return subscription
+
+    def remove(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.workspace_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.workspace_id]
+
+    def count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscriptions.values())
+
+    def dispatch(self, workspace_id, events):
+        """Hand ``events`` to the workspace's subscriptions; callable from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(workspace_id, ()))
+        for subscription in subscriptions:
+            self._call(subscription, subscription.put, events)
+
+    def resync_all(self):
+        with self._lock:
+            subscriptions = [s for group in self._subscriptions.values() for s in group]
+        for subscription in subscriptions:
+            self._call(subscription, subscription.resync)
+
+    def _call(self, subscription, func, *args):
+        try:
+            subscription.loop.call_soon_threadsafe(func, *args)
+        except RuntimeError:
+            # its event loop is gone (worker shut down mid-stream)
+            self.remove(subscription)
+
+
+hub = Hub()
+
+
+# ---- brokers ----
+
+class LocalBroker:
+    def publish(self, workspace_id, events):
+        hub.dispatch(workspace_id, events)
+
+    def ensure_listening(self):
+        pass
+
+
+class RedisBroker:
+    """Redis pub/sub on ``events:<workspace_id>``, one listener per process."""
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+        self._listener = None
+
+    def publish(self, workspace_id, events):
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(f"{CHANNEL_PREFIX}:{workspace_id}", json.dumps(events, cls=DjangoJSONEncoder))
+
+    def ensure_listening(self):
+        """Start the listener on the running event loop unless it already runs there."""
+        loop = asyncio.get_running_loop()
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self):
+        from redis import asyncio as aioredis
+
+        delay, connected_before = 1, False
+        while True:
+            try:
+                client = aioredis.Redis.from_url(self.url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{CHANNEL_PREFIX}:*")
+                    if connected_before:
+                        # events published while disconnected are lost
+                        hub.resync_all()
+                    connected_before, delay = True, 1
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        workspace_id = int(message["channel"].rsplit(b":", 1)[1])
+                        hub.dispatch(workspace_id, json.loads(message["data"]))
+            except (redis.RedisError, OSError, ValueError) as exc:
+                logger.warning("Event listener disconnected (%s); retrying in %ss", exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        url = settings.EVENTS_BROKER_URL
+        _broker = RedisBroker(url) if url else LocalBroker()
+    return _broker
+
+
+def publish(workspace_id, events):
+    """Send ``events`` to the workspace's streams; failures are logged, never raised."""
+    try:
+        get_broker().publish(workspace_id, events)
+    except (redis.RedisError, OSError) as exc:
+        logger.warning("Could not publish %d event(s) for workspace %s: %s", len(events), workspace_id, exc)
+
+
+def subscribe(workspace_id):
+    get_broker().ensure_listening()
+    return hub.subscribe(workspace_id)
+
+
+# ---- model changes ----
+
+class ChangeTrackingMixin:
+    """Remembers ``event_fields`` (attnames) as loaded, so saves can tell whether they changed.
+
+    ``post_save`` receivers compare :meth:`event_state` with
+    ``_event_state``, the state before this save (``None`` for new rows).
+    """
+
+    event_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._event_state = instance.event_state()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # after post_save, so every receiver saw the previous state
+        self._event_state = self.event_state()
+
+    def previous_event_state(self):
+        return getattr(self, "_event_state", None) or {}
+
+    def event_state(self):
+        # __dict__, not getattr: a deferred field must not cost a query
+        return {name: self.__dict__.get(name) for name in self.event_fields}
+
+
+def publish_changes(model, event_type):
+    """Publish ``event_type`` events when ``model`` rows are created, deleted or change ``event_fields``."""
+
+    def saved(sender, instance, created, using=None, update_fields=None, **kwargs):
+        state = instance.event_state()
+        if not created and state == getattr(instance, "_event_state", None):
+            return
+        _publish_on_commit(instance, {"type": event_type, "id": instance.pk, **state}, using)
+
+    def deleted(sender, instance, using=None, **kwargs):
+        _publish_on_commit(instance, {"type": event_type, "id": instance.pk, "deleted": True}, using)
+
+    def _publish_on_commit(instance, event, using):
+        workspace_id = _instance_workspace_id(instance)
+        if workspace_id is not None:
+            transaction.on_commit(lambda: publish(workspace_id, [event]), using=using)
+
+    uid = f"events:{model._meta.label}"
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
+
+
+def format_sse(event, data=None, retry=None):
+    """One Server-Sent Events message."""
+    lines = []
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data or {}, cls=DjangoJSONEncoder, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
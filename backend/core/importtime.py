@@ -0,0 +1,96 @@
+"""Cold-start measurements: ``python -X importtime`` parsed into tables.
+
+:func:`measure` starts a fresh interpreter with the given settings module,
+loads what a process of that kind loads (``django.setup()``, plus the Celery
+app and every task module for ``target="celery"``) and returns the parsed
+import times together with wall time and resident memory once loaded::
+
+    result = measure("backend.settings_worker", target="celery")
+    result["import_ms"], result["rss_mb"], result["packages"][:10]
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+TARGETS = {
+    "setup": "import django; django.setup()",
+    "celery": (
+        "import django; django.setup()\n"
+        "from backend.celery_app import app\n"
+        "app.loader.import_default_modules()"
+    ),
+}
+
+# runs last in the child; stdout carries only this line. Resident memory
+# comes from /proc: ru_maxrss would include the parent's peak from before exec
+_REPORT = (
+    "\nimport json, resource, sys\n"
+    "try:\n"
+    "    rss = next(int(l.split()[1]) for l in open('/proc/self/status') if l.startswith('VmRSS:'))\n"
+    "except OSError:\n"
+    "    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+    "print(json.dumps({'rss_kb': rss, 'modules': len(sys.modules)}))"
+)
+
+
+def parse(lines):
+    """``[(module, self_us, cumulative_us, depth)]`` from ``-X importtime`` output."""
+    rows = []
+    for line in lines:
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def summarize(rows, top=20):
+    """Totals, self time per top-level package and the slowest imports (cumulative)."""
+    packages = defaultdict(lambda: [0, 0])
+    for module, self_us, _, _ in rows:
+        entry = packages[module.split(".")[0]]
+        entry[0] += 1
+        entry[1] += self_us
+    by_package = sorted(packages.items(), key=lambda item: item[1][1], reverse=True)
+    slowest = sorted(rows, key=lambda row: row[2], reverse=True)
+    return {
+        "imported": len(rows),
+        "import_ms": round(sum(row[1] for row in rows) / 1000, 1),
+        "packages": [
+            {"package": name, "modules": count, "self_ms": round(us / 1000, 1)}
+            for name, (count, us) in by_package[:top]
+        ],
+        "slowest": [
+            {"module": module, "cumulative_ms": round(cumulative / 1000, 1), "depth": depth}
+            for module, _, cumulative, depth in slowest[:top]
+        ],
+    }
+
+
+def measure(settings_module, target="celery", top=20):
+    """Import ``target`` in a fresh interpreter under ``settings_module`` and summarize it."""
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", TARGETS[target] + _REPORT],
+        capture_output=True, text=True, env=env, cwd=Path(__file__).resolve().parent.parent,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    process = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        "settings": settings_module,
+        "target": target,
+        "wall_ms": round(wall * 1000, 1),
+        "rss_mb": round(process["rss_kb"] / 1024, 1),
+        "modules": process["modules"],
+        **summarize(parse(proc.stderr.splitlines()), top),
+    }
@@ -0,0 +1,25 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from core.datagen import SCALES, generate, scaled
+
+
+class Command(BaseCommand):
+    help = "Create workspaces filled with synthetic customers, catalog, orders, jobs and filament stock."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(SCALES), default="small")
+        parser.add_argument("--factor", type=float, default=1.0, help="Multiply the per-workspace counts")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="bench", help="Workspace name prefix")
+        parser.add_argument("--output", help="Write the JSON summary to this path")
+
+    def handle(self, *args, **opts):
+        scale = scaled(opts["scale"], opts["factor"])
+        summary = generate(scale, seed=opts["seed"], prefix=opts["prefix"])
+        data = json.dumps(summary, indent=2)
+        if opts["output"]:
+            Path(opts["output"]).write_text(data)
+        self.stdout.write(data)
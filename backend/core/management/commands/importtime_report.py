@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importtime import TARGETS, measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Cold-start report: import time (python -X importtime, per package and slowest modules), "
+        "wall time and resident memory of a fresh process under each settings module."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settings-module", nargs="+", dest="modules",
+            default=["backend.settings", "backend.settings_worker"],
+        )
+        parser.add_argument("--target", choices=sorted(TARGETS), default="celery",
+                            help="setup: django.setup(); celery: also the Celery app and task modules")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per settings module; the fastest is kept")
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+        parser.add_argument("--output", help="Write the JSON report to this path")
+        parser.add_argument("--max-ms", type=float, help="Fail when a module's import time exceeds this")
+        parser.add_argument("--max-rss-mb", type=float, help="Fail when a module's resident memory exceeds this")
+
+    def handle(self, *args, **opts):
+        results = []
+        for module in opts["modules"]:
+            try:
+                runs = [measure(module, opts["target"], opts["top"]) for _ in range(max(opts["repeat"], 1))]
+            except RuntimeError as exc:
+                raise CommandError(f"{module}: {exc}")
+            results.append(min(runs, key=lambda r: r["import_ms"]))
+
+        if opts["output"]:
+            Path(opts["output"]).write_text(json.dumps(results, indent=2))
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for result in results:
+                self._table(result)
+
+        over = [
+            r["settings"] for r in results
+            if (opts["max_ms"] and r["import_ms"] > opts["max_ms"])
+            or (opts["max_rss_mb"] and r["rss_mb"] > opts["max_rss_mb"])
+        ]
+        if over:
+            raise CommandError(f"Over budget: {', '.join(over)}")
+
+    def _table(self, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{result['settings']} ({result['target']}): {result['import_ms']} ms importing "
+            f"{result['imported']} modules, {result['wall_ms']} ms wall, {result['rss_mb']} MB RSS"
+        ))
+        self.stdout.write(f"  {'package':<32}{'modules':>8}{'self ms':>10}")
+        for row in result["packages"]:
+            self.stdout.write(f"  {row['package']:<32}{row['modules']:>8}{row['self_ms']:>10}")
+        self.stdout.write(f"\n  {'slowest imports':<48}{'cumulative ms':>14}")
+        for row in result["slowest"]:
+            name = "  " * row["depth"] + row["module"]
+            self.stdout.write(f"  {name:<48}{row['cumulative_ms']:>14}")
+        self.stdout.write("")
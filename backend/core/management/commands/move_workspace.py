@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Sum
+
+from core import sharding
+from core.models import Workspace
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a workspace's rows to another database shard by streaming them in bulk, "
+        "then point the workspace at the new shard. Run it while the workspace is idle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("workspace", help="Workspace id or name")
+        parser.add_argument("target", help="Target database alias")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--keep-source", action="store_true", help="Do not delete the rows on the old shard")
+        parser.add_argument(
+            "--purge", action="store_true",
+            help="Only delete the workspace's rows left on TARGET by an interrupted move",
+        )
+
+    def handle(self, *args, **opts):
+        workspace = self._workspace(opts["workspace"])
+        source, target = workspace.db_alias, opts["target"]
+        if target not in settings.DATABASES:
+            raise CommandError(f"Unknown database alias {target!r}")
+        if target != "default" and target not in sharding.shards():
+            raise CommandError(f"{target!r} is not listed in WORKSPACE_SHARDS")
+        if source == target:
+            raise CommandError(f"Workspace already lives on {target!r}")
+
+        models = sharding.sharded_models()
+        if opts["purge"]:
+            self._delete(models, workspace, target)
+            self.stdout.write(self.style.SUCCESS(f"Removed {workspace}'s leftover rows from {target}"))
+            return
+
+        for alias in (source, target):
+            sharding.reserve_key_ranges(alias)
+        self._check_free_keys(models, workspace, source, target, opts["batch_size"])
+        if target != "default":
+            sharding.sync_reference_data(target)
+            sharding.sync_workspace_anchor(workspace, target)
+
+        with transaction.atomic(using=target):
+            for model in models:
+                rows = self._rows(model, workspace, source).iterator(chunk_size=opts["batch_size"])
+                copied = sharding.copy_rows(model, rows, target, batch_size=opts["batch_size"])
+                expected = self._rows(model, workspace, source).count()
+                if copied != expected:
+                    raise CommandError(f"{model._meta.label}: copied {copied} of {expected} rows; aborting")
+                self.stdout.write(f"{model._meta.label}: {copied} rows")
+            escaped = sharding.escaped_key_ranges(target)
+            if escaped:
+                labels = ", ".join(m._meta.label for m in escaped)
+                raise CommandError(
+                    f"{target} would issue keys outside its range for {labels} (SQLite counters follow "
+                    f"the largest key copied in); aborting"
+                )
+
+        # the target has committed; only switch over once it holds exactly the source's rows
+        for model in models:
+            if self._fingerprint(model, workspace, source) != self._fingerprint(model, workspace, target):
+                raise CommandError(
+                    f"{model._meta.label}: {target} does not match {source} after the copy; the workspace "
+                    f"still lives on {source}. Remove the copy with --purge and try again."
+                )
+        workspace.db_alias = target
+        workspace.save(update_fields=["db_alias"])
+
+        if not opts["keep_source"]:
+            try:
+                self._delete(models, workspace, source)
+            except DatabaseError as exc:
+                raise CommandError(
+                    f"{workspace} now lives on {target}, but deleting its rows from {source} failed ({exc}). "
+                    f"Run move_workspace {workspace.pk} {source} --purge to remove them."
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"{workspace} moved from {source} to {target}"))
+
+    def _rows(self, model, workspace, alias):
+        lookup = getattr(model, "workspace_lookup", "workspace")
+        return model._base_manager.using(alias).filter(**{f"{lookup}_id": workspace.pk}).order_by("pk")
+
+    def _check_free_keys(self, models, workspace, source, target, batch_size):
+        """Refuse to copy rows whose keys the target already uses (rows from before key ranges)."""
+        for model in models:
+            taken = model._base_manager.using(target)
+            keys = self._rows(model, workspace, source).values_list("pk", flat=True).iterator(chunk_size=batch_size)
+            batch = []
+            for key in keys:
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    self._check_batch(model, taken, batch, target)
+                    batch = []
+            if batch:
+                self._check_batch(model, taken, batch, target)
+
+    def _check_batch(self, model, taken, keys, target):
+        clashes = list(taken.filter(pk__in=keys).values_list("pk", flat=True)[:5])
+        if clashes:
+            raise CommandError(
+                f"{model._meta.label}: keys {clashes} are already used on {target}; nothing was copied "
+                f"(if they are left from an interrupted move of this workspace, remove them with --purge)"
+            )
+
+    def _fingerprint(self, model, workspace, alias):
+        return self._rows(model, workspace, alias).order_by().aggregate(rows=Count("pk"), keys=Sum("pk"))
+
+    def _delete(self, models, workspace, alias):
+        with transaction.atomic(using=alias):
+            for model in reversed(models):
+                self._rows(model, workspace, alias)._raw_delete(alias)
+
+    def _workspace(self, value):
+        lookup = {"pk": value} if value.isdigit() else {"name": value}
+        try:
+            return Workspace.objects.using("default").get(**lookup)
+        except Workspace.DoesNotExist:
+            raise CommandError(f"Workspace {value!r} not found")
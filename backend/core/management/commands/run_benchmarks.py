@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import BENCHMARKS, compare, run_benchmarks
+from core.models import Workspace
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot paths (order item save, filament posting, job listing, import, export, "
+        "admin changelists) on a workspace and print query counts and wall times as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("workspace", help="Workspace id or name (see generate_dataset)")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+        parser.add_argument("--output", help="Write the JSON report to this path")
+        parser.add_argument("--baseline", help="Previous report; fail on query count or wall time regressions")
+        parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed median wall time ratio")
+
+    def handle(self, *args, **opts):
+        workspace = self._workspace(opts["workspace"])
+        report = run_benchmarks(workspace, repeat=opts["repeat"], only=opts["only"])
+        data = json.dumps(report, indent=2)
+        if opts["output"]:
+            Path(opts["output"]).write_text(data)
+        self.stdout.write(data)
+
+        if opts["baseline"]:
+            baseline = json.loads(Path(opts["baseline"]).read_text())
+            rows, regressions = compare(report, baseline, opts["tolerance"])
+            for row in rows:
+                self.stderr.write(
+                    f"{row['name']}: queries {row['queries'][0]} -> {row['queries'][1]}, "
+                    f"median {row['median_ms'][0]} -> {row['median_ms'][1]} ms (x{row['ratio']})"
+                )
+            if regressions:
+                raise CommandError(f"Regressions: {', '.join(regressions)}")
+
+    def _workspace(self, value):
+        lookup = {"pk": value} if value.isdigit() else {"name": value}
+        try:
+            return Workspace.objects.get(**lookup)
+        except Workspace.DoesNotExist:
+            raise CommandError(f"Workspace {value!r} not found")
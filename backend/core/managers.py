@@ -0,0 +1,69 @@
+from django.db import models
+
+
+class WorkspaceQuerySet(models.QuerySet):
+    """Queryset helpers for workspace-scoped models.
+
+    Models reach their workspace either directly (``workspace``) or through a
+    parent; set ``workspace_lookup = "order__workspace"`` on the model for the
+    latter.
+    """
+
+    def _lookup(self):
+        return getattr(self.model, "workspace_lookup", "workspace")
+
+    def for_workspace(self, workspace):
+        workspace_id = getattr(workspace, "pk", workspace)
+        qs = self.filter(**{f"{self._lookup()}_id": workspace_id})
+        if self._db is None:
+            from .sharding import shard_for
+
+            alias = shard_for(workspace_id)
+            if alias is not None:
+                qs = qs.using(alias)
+        return qs
+
+    def create(self, **kwargs):
+        if self._db is not None:
+            return super().create(**kwargs)
+        # an unpinned queryset has no instance for the router to go by;
+        # saving without ``using`` routes the new row by its workspace
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True)
+        return obj
+
+    def for_user(self, user):
+        """Rows in any workspace the user is a member of.
+
+        With sharding on, the queryset is pinned to the shard holding those
+        workspaces; a user whose workspaces span shards gets a ``ValueError``
+        (iterate :meth:`for_user_by_shard` instead), never a silent read of
+        ``default`` alone.
+        """
+        by_shard = self.for_user_by_shard(user)
+        if len(by_shard) > 1:
+            raise ValueError(
+                f"{self.model._meta.label}.for_user(): the user's workspaces live on "
+                f"{sorted(by_shard)}; use for_user_by_shard()"
+            )
+        return next(iter(by_shard.values()), self.none())
+
+    def for_user_by_shard(self, user):
+        """``{alias: queryset}`` covering every workspace the user is a member of."""
+        from .sharding import shard_for
+        from .utils import workspace_roles
+
+        by_alias = {}
+        for workspace_id in workspace_roles(user):
+            by_alias.setdefault(shard_for(workspace_id), []).append(workspace_id)
+        querysets = {}
+        for alias, workspace_ids in by_alias.items():
+            qs = self.filter(**{f"{self._lookup()}_id__in": workspace_ids})
+            if alias is not None and self._db is None:
+                qs = qs.using(alias)
+            querysets[alias or self.db] = qs
+        return querysets
+
+
+WorkspaceManager = models.Manager.from_queryset(WorkspaceQuerySet, "WorkspaceManager")
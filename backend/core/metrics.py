@@ -0,0 +1,338 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters and histograms are sharded per thread, so the hot path is a plain
+list update with no lock; :meth:`Metric.labels` pre-binds a label set once
+and callers keep the child. Reads add the shards up.
+
+With ``settings.METRICS_DIR`` set, every process (web workers, Celery
+workers) periodically writes its totals to ``<dir>/<pid>.json`` and the
+``/metrics`` view sums all files, so one scrape covers every process.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "printflow"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+FLUSH_SECONDS = 5.0
+_SEP = "\x1f"  # joins label values in snapshot keys
+
+
+class _Child:
+    """One label set; values live in per-thread lists."""
+
+    __slots__ = ("_local", "_shards", "_size")
+
+    def __init__(self, size):
+        self._local = threading.local()
+        self._shards = []
+        self._size = size
+
+    def _values(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = [0.0] * self._size
+            self._shards.append(values)  # list.append is atomic
+            return values
+
+    def totals(self):
+        out = [0.0] * self._size
+        for shard in list(self._shards):
+            for i, v in enumerate(shard):
+                out[i] += v
+        return out
+
+
+class CounterChild(_Child):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1.0):
+        self._values()[0] += amount
+
+
+class HistogramChild(_Child):
+    """Values: per-bucket counts (non-cumulative), then sum, then count."""
+
+    __slots__ = ("_buckets",)
+
+    def __init__(self, buckets):
+        super().__init__(len(buckets) + 2)
+        self._buckets = buckets
+
+    def observe(self, value):
+        values = self._values()
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                values[i] += 1
+                break
+        values[-2] += value
+        values[-1] += 1
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        self.name = f"{PREFIX}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets else None
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child for ``values`` (positional, in ``labelnames`` order); cache it."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def collect(self):
+        return {key: child.totals() for key, child in list(self._children.items())}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+
+REGISTRY = {}
+
+
+def _register(metric):
+    REGISTRY[metric.name] = metric
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ---- the application's metrics ----
+
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests.", ("view", "method", "status"))
+HTTP_LATENCY = histogram("http_request_duration_seconds", "HTTP request latency.", ("view",))
+HTTP_QUERIES = histogram(
+    "http_request_db_queries", "DB queries per HTTP request.", ("view",), buckets=QUERY_BUCKETS
+)
+HTTP_DB_SECONDS = counter("http_db_seconds_total", "Time spent in DB queries by HTTP requests.", ("view",))
+HTTP_RESPONSE_BYTES = counter("http_response_bytes_total", "HTTP response body bytes.", ("view",))
+HTTP_N_PLUS_ONE = counter("http_n_plus_one_total", "HTTP requests repeating one SQL template.", ("view",))
+
+TASK_RUNS = counter("task_runs_total", "Celery task executions.", ("task", "state"))
+TASK_LATENCY = histogram("task_duration_seconds", "Celery task run time.", ("task",))
+TASK_QUERIES = histogram("task_db_queries", "DB queries per Celery task.", ("task",), buckets=QUERY_BUCKETS)
+TASK_DB_SECONDS = counter("task_db_seconds_total", "Time spent in DB queries by Celery tasks.", ("task",))
+TASK_N_PLUS_ONE = counter("task_n_plus_one_total", "Celery tasks repeating one SQL template.", ("task",))
+
+
+# ---- query recording ----
+
+# recorders of the current request / task; a context variable, so queries run
+# by ``sync_to_async`` threads (async views under ASGI) are counted too
+_recorders = contextvars.ContextVar("query_recorders", default=())
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper every ``core.backends`` connection carries (see :class:`QueryRecorder`)."""
+    for recorder in _recorders.get():
+        execute = functools.partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` counting queries, DB time and repeated SQL templates.
+
+    :meth:`install` records the queries of the current context on every
+    connection and thread it uses, through :func:`record_query`.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.templates = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            # Django passes the SQL with placeholders, so this is already the template
+            self.templates[sql] += 1
+
+    def repeated(self, threshold):
+        """``(sql, count)`` of the most repeated template if it ran more than ``threshold`` times."""
+        if not self.templates:
+            return None
+        sql, count = max(self.templates.items(), key=lambda item: item[1])
+        return (sql, count) if count > threshold else None
+
+    def install(self):
+        stack = ExitStack()
+        previous = _recorders.get()
+        _recorders.set((*previous, self))
+        stack.callback(_recorders.set, previous)
+        return stack
+
+
+def check_n_plus_one(kind, name, recorder, counter_metric):
+    repeated = recorder.repeated(settings.METRICS_N_PLUS_ONE_THRESHOLD)
+    if repeated is not None:
+        counter_metric.labels(name).inc()
+        sql, count = repeated
+        logger.warning("Possible N+1 in %s %s: %d x %s", kind, name, count, sql[:300])
+
+
+# ---- multiprocess aggregation ----
+
+_last_flush = 0.0
+
+
+def snapshot():
+    return {
+        name: {_SEP.join(key): values for key, values in metric.collect().items()}
+        for name, metric in REGISTRY.items()
+    }
+
+
+def flush(force=False):
+    """Write this process's totals to ``METRICS_DIR`` (at most every ``FLUSH_SECONDS``)."""
+    global _last_flush
+    directory = settings.METRICS_DIR
+    now = time.monotonic()
+    if not directory or (not force and now - _last_flush < FLUSH_SECONDS):
+        return
+    _last_flush = now
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(snapshot(), fh)
+        os.replace(tmp, path)
+    except OSError as exc:
+        logger.warning("Could not write metrics to %s: %s", path, exc)
+
+
+atexit.register(flush, force=True)
+
+
+def aggregate():
+    """Totals over every process file plus this process's live values."""
+    merged = {name: defaultdict(lambda: None) for name in REGISTRY}
+    sources = []
+    directory = settings.METRICS_DIR
+    if directory and os.path.isdir(directory):
+        own = f"{os.getpid()}.json"
+        for filename in os.listdir(directory):
+            if not filename.endswith(".json") or filename == own:
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as fh:
+                    sources.append(json.load(fh))
+            except (OSError, ValueError):
+                continue  # being replaced or truncated; next scrape picks it up
+    sources.append(snapshot())
+    for source in sources:
+        for name, series in source.items():
+            if name not in merged:
+                continue
+            for key, values in series.items():
+                current = merged[name][key]
+                merged[name][key] = values if current is None else [a + b for a, b in zip(current, values)]
+    return merged
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def exposition(extra_lines=()):
+    """Prometheus text format (0.0.4) of all registered metrics."""
+    lines = []
+    for name, series in aggregate().items():
+        metric = REGISTRY[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, values in sorted(series.items()):
+            labelvalues = key.split(_SEP) if metric.labelnames else []
+            if metric.kind == "counter":
+                lines.append(f"{name}{_labels(metric.labelnames, labelvalues)} {values[0]:g}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(metric.buckets, values):
+                cumulative += count
+                le = _labels(metric.labelnames, labelvalues, [f'le="{bound:g}"'])
+                lines.append(f"{name}_bucket{le} {cumulative:g}")
+            inf = _labels(metric.labelnames, labelvalues, ['le="+Inf"'])
+            lines.append(f"{name}_bucket{inf} {values[-1]:g}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, labelvalues)} {values[-2]:g}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, labelvalues)} {values[-1]:g}")
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+# ---- Celery ----
+
+_running_tasks = {}
+
+
+def task_started(task_id, task):
+    recorder = QueryRecorder()
+    _running_tasks[task_id] = (recorder, recorder.install().__enter__(), time.perf_counter())
+
+
+def task_finished(task_id, task, state):
+    entry = _running_tasks.pop(task_id, None)
+    if entry is None:
+        return
+    recorder, stack, start = entry
+    stack.close()
+    name = task.name
+    TASK_RUNS.labels(name, state or "UNKNOWN").inc()
+    TASK_LATENCY.labels(name).observe(time.perf_counter() - start)
+    TASK_QUERIES.labels(name).observe(recorder.count)
+    TASK_DB_SECONDS.labels(name).inc(recorder.seconds)
+    check_n_plus_one("task", name, recorder, TASK_N_PLUS_ONE)
+    flush()
@@ -0,0 +1,135 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics, profiling
+from .db_routers import reset_routing
+from .utils import request_workspace_id
+
+
+class HybridMiddleware:
+    """Middleware that runs natively under both WSGI and ASGI.
+
+    A sync-only middleware makes Django push every request of an ASGI worker
+    through one shared thread, which defeats async views. Subclasses
+    implement ``before(request)`` (its return value is passed on) and
+    ``after(request, response, state)``; both must not block.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.before(request)
+        return self.after(request, self.get_response(request), state)
+
+    async def __acall__(self, request):
+        state = self.before(request)
+        return self.after(request, await self.get_response(request), state)
+
+    def before(self, request):
+        return None
+
+    def after(self, request, response, state):
+        return response
+
+
+class WorkspaceMiddleware(HybridMiddleware):
+    """Parse the requested workspace once per request into ``request.workspace_id``.
+
+    Membership/role lookups go through :func:`core.utils.workspace_roles`,
+    which memoises on ``request.user`` (also for users set later by DRF
+    authentication) and is cached across requests.
+    """
+
+    def before(self, request):
+        request.workspace_id = request_workspace_id(request)
+
+
+class ReplicaPinMiddleware(HybridMiddleware):
+    """Per-request read-your-writes stickiness for :class:`core.db_routers.ReplicaRouter`.
+
+    Unsafe methods and clients holding a fresh pin cookie read from the
+    primary; a request that writes sets the cookie for ``REPLICA_PIN_SECONDS``.
+    """
+
+    COOKIE = "db_pin"
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def before(self, request):
+        pinned = request.method not in self.SAFE_METHODS or self._pin_active(request)
+        return reset_routing(pinned=pinned)
+
+    def after(self, request, response, state):
+        if state.wrote:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                self.COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite="Lax"
+            )
+        reset_routing()
+        return response
+
+    def _pin_active(self, request):
+        try:
+            return float(request.COOKIES.get(self.COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Latency, DB queries / time, response size and N+1 flags per view (see :mod:`core.metrics`)."""
+
+    def before(self, request):
+        recorder = metrics.QueryRecorder()
+        return recorder, recorder.install().__enter__(), time.perf_counter()
+
+    def after(self, request, response, state):
+        recorder, stack, start = state
+        stack.close()
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        # unresolved paths share one label so scanners cannot blow up cardinality
+        view = (match.view_name or match._func_path) if match else "<unresolved>"
+        metrics.HTTP_REQUESTS.labels(view, request.method, response.status_code).inc()
+        metrics.HTTP_LATENCY.labels(view).observe(elapsed)
+        metrics.HTTP_QUERIES.labels(view).observe(recorder.count)
+        metrics.HTTP_DB_SECONDS.labels(view).inc(recorder.seconds)
+        if not response.streaming:
+            metrics.HTTP_RESPONSE_BYTES.labels(view).inc(len(response.content))
+        metrics.check_n_plus_one("view", view, recorder, metrics.HTTP_N_PLUS_ONE)
+        metrics.flush()
+        return response
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """Profile sampled / requested requests (see :mod:`core.profiling`).
+
+    Profiled responses carry ``X-Profile-Id`` so a slow request can be looked
+    up in ``/api/ops/profiles/`` afterwards. Under ASGI the sampler covers
+    the event loop and the ``sync_to_async`` threads, so it also sees
+    requests running concurrently.
+    """
+
+    def before(self, request):
+        workspace_id = request_workspace_id(request)
+        if not profiling.should_profile_request(request, workspace_id):
+            return None
+        return profiling.Profile("request", request.path, method=request.method, workspace_id=workspace_id)
+
+    def after(self, request, response, profile):
+        if profile is None:
+            return response
+        match = getattr(request, "resolver_match", None)
+        response["X-Profile-Id"] = profile.finish(
+            status=response.status_code, view=match.view_name if match else None
+        )
+        return response
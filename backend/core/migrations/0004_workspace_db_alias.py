@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_workspace_options_workspace_owner_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workspace',
+            name='db_alias',
+            field=models.CharField(default='default', max_length=50),
+        ),
+    ]
@@ -10,6 +10,8 @@ class Workspace(models.Model):
         related_name="owned_workspaces",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # database alias (shard) holding this workspace's scoped rows; see core.sharding
+    db_alias = models.CharField(max_length=50, default="default")
 
     class Meta:
         ordering = ["name"]
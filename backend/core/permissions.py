@@ -0,0 +1,33 @@
+from rest_framework import permissions
+
+from .models import Membership
+from .utils import request_workspace_id, workspace_role
+
+
+class IsWorkspaceMember(permissions.BasePermission):
+    """The request names a workspace (``X-Workspace-ID`` / ``?workspace=``) the user belongs to.
+
+    Role lookups are cached (:func:`core.utils.workspace_roles`), so this
+    works with :class:`authapp.authentication.StatelessJWTAuthentication`
+    without touching the database.
+    """
+
+    message = "Select a workspace you are a member of (X-Workspace-ID header)."
+
+    def has_permission(self, request, view):
+        workspace_id = request_workspace_id(request)
+        if workspace_id is None or workspace_role(request.user, workspace_id) is None:
+            return False
+        view.workspace_id = workspace_id
+        return True
+
+
+class CanWriteWorkspace(IsWorkspaceMember):
+    """A member of the selected workspace whose role may create rows (not a viewer)."""
+
+    message = "Select a workspace where your role can make changes (viewers cannot)."
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        return workspace_role(request.user, view.workspace_id) != Membership.VIEWER
@@ -0,0 +1,253 @@
+"""Opt-in profiling of production requests and Celery tasks.
+
+:class:`~core.middleware.ProfilingMiddleware` and the Celery signal hooks
+profile a request or task when :func:`should_profile_request` /
+:func:`should_profile_task` say so (sample rate, ``X-Profile`` header,
+listed workspaces or task names). Two profilers are available:
+
+* ``sample`` (default): a background thread snapshots the worker thread's
+  stack every ``PROFILING_INTERVAL`` seconds and writes collapsed stacks
+  (``frame;frame;frame count``), ready for flamegraph.pl or speedscope.
+  Overhead does not depend on how many Python calls the code makes. A
+  profile started on an event loop (async views under ASGI) samples every
+  busy thread instead, rooted at the thread name, since the request's sync
+  work runs in ``sync_to_async`` threads; concurrent requests show up too.
+* ``cprofile``: deterministic :mod:`cProfile`, written as a pstats dump
+  (``python -m pstats`` / snakeviz). Exact call counts, higher overhead.
+
+Profiles go to ``PROFILING_DIR``, which is a ring buffer: once it holds
+more than ``PROFILING_MAX_FILES`` profiles the oldest are deleted. Every
+profile has a ``<id>.json`` metadata file next to its data file.
+"""
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+HEADER = "HTTP_X_PROFILE"
+EXTENSIONS = {"sample": "collapsed", "cprofile": "prof"}
+# profile ids are generated here; anything else is rejected by the download view
+ID_RE = re.compile(r"^\d{8}T\d{12}-[a-z]+-[0-9a-f]{8}$")
+
+
+# ---- profilers ----
+
+# innermost frames of a thread that is waiting for work, not doing any
+IDLE_FILES = {"threading.py", "queue.py", "selectors.py"}
+
+
+class StackSampler:
+    """Samples one thread's Python stack (or every busy thread's) from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id  # None: all threads
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+                    self.samples += 1
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                self.stacks[f"{names.get(ident, ident)};{self._collapse(frame)}"] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def dump(self, path):
+        with open(path, "w") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+class _CProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.samples = None
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class Profile:
+    """One running profile; :meth:`finish` stops it and stores it in the ring buffer."""
+
+    def __init__(self, kind, name, **meta):
+        self.mode = settings.PROFILING_MODE
+        self.id = f"{timezone.now():%Y%m%dT%H%M%S%f}-{kind}-{uuid.uuid4().hex[:8]}"
+        self.meta = {"id": self.id, "kind": kind, "name": name, "mode": self.mode, "pid": os.getpid(), **meta}
+        if self.mode == "cprofile":
+            self.profiler = _CProfiler()
+        else:
+            thread_id = None if _on_event_loop() else threading.get_ident()
+            self.profiler = StackSampler(thread_id, settings.PROFILING_INTERVAL)
+        self._start = time.perf_counter()
+        self.profiler.start()
+
+    def finish(self, **meta):
+        self.profiler.stop()
+        self.meta.update(meta)
+        self.meta["duration_ms"] = round((time.perf_counter() - self._start) * 1000, 3)
+        self.meta["samples"] = self.profiler.samples
+        self.meta["created_at"] = timezone.now().isoformat()
+        try:
+            save(self)
+        except OSError as exc:
+            logger.warning("Could not store profile %s: %s", self.id, exc)
+        return self.id
+
+
+# ---- ring buffer ----
+
+def data_filename(meta):
+    return f"{meta['id']}.{EXTENSIONS.get(meta['mode'], 'dat')}"
+
+
+def save(profile):
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    profile.meta["file"] = data_filename(profile.meta)
+    profile.profiler.dump(os.path.join(directory, profile.meta["file"]))
+    profile.meta["size"] = os.path.getsize(os.path.join(directory, profile.meta["file"]))
+    tmp = os.path.join(directory, f".{profile.id}.json")
+    with open(tmp, "w") as fh:
+        json.dump(profile.meta, fh)
+    os.replace(tmp, os.path.join(directory, f"{profile.id}.json"))
+    prune()
+
+
+def prune():
+    """Drop the oldest profiles beyond ``PROFILING_MAX_FILES`` (ids sort by time)."""
+    directory = settings.PROFILING_DIR
+    ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json") and ID_RE.match(name[:-5]))
+    for profile_id in ids[:max(0, len(ids) - settings.PROFILING_MAX_FILES)]:
+        for name in os.listdir(directory):
+            if name.startswith(f"{profile_id}."):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass  # pruned concurrently by another process
+
+
+def list_profiles():
+    """Metadata of stored profiles, newest first."""
+    directory = settings.PROFILING_DIR
+    if not directory or not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".json") or not ID_RE.match(name[:-5]):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                profiles.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id):
+    """Data file of ``profile_id`` or ``None``; ids are validated, never joined raw."""
+    if not settings.PROFILING_DIR or not ID_RE.match(profile_id):
+        return None
+    for mode in EXTENSIONS:
+        path = os.path.join(settings.PROFILING_DIR, data_filename({"id": profile_id, "mode": mode}))
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# ---- selection ----
+
+def _sampled(rate):
+    return rate > 0 and random.random() < rate
+
+
+def should_profile_request(request, workspace_id=None):
+    if not settings.PROFILING_DIR:
+        return False
+    token = settings.PROFILING_TOKEN
+    header = request.META.get(HEADER)
+    if header and token and constant_time_compare(header, token):
+        return True
+    if workspace_id is not None and str(workspace_id) in settings.PROFILING_WORKSPACES:
+        return True
+    return _sampled(settings.PROFILING_SAMPLE_RATE)
+
+
+def should_profile_task(task):
+    if not settings.PROFILING_DIR:
+        return False
+    if task.name in settings.PROFILING_TASKS:
+        return True
+    return _sampled(settings.PROFILING_TASK_SAMPLE_RATE)
+
+
+# ---- Celery ----
+
+_running_tasks = {}
+
+
+def task_started(task_id, task):
+    if should_profile_task(task):
+        _running_tasks[task_id] = Profile("task", task.name, task_id=task_id)
+
+
+def task_finished(task_id, task, state):
+    profile = _running_tasks.pop(task_id, None)
+    if profile is not None:
+        profile.finish(status=state or "UNKNOWN")
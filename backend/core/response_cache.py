@@ -0,0 +1,111 @@
+"""Versioned response cache for polled, workspace-scoped API listings.
+
+Every (workspace, resource) pair has a version counter in the cache. Saves
+and deletes of the models feeding a resource bump it after commit (see
+:func:`track_changes`), and bulk writers that bypass signals call
+:func:`bump_resource_version` themselves. A listing depends on every model
+it serializes fields from, so views list all of those resources (e.g. print
+jobs show order numbers and product titles: ``print_jobs``, ``orders``,
+``catalog``). The global reference catalogs (statuses, platforms, printer
+types) feed ``reference``, one version shared by all workspaces. Responses are cached under the
+current versions, so a changed resource is never served stale and nothing
+has to be deleted; old entries just expire.
+
+:class:`core.api.CachedResponseMixin` derives the ETag from the versions
+and the request, so a client that sends ``If-None-Match`` while nothing
+changed gets a 304 after one cache round trip, without touching the
+database. This module stays free of DRF imports: model signals import it
+in every process, including workers.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+# resources with one version for every workspace
+GLOBAL_RESOURCES = {"reference"}
+
+
+def _version_key(workspace_id, resource):
+    if resource in GLOBAL_RESOURCES:
+        workspace_id = "all"
+    return f"respcache:version:{resource}:{workspace_id}"
+
+
+def bump_resource_version(workspace_id, resource):
+    """Invalidate every cached response of ``resource`` in ``workspace_id``."""
+    key = _version_key(workspace_id, resource)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # missing/evicted: restart from a value no earlier version could have used
+        cache.set(key, time.time_ns(), None)
+
+
+async def abump_resource_version(workspace_id, resource):
+    key = _version_key(workspace_id, resource)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, time.time_ns(), None)
+
+
+def resource_versions(workspace_id, resources):
+    """Current versions of ``resources`` (one cache round trip when all exist)."""
+    keys = {_version_key(workspace_id, r): r for r in resources}
+    found = cache.get_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        # add() so a concurrent first request does not reset a version just bumped
+        for key, value in missing.items():
+            cache.add(key, value, None)
+        found.update(cache.get_many(list(missing)))
+    return [found[key] for key in keys]
+
+
+async def aresource_versions(workspace_id, resources):
+    keys = {_version_key(workspace_id, r): r for r in resources}
+    found = await cache.aget_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        for key, value in missing.items():
+            await cache.aadd(key, value, None)
+        found.update(await cache.aget_many(list(missing)))
+    return [found[key] for key in keys]
+
+
+def _instance_workspace_id(instance):
+    """Follow ``workspace_lookup`` (e.g. ``order__workspace``) to the workspace id."""
+    path = getattr(type(instance), "workspace_lookup", "workspace").split("__")
+    obj = instance
+    for name in path[:-1]:
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return None
+    return getattr(obj, f"{path[-1]}_id", None)
+
+
+def track_changes(model, *resources):
+    """Bump ``resources`` of the row's workspace whenever a ``model`` row is saved or deleted.
+
+    Models without a workspace (the reference catalogs) can only feed
+    :data:`GLOBAL_RESOURCES`.
+    """
+    scoped = not set(resources) <= GLOBAL_RESOURCES
+
+    def bump(sender, instance, using=None, **kwargs):
+        workspace_id = _instance_workspace_id(instance) if scoped else None
+        if scoped and workspace_id is None:
+            return
+
+        def run():
+            for resource in resources:
+                bump_resource_version(workspace_id, resource)
+
+        transaction.on_commit(run, using=using)
+
+    uid = f"respcache:{model._meta.label}"
+    post_save.connect(bump, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(bump, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,279 @@
+"""Per-workspace database sharding.
+
+Each ``Workspace`` records the database alias (shard) holding its rows in
+``Workspace.db_alias``. Workspace-scoped models (anything with a
+``WorkspaceManager``) live on that shard; users, workspaces, memberships and
+the global reference catalogs stay on ``default``. Shards carry the full
+schema plus copies of the global rows their data references, so foreign key
+constraints keep holding there.
+
+Sharding is off unless ``settings.WORKSPACE_SHARDS`` lists shard aliases.
+
+Primary keys are unique across databases: each database issues the keys
+of a sharded model from its own slice of the key space (:func:`key_range`,
+by its position in ``["default", *WORKSPACE_SHARDS]``, so new shards are
+appended, never reordered). Rows keep their keys when a workspace moves,
+the target never issued them and the source never issues them again.
+
+Only queries that name their workspace are routed: ``for_workspace()``,
+related-object access from an instance, and saves of instances carrying a
+``workspace_id``. Anything else (``Model.objects.all()``, the admin,
+management commands) reads ``default``; ``for_user()`` pins itself to the
+user's shard and refuses users spread over several (``for_user_by_shard()``
+fans out instead), and admin changelists warn that they list ``default``
+only.
+"""
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, models
+from django.db.models.constants import OnConflict
+
+from .managers import WorkspaceQuerySet
+
+SHARD_CACHE_TIMEOUT = 300
+LOCAL_TTL = 30
+
+# global rows that sharded tables reference by foreign key
+REFERENCE_MODELS = (
+    "orders.PlatformSource",
+    "orders.OrderStatus",
+    "catalog.ProductType",
+    "production.PrinterType",
+)
+
+_local = {}  # workspace_id -> (alias, expires_at)
+
+
+def shards():
+    return getattr(settings, "WORKSPACE_SHARDS", [])
+
+
+def sharding_enabled():
+    return bool(shards())
+
+
+def is_sharded(model):
+    manager = getattr(model, "_default_manager", None)
+    return manager is not None and issubclass(manager._queryset_class, WorkspaceQuerySet)
+
+
+def sharded_models():
+    """Workspace-scoped models, parents before children."""
+    pending = [m for m in apps.get_models() if is_sharded(m)]
+    ordered = []
+    while pending:
+        for model in pending:
+            deps = {
+                f.related_model for f in model._meta.concrete_fields
+                if f.is_relation and f.related_model is not model and is_sharded(f.related_model)
+            }
+            if deps <= set(ordered):
+                ordered.append(model)
+                pending.remove(model)
+                break
+        else:
+            raise RuntimeError(f"Cyclic foreign keys between sharded models: {pending}")
+    return ordered
+
+
+# the key space of each auto primary key type is split into this many slices
+KEY_SLICES = 64
+_KEY_SPANS = {
+    "SmallAutoField": 2 ** 15 // KEY_SLICES,
+    "AutoField": 2 ** 31 // KEY_SLICES,
+    "BigAutoField": 2 ** 63 // KEY_SLICES,
+}
+
+
+def keyed_models():
+    """Sharded models whose primary key is issued by the database."""
+    return [m for m in sharded_models() if isinstance(m._meta.pk, models.AutoField)]
+
+
+def key_range(model, alias):
+    """``(start, end)``: the primary keys of ``model`` that ``alias`` issues."""
+    span = _KEY_SPANS[model._meta.pk.get_internal_type()]
+    index = ["default", *shards()].index(alias)
+    return max(index * span, 1), (index + 1) * span
+
+
+def reserve_key_ranges(alias, models=None):
+    """Move ``alias``'s key counters to the start of its range (never backwards)."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for model in models or keyed_models():
+            start, _ = key_range(model, alias)
+            table = model._meta.db_table
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", [table, model._meta.pk.column])
+                sequence = cursor.fetchone()[0]
+                cursor.execute(
+                    f"SELECT setval(%s, %s, false) FROM {sequence} WHERE last_value < %s",
+                    [sequence, start, start],
+                )
+            elif connection.vendor == "sqlite":
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, start - 1])
+                elif row[0] < start - 1:
+                    cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [start - 1, table])
+            else:
+                raise NotImplementedError(f"Key ranges are not supported on {connection.vendor}")
+
+
+def escaped_key_ranges(alias, models=None):
+    """Models whose next key on ``alias`` lies outside its range.
+
+    PostgreSQL sequences ignore inserted keys; SQLite continues after the
+    largest key a table ever held, so keys copied in from a later slice
+    push its counter into that slice.
+    """
+    connection = connections[alias]
+    if connection.vendor != "sqlite":
+        return []
+    escaped = []
+    with connection.cursor() as cursor:
+        for model in models or keyed_models():
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [model._meta.db_table])
+            row = cursor.fetchone()
+            if row is not None and row[0] >= key_range(model, alias)[1] - 1:
+                escaped.append(model)
+    return escaped
+
+
+def _cache_key(workspace_id):
+    return f"workspace-shard:{workspace_id}"
+
+
+def shard_for(workspace_id):
+    """Alias holding ``workspace_id``'s rows, or ``None`` when sharding is off."""
+    if not sharding_enabled() or workspace_id is None:
+        return None
+    workspace_id = int(workspace_id)
+    now = time.monotonic()
+    hit = _local.get(workspace_id)
+    if hit and hit[1] > now:
+        return hit[0]
+    alias = cache.get(_cache_key(workspace_id))
+    if alias is None:
+        Workspace = apps.get_model("core", "Workspace")
+        alias = (
+            Workspace.objects.using("default").filter(pk=workspace_id)
+            .values_list("db_alias", flat=True).first()
+        ) or "default"
+        cache.set(_cache_key(workspace_id), alias, SHARD_CACHE_TIMEOUT)
+    _local[workspace_id] = (alias, now + LOCAL_TTL)
+    return alias
+
+
+def forget_shard(workspace_id):
+    _local.pop(int(workspace_id), None)
+    cache.delete(_cache_key(workspace_id))
+
+
+def sync_reference_data(alias, models=None):
+    """Upsert the global reference catalogs into ``alias``."""
+    for label in models or REFERENCE_MODELS:
+        model = apps.get_model(label)
+        copy_rows(model, model._base_manager.using("default").all(), alias, upsert=True)
+
+
+def sync_workspace_anchor(workspace, alias):
+    """Copy the workspace row (and its owner) that sharded rows point at."""
+    user_model = type(workspace).owner.field.related_model
+    copy_rows(user_model, user_model._base_manager.using("default").filter(pk=workspace.owner_id), alias, upsert=True)
+    copy_rows(type(workspace), [workspace], alias, upsert=True)
+
+
+def copy_rows(model, rows, alias, upsert=False, batch_size=1000):
+    """Insert ``rows`` into ``alias`` verbatim (keeping pks and timestamps).
+
+    Key counters are left alone; see :func:`key_range`.
+
+    ``rows`` may be any iterable (e.g. ``queryset.iterator()``); it is
+    consumed in ``batch_size`` chunks. Returns the number of rows written.
+    """
+    fields = list(model._meta.concrete_fields)
+    options = {}
+    if upsert:
+        options = dict(
+            on_conflict=OnConflict.UPDATE,
+            unique_fields=[model._meta.pk],
+            update_fields=[f for f in fields if not f.primary_key],
+        )
+    manager = model._base_manager.using(alias)
+    written, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            # raw=True skips pre_save(), so auto_now fields keep their values
+            manager._insert(batch, fields=fields, raw=True, using=alias, **options)
+            written += len(batch)
+            batch = []
+    if batch:
+        manager._insert(batch, fields=fields, raw=True, using=alias, **options)
+        written += len(batch)
+    return written
+
+
+class TenantRouter:
+    """Route workspace-scoped models to their workspace's shard.
+
+    Querysets built with ``Model.objects.for_workspace(ws)`` are pinned to the
+    shard explicitly; instances carry their database in ``_state.db`` and new
+    ones are routed by ``workspace_id``.
+    """
+
+    def _home(self, obj):
+        """Shard an instance of a sharded model belongs to (``None`` if unknown)."""
+        workspace_id = getattr(obj, "workspace_id", None)
+        if workspace_id is not None:
+            return shard_for(workspace_id)
+        return obj._state.db
+
+    def _db_for(self, model, hints):
+        if not sharding_enabled():
+            return None
+        instance = hints.get("instance")
+        if instance is None:
+            return None
+        if not is_sharded(model):
+            if instance._state.db in shards():
+                # e.g. order.status: global rows are read from the primary
+                from .db_routers import ReplicaRouter
+
+                return ReplicaRouter().db_for_read(model) or "default"
+            return None
+        if is_sharded(type(instance)):
+            return self._home(instance)
+        if instance._meta.label == "core.Workspace":
+            return shard_for(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        alias = self._db_for(model, hints)
+        if alias is not None and not is_sharded(model):
+            return "default"
+        return alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not sharding_enabled():
+            return None
+        sharded1, sharded2 = is_sharded(type(obj1)), is_sharded(type(obj2))
+        if sharded1 and sharded2:
+            home1, home2 = self._home(obj1), self._home(obj2)
+            return home1 is None or home2 is None or home1 == home2
+        if sharded1 or sharded2:
+            return True  # global rows are mirrored into every shard
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # shards carry the full schema so mirrored global rows satisfy FKs
+        return None
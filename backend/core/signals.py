@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import sharding
+from .models import Membership, Workspace
+from .utils import bump_membership_version
+
+
+@receiver([post_save, post_delete], sender=Membership)
+def invalidate_membership_cache(sender, instance, **kwargs):
+    # bump after commit so nobody re-caches the old rows under the new version
+    transaction.on_commit(lambda: bump_membership_version(instance.user_id))
+
+
+@receiver(post_save, sender=Workspace)
+def refresh_workspace_shard(sender, instance, **kwargs):
+    sharding.forget_shard(instance.pk)
+    if instance.db_alias != "default" and sharding.sharding_enabled():
+        sharding.sync_workspace_anchor(instance, instance.db_alias)
+
+
+@receiver(post_migrate)
+def reserve_shard_key_ranges(sender, using, **kwargs):
+    if using in sharding.shards():
+        sharding.reserve_key_ranges(using, [m for m in sharding.keyed_models() if m._meta.app_config is sender])
+
+
+def mirror_reference_row(sender, instance, **kwargs):
+    for alias in sharding.shards():
+        sharding.copy_rows(sender, [instance], alias, upsert=True)
+
+
+def connect_reference_mirroring():
+    for label in sharding.REFERENCE_MODELS:
+        post_save.connect(mirror_reference_row, sender=apps.get_model(label), dispatch_uid=f"mirror:{label}")
@@ -1,3 +1,509 @@
-from django.test import TestCase
+import io
+import os
+import re
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from authapp.serializers import WorkspaceTokenObtainPairSerializer
+
+from catalog.models import Color, Material, Product
+from orders.models import Customer, Order, OrderStatus
+from production.models import Filament, FilamentTransaction, PrintJob, Printer
+from users.models import User
+
+from . import dbpool, importtime, metrics, profiling, sharding
+from .admin_performance import EstimatedCountPaginator, estimated_count
+from .benchmarks import BENCHMARKS, compare, run_benchmarks
+from .datagen import generate
+from .db_routers import ReplicaRouter, reset_routing, use_primary
+from .middleware import MetricsMiddleware, ReplicaPinMiddleware
+from .models import Membership, Workspace
+
+
+class MembershipCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()  # user ids repeat between tests
+        self.user = User.objects.create_user(email="member@example.com", password="x")
+        self.first = Workspace.objects.create(name="First", owner=self.user)
+        self.second = Workspace.objects.create(name="Second", owner=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Membership.objects.create(user=self.user, workspace=self.first, role=Membership.OWNER)
+        token = WorkspaceTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def get(self, workspace):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/orders/", HTTP_X_WORKSPACE_ID=str(workspace.pk))
+        table = Membership._meta.db_table
+        return response.status_code, sum(table in q["sql"] for q in queries.captured_queries)
+
+    def test_repeated_requests_skip_membership_queries(self):
+        self.assertEqual(self.get(self.first), (200, 1))
+        self.assertEqual(self.get(self.first), (200, 0))
+        self.assertEqual(self.get(self.second), (403, 0))
+
+    def test_membership_changes_show_on_the_next_request(self):
+        self.assertEqual(self.get(self.second)[0], 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            membership = Membership.objects.create(user=self.user, workspace=self.second, role=Membership.VIEWER)
+        self.assertEqual(self.get(self.second), (200, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            membership.delete()
+        self.assertEqual(self.get(self.second), (403, 1))
+        self.assertEqual(self.get(self.first), (200, 0))
+
+
+class ScopedQueryPlanTests(TestCase):
+    """Every hot workspace-scoped query must be answered from an index."""
+
+    WORKSPACE_ID = 1
+
+    def scoped_querysets(self):
+        ws = self.WORKSPACE_ID
+        return [
+            Order.objects.for_workspace(ws),
+            Order.objects.for_workspace(ws).filter(status_id=1),
+            Order.objects.for_workspace(ws).filter(paid_at__isnull=False),
+            Customer.objects.for_workspace(ws).order_by("name"),
+            PrintJob.objects.for_workspace(ws),
+            PrintJob.objects.for_workspace(ws).filter(status=PrintJob.Status.QUEUED),
+            Printer.objects.for_workspace(ws).filter(status=Printer.Status.ONLINE),
+            Filament.objects.for_workspace(ws).filter(is_available=True),
+            Product.objects.for_workspace(ws).filter(sku="SKU-1"),
+            Material.objects.for_workspace(ws),
+            Color.objects.for_workspace(ws),
+        ]
+
+    def full_scan(self, plan, table):
+        if connection.vendor == "postgresql":
+            return re.search(rf"Seq Scan on {table}\b", plan)
+        # SQLite: "SCAN <table>" is a full scan, "SEARCH <table> USING INDEX" is not
+        return re.search(rf"\bSCAN {table}\b", plan)
+
+    def test_scoped_queries_use_indexes(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # tables are empty in tests; make the planner show its index choice
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        for qs in self.scoped_querysets():
+            table = qs.model._meta.db_table
+            plan = qs.explain()
+            with self.subTest(query=str(qs.query)):
+                self.assertFalse(self.full_scan(plan, table), f"sequential scan on {table}:\n{plan}")
+
+
+@override_settings(READ_REPLICAS=["replica"], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    # TransactionTestCase: a shared-cache SQLite mirror cannot read tables the
+    # default connection holds locked inside TestCase's wrapping transaction
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        reset_routing()
+        self.addCleanup(reset_routing)
+
+    def test_reads_go_to_replica_until_a_write(self):
+        self.assertEqual(Workspace.objects.all().db, "replica")
+        owner = User.objects.create_user(email="owner@example.com", password="x")
+        self.assertEqual(owner._state.db, "default")
+        self.assertEqual(Workspace.objects.all().db, "default")
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual(Workspace.objects.all().db, "default")
+        self.assertEqual(Workspace.objects.all().db, "replica")
+
+    def test_migrations_never_target_replicas(self):
+        self.assertIs(ReplicaRouter().allow_migrate("replica", "orders"), False)
+
+    def test_request_stickiness(self):
+        seen = []
+
+        def view(request):
+            workspaces = Workspace.objects.all()
+            list(workspaces)
+            seen.append(workspaces.db)
+            if request.method == "POST":
+                User.objects.create_user(email="writer@example.com", password="x")
+            return HttpResponse()
+
+        middleware = ReplicaPinMiddleware(view)
+        factory = RequestFactory()
+
+        middleware(factory.get("/"))
+        response = middleware(factory.post("/"))
+        cookie = response.cookies[ReplicaPinMiddleware.COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+
+        sticky = factory.get("/")
+        sticky.COOKIES[ReplicaPinMiddleware.COOKIE] = cookie.value
+        middleware(sticky)
+        middleware(factory.get("/"))
+
+        self.assertEqual(seen, ["replica", "default", "default", "replica"])
+
+
+@override_settings(WORKSPACE_SHARDS=["shard"])
+class ShardRoutingTests(TestCase):
+    databases = {"default", "shard"}
+
+    def setUp(self):
+        cache.clear()
+        sharding._local.clear()
+        self.addCleanup(sharding._local.clear)
+        self.user = User.objects.create_user(email="sharded@example.com", password="x")
+        sharding.sync_reference_data("shard")
+        self.status = OrderStatus.objects.create(status_name="Sharded")
+        self.home = Workspace.objects.create(name="Home", owner=self.user)
+        self.remote = Workspace.objects.create(name="Remote", owner=self.user, db_alias="shard")
+
+    def order(self, workspace):
+        customer = Customer.objects.create(workspace=workspace, name="Ada")
+        return Order.objects.create(workspace=workspace, customer=customer, status=self.status)
+
+    def test_for_workspace_routes_to_the_shard(self):
+        self.assertEqual(Customer.objects.for_workspace(self.home).db, "default")
+        self.assertEqual(Customer.objects.for_workspace(self.remote).db, "shard")
+        order = self.order(self.remote)
+        self.assertEqual(order._state.db, "shard")
+        self.assertFalse(Order.objects.using("default").filter(pk=order.pk).exists())
+        self.assertEqual(list(Order.objects.for_workspace(self.remote.pk)), [order])
+
+    def test_instance_hints_follow_the_instance(self):
+        order = self.order(self.remote)
+        order = Order.objects.for_workspace(self.remote).get(pk=order.pk)
+        self.assertEqual(order.customer._state.db, "shard")
+        self.assertEqual(order.customer.order_set.get(), order)
+        # global rows are read from the primary, not the shard's mirror
+        self.assertEqual(order.status._state.db, "default")
+
+    def test_for_user_never_reads_a_single_database_silently(self):
+        Membership.objects.create(user=self.user, workspace=self.remote, role=Membership.OWNER)
+        self.order(self.remote)
+        self.assertEqual(Order.objects.for_user(self.user).db, "shard")
+        self.assertEqual(Order.objects.for_user(self.user).count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Membership.objects.create(user=self.user, workspace=self.home, role=Membership.OWNER)
+        self.user = User.objects.get(pk=self.user.pk)  # drop the memoised roles
+        with self.assertRaises(ValueError):
+            Order.objects.for_user(self.user)
+        by_shard = Order.objects.for_user_by_shard(self.user)
+        self.assertEqual({alias: qs.count() for alias, qs in by_shard.items()}, {"default": 0, "shard": 1})
+
+    def test_move_workspace_round_trip(self):
+        order = self.order(self.home)
+        call_command("move_workspace", str(self.home.pk), "shard", stdout=io.StringIO())
+        self.home.refresh_from_db()
+        self.assertEqual(self.home.db_alias, "shard")
+        self.assertFalse(Order.objects.using("default").filter(pk=order.pk).exists())
+        moved = Order.objects.for_workspace(self.home).get()
+        self.assertEqual((moved.pk, moved._state.db, moved.customer.name), (order.pk, "shard", "Ada"))
+
+        call_command("move_workspace", str(self.home.pk), "default", stdout=io.StringIO())
+        self.home.refresh_from_db()
+        self.assertEqual(self.home.db_alias, "default")
+        self.assertFalse(Order.objects.using("shard").filter(pk=order.pk).exists())
+        self.assertEqual(Order.objects.for_workspace(self.home).get().pk, order.pk)
+
+    def test_shards_issue_keys_from_their_own_range(self):
+        sharding.reserve_key_ranges("shard", [Order, Customer])
+        start, end = sharding.key_range(Order, "shard")
+        remote = self.order(self.remote)
+        self.assertTrue(start <= remote.pk < end)
+        self.assertLess(self.order(self.home).pk, start)
+
+        # a moved workspace keeps its keys and the shard keeps its counter
+        call_command("move_workspace", str(self.home.pk), "shard", stdout=io.StringIO())
+        self.assertEqual(self.order(self.remote).pk, remote.pk + 1)
+
+    def test_move_refuses_keys_the_target_already_uses(self):
+        order = self.order(self.home)
+        # a shard row from before key ranges, with the same key
+        clash = Customer.objects.using("shard").create(workspace=self.remote, name="Old")
+        Order.objects.using("shard").create(
+            pk=order.pk, workspace=self.remote, customer=clash, status=self.status, order_number="OLD-1"
+        )
+        with self.assertRaisesMessage(CommandError, "already used on shard"):
+            call_command("move_workspace", str(self.home.pk), "shard", stdout=io.StringIO())
+        self.home.refresh_from_db()
+        self.assertEqual(self.home.db_alias, "default")
+        self.assertEqual(Order.objects.using("default").get(pk=order.pk).workspace_id, self.home.pk)
+        self.assertFalse(Customer.objects.using("shard").filter(workspace=self.home).exists())
+        self.assertEqual(Order.objects.using("shard").get(pk=order.pk).order_number, "OLD-1")
+
+    def test_purge_removes_leftovers_but_never_the_live_copy(self):
+        self.order(self.home)
+        call_command("move_workspace", str(self.home.pk), "shard", "--keep-source", stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command("move_workspace", str(self.home.pk), "shard", "--purge", stdout=io.StringIO())
+        call_command("move_workspace", str(self.home.pk), "default", "--purge", stdout=io.StringIO())
+        self.assertFalse(Order.objects.using("default").filter(workspace=self.home).exists())
+        self.assertEqual(Order.objects.for_workspace(self.home).count(), 1)
+
+    def test_admin_changelist_warns_that_it_lists_default_only(self):
+        admin = User.objects.create_user(email="shardadmin@example.com", password="x", is_staff=True,
+                                         is_superuser=True)
+        self.client.force_login(admin)
+        self.assertContains(self.client.get("/admin/orders/order/"), "workspaces on shard are not")
+
+
+class ConnectionModeTests(SimpleTestCase):
+    def config(self, engine="core.backends.postgresql"):
+        return {"default": {"ENGINE": engine, "OPTIONS": {}}, "replica_0": {"ENGINE": engine, "OPTIONS": {}}}
+
+    def test_persistent(self):
+        dbs = self.config()
+        self.assertEqual(dbpool.configure(dbs, "persistent", {"DB_CONN_MAX_AGE": "30"}), "persistent")
+        for db in dbs.values():
+            self.assertEqual((db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"]), (30, True))
+            self.assertNotIn("pool", db["OPTIONS"])
+
+    def test_pool(self):
+        dbs = self.config()
+        with mock.patch.object(dbpool, "pooling_available", return_value=True):
+            mode = dbpool.configure(dbs, "pool", {"DB_POOL_MAX_SIZE": "4"})
+        self.assertEqual(mode, "pool")
+        for db in dbs.values():
+            self.assertEqual(db["CONN_MAX_AGE"], 0)
+            self.assertEqual((db["OPTIONS"]["pool"]["min_size"], db["OPTIONS"]["pool"]["max_size"]), (2, 4))
+
+    def test_none(self):
+        dbs = self.config()
+        self.assertEqual(dbpool.configure(dbs, "none", {}), "none")
+        self.assertEqual({db["CONN_MAX_AGE"] for db in dbs.values()}, {0})
+
+    def test_pool_falls_back_without_psycopg_pool(self):
+        dbs = self.config()
+        with mock.patch.object(dbpool, "pooling_available", return_value=False):
+            with self.assertWarns(RuntimeWarning):
+                mode = dbpool.configure(dbs, "pool", {})
+        self.assertEqual(mode, "persistent")
+        self.assertEqual(dbs["default"]["CONN_MAX_AGE"], 60)
+        self.assertNotIn("pool", dbs["default"]["OPTIONS"])
+
+    def test_pool_falls_back_on_sqlite(self):
+        dbs = self.config("core.backends.sqlite3")
+        self.assertEqual(dbpool.configure(dbs, "pool", {}), "persistent")
+        self.assertNotIn("pool", dbs["default"]["OPTIONS"])
+
+    def test_asgi_pools_when_it_can(self):
+        dbs = self.config()
+        with mock.patch.object(dbpool, "pooling_available", return_value=True):
+            self.assertEqual(dbpool.configure(dbs, "persistent", {}, asgi=True), "pool")
+        # without psycopg's pool, connections stay persistent rather than reconnecting per request
+        for mode in ("persistent", "pool"):
+            dbs = self.config()
+            with mock.patch.object(dbpool, "pooling_available", return_value=False):
+                with self.assertWarns(RuntimeWarning):
+                    self.assertEqual(dbpool.configure(dbs, mode, {}, asgi=True), "persistent")
+            self.assertEqual((dbs["default"]["CONN_MAX_AGE"], dbs["default"]["CONN_HEALTH_CHECKS"]), (60, True))
+        dbs = self.config("core.backends.sqlite3")
+        self.assertEqual(dbpool.configure(dbs, "persistent", {}, asgi=True), "persistent")
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            dbpool.configure(self.config(), "pgbouncer", {})
+
+
+class MetricsTests(TestCase):
+    def test_scrape_reports_views(self):
+        self.client.get("/")
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('printflow_http_requests_total{view="root",method="GET",status="200"}', body)
+        self.assertIn('printflow_http_request_duration_seconds_bucket{view="root",le="+Inf"}', body)
+        self.assertIn("# TYPE printflow_db_connections_open gauge", body)
+
+    def test_async_views_count_queries_from_executor_threads(self):
+        def query():
+            try:
+                with connection.cursor() as cursor:  # this thread's own connection
+                    cursor.execute("SELECT 1")
+            finally:
+                connection.close()
+
+        async def view(request):
+            await sync_to_async(query, thread_sensitive=False)()
+            await sync_to_async(query, thread_sensitive=False)()
+            return HttpResponse("ok")
+
+        queries = metrics.HTTP_QUERIES.labels("<unresolved>")
+        before = queries.totals()[-2]
+        async_to_sync(MetricsMiddleware(view))(RequestFactory().get("/async"))
+        self.assertEqual(queries.totals()[-2], before + 2)
+
+    @override_settings(METRICS_N_PLUS_ONE_THRESHOLD=3)
+    def test_repeated_sql_is_flagged(self):
+        def view(request):
+            for pk in range(5):
+                Workspace.objects.filter(pk=pk).first()
+            return HttpResponse("ok")
+
+        flagged = metrics.HTTP_N_PLUS_ONE.labels("<unresolved>")
+        before = flagged.totals()[0]
+        with self.assertLogs("core.metrics", "WARNING"):
+            MetricsMiddleware(view)(RequestFactory().get("/loop"))
+        self.assertEqual(flagged.totals()[0], before + 1)
+        queries = metrics.HTTP_QUERIES.labels("<unresolved>").totals()
+        self.assertGreaterEqual(queries[-2], 5)
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        summary = generate("tiny", seed=1)
+        cls.workspace = Workspace.objects.get(pk=summary["workspaces"][0]["id"])
+
+    def test_dataset_matches_what_signals_maintain(self):
+        for order in Order.objects.for_workspace(self.workspace).filter(totals_locked=False)[:10]:
+            self.assertEqual(order.total_cost, order.items.aggregate(s=Sum("total_price"))["s"])
+        for filament in Filament.objects.for_workspace(self.workspace):
+            last = FilamentTransaction.objects.filter(filament=filament).order_by("-pk").first()
+            self.assertEqual(filament.current_stock_grams, last.new_stock)
+
+    def test_runs_every_benchmark_and_leaves_data_untouched(self):
+        orders = Order.objects.for_workspace(self.workspace).count()
+        report = run_benchmarks(self.workspace, repeat=1, warmup=0)
+        self.assertEqual(set(report["results"]), set(BENCHMARKS))
+        self.assertTrue(all(r["queries"] > 0 for r in report["results"].values()))
+        self.assertEqual(Order.objects.for_workspace(self.workspace).count(), orders)
+
+        worse = {"results": {"job_queue_list": dict(report["results"]["job_queue_list"], queries=0)}}
+        self.assertEqual(compare(report, worse)[1], ["job_queue_list"])
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.override = override_settings(
+            PROFILING_DIR=self.dir, PROFILING_TOKEN="let-me-in", PROFILING_MAX_FILES=2, PROFILING_INTERVAL=0.001
+        )
+        self.override.enable()
+        self.addCleanup(self.override.disable)
+
+    def test_header_profiles_request_into_ring_buffer(self):
+        self.assertNotIn("X-Profile-Id", self.client.get("/"))
+        ids = [self.client.get("/", HTTP_X_PROFILE="let-me-in")["X-Profile-Id"] for _ in range(3)]
+        self.assertEqual([p["id"] for p in profiling.list_profiles()], ids[:0:-1])
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email="ops@example.com", password="x"))
+        listed = self.client.get("/api/ops/profiles/").json()
+        self.assertEqual(listed[0]["name"], "/")
+        self.assertEqual(self.client.get(f"/api/ops/profiles/{ids[2]}/").status_code, 200)
+        self.assertEqual(self.client.get(f"/api/ops/profiles/{ids[0]}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/ops/profiles/..%2Fsettings/").status_code, 404)
+
+    def test_sampler_collects_stacks(self):
+        def busy_loop():
+            end = time.perf_counter() + 0.05
+            while time.perf_counter() < end:
+                pass
+
+        profile = profiling.Profile("task", "busy")
+        busy_loop()
+        profile.finish(status="SUCCESS")
+        with open(profiling.profile_path(profile.id)) as fh:
+            self.assertIn("busy_loop (tests.py:", fh.read())
+
+        async def awaits_sync_work():
+            await sync_to_async(busy_loop, thread_sensitive=False)()
+
+        async def profiled():
+            profile = profiling.Profile("request", "/async")
+            await awaits_sync_work()
+            return profile.finish()
+
+        with open(profiling.profile_path(async_to_sync(profiled)())) as fh:
+            self.assertIn("busy_loop (tests.py:", fh.read())
+
+        with override_settings(PROFILING_MODE="cprofile", PROFILING_MAX_FILES=3):
+            profile = profiling.Profile("task", "busy")
+            busy_loop()
+            profile.finish()
+        self.assertTrue(profiling.profile_path(profile.id).endswith(".prof"))
+        self.assertEqual(len(os.listdir(self.dir)), 6)  # three profiles: data + metadata
+
+
+class ImportTimeTests(TestCase):
+    def test_parse_and_summarize(self):
+        output = [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       300 |        300 |     django.utils.functional",
+            "import time:      1200 |       1500 |   django.utils",
+            "import time:      2000 |       3500 | django",
+            "noise from the program",
+        ]
+        rows = importtime.parse(output)
+        self.assertEqual(rows[1], ("django.utils", 1200, 1500, 1))
+        summary = importtime.summarize(rows)
+        self.assertEqual((summary["imported"], summary["import_ms"]), (3, 3.5))
+        self.assertEqual(summary["packages"], [{"package": "django", "modules": 3, "self_ms": 3.5}])
+        self.assertEqual(summary["slowest"][0]["module"], "django")
+
+    def test_worker_settings_skip_web_only_apps(self):
+        result = importtime.measure("backend.settings_worker", target="setup", top=2000)
+        imported = {row["package"] for row in result["packages"]}
+        self.assertIn("django", imported)
+        self.assertFalse(imported & {"allauth", "dj_rest_auth", "corsheaders", "rest_framework", "requests"})
+
+
+class AdminChangelistTests(TestCase):
+    CHANGELISTS = (
+        "orders/order", "orders/orderitem", "orders/customer", "catalog/product", "catalog/productdocument",
+        "production/printjob", "production/printer", "production/filament", "production/filamenttransaction",
+    )
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="x", is_staff=True,
+                                              is_superuser=True)
+        self.client.force_login(self.admin)
+
+    def queries(self, changelist):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"/admin/{changelist}/")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_changelists_are_constant_query(self):
+        generate("tiny", seed=1, prefix="small")
+        for changelist in self.CHANGELISTS:
+            self.queries(changelist)  # fills the filter caches
+        before = {changelist: self.queries(changelist) for changelist in self.CHANGELISTS}
+        generate("tiny", seed=2, prefix="more")
+        after = {changelist: self.queries(changelist) for changelist in self.CHANGELISTS}
+        self.assertEqual(after, before)
+        self.assertLessEqual(max(after.values()), 12)
+
+    def test_order_inline_is_bounded(self):
+        workspace = Workspace.objects.get(pk=generate("tiny", seed=3)["workspaces"][0]["id"])
+        order = Order.objects.for_workspace(workspace).first()
+        with override_settings(ADMIN_INLINE_MAX_ROWS=1):
+            response = self.client.get(f"/admin/orders/order/{order.pk}/change/")
+        formset = response.context["inline_admin_formsets"][0].formset
+        self.assertEqual(formset.initial_form_count(), min(order.items.count(), 1))
+        if order.items.count() > 1:
+            self.assertContains(response, f"/admin/orders/orderitem/?order={order.pk}")
+
+    def test_paginator_counts_exactly_without_estimates(self):
+        generate("tiny", seed=4)
+        queryset = Order.objects.all()
+        if connection.vendor == "postgresql":
+            self.assertGreater(estimated_count(queryset), 0)
+            with override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1):
+                self.assertEqual(EstimatedCountPaginator(queryset, 10).count, estimated_count(queryset))
+        else:
+            self.assertIsNone(estimated_count(queryset))
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, queryset.count())
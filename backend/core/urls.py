@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import DatabaseConnectionsView, ProfileDownloadView, ProfileListView
+
+urlpatterns = [
+    path("db/", DatabaseConnectionsView.as_view(), name="ops-db-connections"),
+    path("profiles/", ProfileListView.as_view(), name="ops-profiles"),
+    path("profiles/<str:profile_id>/", ProfileDownloadView.as_view(), name="ops-profile-download"),
+]
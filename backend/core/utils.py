@@ -1,11 +1,83 @@
 # core/utils.py
+import time
+
+from django.core.cache import cache
+
 from .models import Membership, Workspace
 
+MEMBERSHIP_CACHE_TIMEOUT = 300
+WORKSPACE_HEADER = "HTTP_X_WORKSPACE_ID"
+WORKSPACE_PARAM = "workspace"
+
+
+def _membership_version_key(user_id):
+    return f"memberships:version:{user_id}"
+
+
+def bump_membership_version(user_id):
+    """Invalidate every cached membership map of ``user_id``."""
+    key = _membership_version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # missing/evicted: restart from a value no earlier version could have used
+        cache.set(key, time.time_ns(), None)
+
+
+def workspace_roles(user):
+    """Return ``{workspace_id: role}`` for ``user``.
+
+    Resolved once per request (memoised on the user instance) and cached
+    across requests under a per-user version that membership changes bump,
+    so scoping and role checks normally cost no queries at all.
+    """
+    if user is None or not user.is_authenticated:
+        return {}
+    roles = getattr(user, "_workspace_roles", None)
+    if roles is not None:
+        return roles
+    version = cache.get_or_set(_membership_version_key(user.pk), time.time_ns, None)
+    key = f"memberships:{user.pk}:{version}"
+    roles = cache.get(key)
+    if roles is None:
+        roles = dict(Membership.objects.filter(user_id=user.pk).values_list("workspace_id", "role"))
+        cache.set(key, roles, MEMBERSHIP_CACHE_TIMEOUT)
+    user._workspace_roles = roles
+    return roles
+
+
+def workspace_role(user, workspace_id):
+    """The user's role in ``workspace_id`` or ``None`` when not a member."""
+    try:
+        return workspace_roles(user).get(int(workspace_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def has_workspace_role(user, workspace_id, *roles):
+    role = workspace_role(user, workspace_id)
+    return role is not None and (not roles or role in roles)
+
+
+def request_workspace_id(request):
+    """Workspace selected by the ``X-Workspace-ID`` header or ``?workspace=`` query param."""
+    if hasattr(request, "workspace_id"):
+        return request.workspace_id
+    raw = request.META.get(WORKSPACE_HEADER) or request.GET.get(WORKSPACE_PARAM)
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
 def user_workspaces(user):
-    return Workspace.objects.filter(memberships__user=user)
+    return Workspace.objects.filter(pk__in=list(workspace_roles(user)))
+
 
 def enforce_workspace(queryset, workspace_id, user):
     # ensure user belongs to the workspace before filtering
-    if not Membership.objects.filter(user=user, workspace_id=workspace_id).exists():
+    if workspace_role(user, workspace_id) is None:
         return queryset.none()
+    if hasattr(queryset, "for_workspace"):
+        return queryset.for_workspace(workspace_id)
     return queryset.filter(workspace_id=workspace_id)
@@ -1,3 +1,64 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from . import dbpool, metrics, profiling
+
+
+class DatabaseConnectionsView(APIView):
+    """Connection reuse metrics of the serving process, per database alias."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(dbpool.snapshot())
+
+
+class ProfileListView(APIView):
+    """Stored request / task profiles, newest first (see :mod:`core.profiling`)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        profiles = profiling.list_profiles()
+        kind = request.query_params.get("kind")
+        if kind:
+            profiles = [p for p in profiles if p.get("kind") == kind]
+        return Response(profiles)
+
+
+class ProfileDownloadView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        path = profiling.profile_path(profile_id)
+        if path is None:
+            raise Http404("No such profile")
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=path.rsplit("/", 1)[-1])
+
+
+def _pool_lines():
+    """Connection gauges of the process answering the scrape."""
+    gauges = {
+        "connections_open": ("open", "Open DB connections."),
+        "connections_in_use": ("in_use", "DB connections checked out."),
+        "connections_waiting": ("waiting", "Requests waiting for a pooled connection."),
+    }
+    stats = dbpool.snapshot()
+    lines = []
+    for suffix, (key, help_text) in gauges.items():
+        name = f"{metrics.PREFIX}_db_{suffix}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{alias="{alias}"}} {entry[key]}' for alias, entry in stats.items()]
+    return lines
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; needs ``Authorization: Bearer $METRICS_TOKEN`` when set."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(
+        metrics.exposition(_pool_lines()), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,139 @@
+from django.contrib import admin, messages
+
+from core.admin_performance import BoundedInlineMixin, FastAdminMixin
+
+from .models import (
+    EventSubscription, OutboxDelivery, OutboxEvent, SyncFailure, SyncState, TaskChunk, TaskRun, WebhookEvent,
+)
+from .toolkit import resume_run
+
+
+class TaskChunkInline(BoundedInlineMixin, admin.TabularInline):
+    model = TaskChunk
+    extra = 0
+    can_delete = False
+    fields = ("index", "status", "attempts", "error", "started_at", "finished_at")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TaskRun)
+class TaskRunAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "run_id", "task_name", "workspace", "platform", "status",
+        "done_chunks", "failed_chunks", "total_chunks", "created_at", "finished_at",
+    )
+    list_filter = ("status", "task_name", "platform", "workspace")
+    search_fields = ("task_name", "idempotency_key")
+    readonly_fields = (
+        "idempotency_key", "total_chunks", "done_chunks", "failed_chunks",
+        "total_items", "done_items", "created_at", "updated_at", "finished_at",
+    )
+    inlines = [TaskChunkInline]
+    actions = ["resume"]
+
+    @admin.action(description="Resume unfinished chunks")
+    def resume(self, request, queryset):
+        queued = sum(resume_run(run, include_running=True) for run in queryset)
+        self.message_user(request, f"Queued {queued} chunk(s) again.", messages.SUCCESS)
+
+
+@admin.register(SyncState)
+class SyncStateAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "platform", "kind", "workspace", "is_enabled", "watermark", "cursor",
+        "records_synced", "last_success_at",
+    )
+    list_filter = ("platform", "kind", "is_enabled")
+    readonly_fields = (
+        "watermark", "window_end", "cursor", "retry_from", "records_synced",
+        "last_started_at", "last_success_at", "last_error",
+    )
+    autocomplete_fields = ("workspace", "platform")
+
+
+@admin.register(SyncFailure)
+class SyncFailureAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("external_id", "sync", "attempts", "parked_at", "modified_at", "updated_at")
+    list_filter = ("sync__platform",)
+    list_select_related = ("sync__platform",)
+    search_fields = ("external_id",)
+    readonly_fields = (
+        "sync", "external_id", "modified_at", "attempts", "error", "parked_at", "created_at", "updated_at",
+    )
+    actions = ["retry"]
+
+    @admin.action(description="Retry on the next sync")
+    def retry(self, request, queryset):
+        retried = 0
+        for failure in queryset.select_related("sync"):
+            # the watermark has moved past a parked record; reach back to it
+            state = failure.sync
+            if failure.modified_at and state.watermark and failure.modified_at < state.watermark:
+                state.watermark = failure.modified_at
+                state.save(update_fields=["watermark", "updated_at"])
+            failure.attempts, failure.parked_at = 0, None
+            failure.save(update_fields=["attempts", "parked_at", "updated_at"])
+            retried += 1
+        self.message_user(request, f"{retried} record(s) retried on the next sync.", messages.SUCCESS)
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("event_id", "platform", "workspace", "status", "external_id", "event_version", "received_at")
+    list_filter = ("status", "platform")
+    search_fields = ("external_id",)
+    readonly_fields = (
+        "workspace", "platform", "headers", "received_at", "external_id", "event_version",
+        "error", "processed_at",
+    )
+    exclude = ("body",)
+    actions = ["retry"]
+
+    @admin.action(description="Process again")
+    def retry(self, request, queryset):
+        updated = queryset.filter(status=WebhookEvent.Status.FAILED).update(
+            status=WebhookEvent.Status.PENDING, error=""
+        )
+        self.message_user(request, f"{updated} event(s) queued again.", messages.SUCCESS)
+
+
+@admin.register(EventSubscription)
+class EventSubscriptionAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("name", "kind", "target", "workspace", "is_active", "last_delivered_at")
+    list_filter = ("kind", "is_active")
+    search_fields = ("name", "target")
+    readonly_fields = ("last_delivered_at", "last_error", "created_at", "updated_at")
+    autocomplete_fields = ("workspace",)
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "event_id", "event_type", "aggregate_type", "aggregate_id", "workspace", "created_at", "dispatched_at",
+    )
+    list_filter = ("event_type",)
+    search_fields = ("aggregate_id",)
+    readonly_fields = (
+        "workspace", "event_type", "aggregate_type", "aggregate_id", "payload", "created_at", "dispatched_at",
+    )
+
+
+@admin.register(OutboxDelivery)
+class OutboxDeliveryAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("delivery_id", "event", "subscription", "status", "attempts", "next_attempt_at", "delivered_at")
+    list_filter = ("status", "subscription")
+    list_select_related = ("event", "subscription")
+    readonly_fields = (
+        "subscription", "event", "aggregate_key", "attempts", "next_attempt_at", "error", "delivered_at",
+    )
+    actions = ["retry"]
+
+    @admin.action(description="Deliver again")
+    def retry(self, request, queryset):
+        updated = queryset.filter(status=OutboxDelivery.Status.FAILED).update(
+            status=OutboxDelivery.Status.PENDING, attempts=0, next_attempt_at=None, error=""
+        )
+        self.message_user(request, f"{updated} delivery(ies) queued again.", messages.SUCCESS)
@@ -0,0 +1,159 @@
+"""HTTP clients for marketplaces, returning :mod:`orders.upsert` records."""
+from dataclasses import dataclass
+from datetime import timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.utils.dateparse import parse_datetime
+
+from .toolkit import RetryableError
+
+
+@dataclass
+class Page:
+    records: list
+    next_cursor: str = None  # None on the last page
+
+
+def _decimal(value, places="0.01"):
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal(places))
+    except InvalidOperation:
+        return None
+
+
+def _datetime(value):
+    parsed = parse_datetime(value) if value else None
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _iso(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class BillbeeClient:
+    """Billbee REST API: ``GET /api/v1/orders`` filtered by modification time."""
+
+    DEFAULT_URL = "https://app.billbee.io"
+    PAGE_SIZE = 250
+    STATES = {
+        1: "Ordered", 2: "Confirmed", 3: "Paid", 4: "Shipped", 5: "Reclamation", 6: "Deleted",
+        7: "Closed", 8: "Cancelled", 9: "Archived", 11: "Demand", 12: "Under cover",
+        13: "Packed", 14: "Offer", 15: "Payment reminder", 16: "Packing",
+    }
+
+    def __init__(self, api_key, username, password, base_url=DEFAULT_URL, timeout=30, session=None):
+        # requests is imported on use: webhooks and signals load this module in
+        # every process, most of which never call a marketplace
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.auth = (username, password)
+        self.session.headers.update({"X-Billbee-Api-Key": api_key, "Accept": "application/json"})
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            api_key=config.get("api_key", ""),
+            username=config.get("username", ""),
+            password=config.get("password", ""),
+            base_url=config.get("base_url") or cls.DEFAULT_URL,
+        )
+
+    def _get(self, path, params):
+        import requests
+
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            raise RetryableError(str(exc)) from exc
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableError(f"Billbee answered {response.status_code}")
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_orders(self, since, until, cursor=None):
+        page = int(cursor or 1)
+        params = {"page": page, "pageSize": self.PAGE_SIZE, "modifiedAtMax": _iso(until)}
+        if since is not None:
+            params["modifiedAtMin"] = _iso(since)
+        data = self._get("/api/v1/orders", params)
+        paging = data.get("Paging") or {}
+        records = [self.order_record(order) for order in data.get("Data") or ()]
+        more = page < int(paging.get("TotalPages") or 0)
+        return Page(records=records, next_cursor=str(page + 1) if more else None)
+
+    @classmethod
+    def order_record(cls, order):
+        customer = order.get("Customer") or {}
+        address = order.get("ShippingAddress") or {}
+        lines = [
+            " ".join(filter(None, [address.get("FirstName"), address.get("LastName")])),
+            address.get("Company"),
+            " ".join(filter(None, [address.get("Street"), address.get("HouseNumber")])),
+            " ".join(filter(None, [address.get("Zip"), address.get("City")])),
+            address.get("CountryISO2"),
+        ]
+        state = order.get("State")
+        return {
+            "external_id": str(order["BillBeeOrderId"]),
+            "billbee_id": order["BillBeeOrderId"],
+            "order_number": order.get("OrderNumber") or f"BB-{order['BillBeeOrderId']}",
+            "status": cls.STATES.get(state, f"Billbee state {state}"),
+            "currency": (order.get("Currency") or "EUR")[:3],
+            "total": _decimal(order.get("TotalCost")),
+            "paid_at": _datetime(order.get("PayedAt")),
+            "modified_at": _datetime(order.get("LastModifiedAt")),
+            "shipping_address": "\n".join(line for line in lines if line),
+            "payload": order,
+            "customer": {
+                "external_id": str(customer.get("Id") or order.get("CustomerId") or ""),
+                "billbee_id": customer.get("Id"),
+                "name": customer.get("Name") or "",
+                "email": customer.get("Email") or None,
+                "phone": customer.get("Tel1") or "",
+                "address": "\n".join(line for line in lines if line),
+            },
+            "items": [cls.item_record(item) for item in order.get("OrderItems") or ()],
+        }
+
+    @classmethod
+    def webhook_event(cls, payload):
+        """``(external_id, event_version, record)`` of an order webhook body."""
+        order = payload.get("Data") if isinstance(payload.get("Data"), dict) else payload
+        return str(order["BillBeeOrderId"]), order.get("LastModifiedAt") or "", cls.order_record(order)
+
+    @staticmethod
+    def item_record(item):
+        product = item.get("Product") or {}
+        attributes = {a.get("Name"): a.get("Value") for a in item.get("Attributes") or () if a.get("Name")}
+        return {
+            "external_id": str(item.get("BillbeeId") or ""),
+            "billbee_id": item.get("BillbeeId"),
+            "sku": (product.get("SKU") or f"BB-{product.get('Id')}")[:100],
+            "product_billbee_id": product.get("BillbeeId") or product.get("Id"),
+            "title": product.get("Title") or "",
+            "quantity": _decimal(item.get("Quantity") or 1, "0.001"),
+            "total_price": _decimal(item.get("TotalPrice")),
+            "attributes": attributes,
+            "is_personalized": bool(attributes),
+        }
+
+
+CLIENTS = {"billbee": BillbeeClient}
+
+
+def client_class(platform):
+    try:
+        return CLIENTS[platform.platform_name.lower()]
+    except KeyError:
+        raise ValueError(f"No sync client for platform {platform.platform_name!r}")
+
+
+def client_for(state):
+    return client_class(state.platform).from_config(state.config)
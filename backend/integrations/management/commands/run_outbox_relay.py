@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.sharding import shards
+from integrations import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the outbox relay as a dedicated process: fan out new events and deliver due batches on "
+        "every database, then sleep. The relay_outbox beat task does the same one pass at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep when idle")
+        parser.add_argument("--batch-size", type=int, help="Events per delivery (default OUTBOX_BATCH_SIZE)")
+        parser.add_argument("--once", action="store_true", help="One pass, then exit")
+
+    def handle(self, *args, **opts):
+        while True:
+            busy = False
+            for alias in ["default", *shards()]:
+                result = outbox.relay(alias, opts["batch_size"])
+                if any(result.values()):
+                    busy = True
+                    self.stdout.write(f"{alias}: {result['dispatched']} dispatched, {result['delivered']} delivered")
+            if opts["once"]:
+                return
+            if not busy:
+                time.sleep(opts["interval"])
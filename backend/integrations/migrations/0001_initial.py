@@ -0,0 +1,76 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0004_workspace_db_alias'),
+        ('orders', '0007_platformsource_requests_per_minute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRun',
+            fields=[
+                ('run_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('task_name', models.CharField(max_length=200)),
+                ('idempotency_key', models.CharField(max_length=200, unique=True)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_chunks', models.PositiveIntegerField(default=0)),
+                ('done_chunks', models.PositiveIntegerField(default=0)),
+                ('failed_chunks', models.PositiveIntegerField(default=0)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('done_items', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('platform', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.platformsource')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.workspace')),
+            ],
+            options={
+                'db_table': 'task_runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskChunk',
+            fields=[
+                ('chunk_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('index', models.PositiveIntegerField()),
+                ('items', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='integrations.taskrun')),
+            ],
+            options={
+                'db_table': 'task_chunks',
+                'ordering': ['run', 'index'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='taskrun',
+            index=models.Index(fields=['workspace', '-created_at'], name='task_runs_workspa_321b85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskrun',
+            index=models.Index(fields=['workspace', 'status'], name='task_runs_workspa_16d764_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskchunk',
+            index=models.Index(fields=['run', 'status'], name='task_chunks_run_id_010b51_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='taskchunk',
+            unique_together={('run', 'index')},
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_workspace_db_alias'),
+        ('integrations', '0001_initial'),
+        ('orders', '0007_platformsource_requests_per_minute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('sync_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('orders', 'Orders')], default='orders', max_length=20)),
+                ('is_enabled', models.BooleanField(default=True)),
+                ('config', models.JSONField(blank=True, default=dict)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('window_end', models.DateTimeField(blank=True, null=True)),
+                ('cursor', models.CharField(blank=True, max_length=255)),
+                ('records_synced', models.PositiveBigIntegerField(default=0)),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_success_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('platform', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='orders.platformsource')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.workspace')),
+            ],
+            options={
+                'db_table': 'sync_states',
+                'unique_together': {('workspace', 'platform', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_workspace_db_alias'),
+        ('integrations', '0002_syncstate'),
+        ('orders', '0007_platformsource_requests_per_minute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('event_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('body', models.BinaryField()),
+                ('headers', models.JSONField(blank=True, default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('duplicate', 'Duplicate'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('external_id', models.CharField(blank=True, max_length=120)),
+                ('event_version', models.CharField(blank=True, max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('platform', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='orders.platformsource')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.workspace')),
+            ],
+            options={
+                'db_table': 'webhook_events',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['event_id'], name='webhook_events_pending_idx'), models.Index(fields=['workspace', 'platform', 'external_id', 'event_version'], name='webhook_eve_workspa_07fdf1_idx'), models.Index(fields=['status', 'received_at'], name='webhook_eve_status_f769dd_idx')],
+            },
+        ),
+    ]
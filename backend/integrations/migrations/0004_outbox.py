@@ -0,0 +1,97 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:27
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_workspace_db_alias'),
+        ('integrations', '0003_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSubscription',
+            fields=[
+                ('subscription_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('webhook', 'HTTP webhook'), ('redis_stream', 'Redis stream')], default='webhook', max_length=20)),
+                ('target', models.CharField(max_length=500)),
+                ('secret', models.CharField(blank=True, max_length=200)),
+                ('event_types', models.JSONField(blank=True, default=list)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.workspace')),
+            ],
+            options={
+                'db_table': 'event_subscriptions',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('event_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=100)),
+                ('aggregate_type', models.CharField(max_length=50)),
+                ('aggregate_id', models.CharField(max_length=64)),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.workspace')),
+            ],
+            options={
+                'db_table': 'outbox_events',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxDelivery',
+            fields=[
+                ('delivery_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('aggregate_key', models.CharField(max_length=120)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='integrations.eventsubscription')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='integrations.outboxevent')),
+            ],
+            options={
+                'db_table': 'outbox_deliveries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventsubscription',
+            index=models.Index(fields=['workspace', 'is_active'], name='event_subsc_workspa_ad223f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('dispatched_at__isnull', True)), fields=['event_id'], name='outbox_events_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['workspace', 'aggregate_type', 'aggregate_id'], name='outbox_even_workspa_df377d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['created_at'], name='outbox_even_created_dc5a3b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxdelivery',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['subscription', 'event'], name='outbox_deliveries_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxdelivery',
+            index=models.Index(fields=['status', 'delivered_at'], name='outbox_deli_status_324942_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='outboxdelivery',
+            unique_together={('subscription', 'event')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0004_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncstate',
+            name='retry_from',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0005_syncstate_retry_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncFailure',
+            fields=[
+                ('failure_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('external_id', models.CharField(max_length=120)),
+                ('modified_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('parked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sync', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='failures', to='integrations.syncstate')),
+            ],
+            options={
+                'db_table': 'sync_failures',
+                'unique_together': {('sync', 'external_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,321 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from core.managers import WorkspaceManager
+
+
+class TaskRun(models.Model):
+    """One batched background job (e.g. a marketplace sync), split into chunks.
+
+    ``idempotency_key`` deduplicates submissions: submitting the same key
+    again returns the existing run (and resumes it if it failed).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    run_id = models.BigAutoField(primary_key=True)
+    workspace = models.ForeignKey("core.Workspace", on_delete=models.CASCADE)
+    platform = models.ForeignKey("orders.PlatformSource", null=True, blank=True, on_delete=models.SET_NULL)
+    task_name = models.CharField(max_length=200)
+    idempotency_key = models.CharField(max_length=200, unique=True)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+
+    total_chunks = models.PositiveIntegerField(default=0)
+    done_chunks = models.PositiveIntegerField(default=0)
+    failed_chunks = models.PositiveIntegerField(default=0)
+    total_items = models.PositiveIntegerField(default=0)
+    done_items = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "task_runs"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["workspace", "-created_at"]),
+            models.Index(fields=["workspace", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.task_name} #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        return self.done_chunks / self.total_chunks if self.total_chunks else 0.0
+
+
+class TaskChunk(models.Model):
+    """A slice of a run's work items; the unit of retry and resume."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    chunk_id = models.BigAutoField(primary_key=True)
+    run = models.ForeignKey(TaskRun, on_delete=models.CASCADE, related_name="chunks")
+    index = models.PositiveIntegerField()
+    items = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    workspace_lookup = "run__workspace"
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "task_chunks"
+        ordering = ["run", "index"]
+        unique_together = (("run", "index"),)
+        indexes = [
+            models.Index(fields=["run", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.run_id}/{self.index} ({self.status})"
+
+
+class SyncState(models.Model):
+    """Incremental sync position of one marketplace for one workspace.
+
+    ``watermark`` is the modification time up to which every record has been
+    imported. While a sync is paging through ``(watermark, window_end]``,
+    ``cursor`` holds the next page so an interrupted sync resumes there.
+    ``retry_from`` is the earliest modification time of a record that failed
+    to import in the open window; the watermark does not move past it, so
+    the record is fetched and tried again by the next window. Failed records
+    are tracked in :class:`SyncFailure`; once one is parked it no longer
+    holds the watermark.
+    """
+
+    class Kind(models.TextChoices):
+        ORDERS = "orders", "Orders"
+
+    sync_id = models.BigAutoField(primary_key=True)
+    workspace = models.ForeignKey("core.Workspace", on_delete=models.CASCADE)
+    platform = models.ForeignKey("orders.PlatformSource", on_delete=models.PROTECT)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.ORDERS)
+    is_enabled = models.BooleanField(default=True)
+    # client settings, e.g. {"base_url": ..., "api_key": ..., "username": ..., "password": ...}
+    config = models.JSONField(default=dict, blank=True)
+
+    watermark = models.DateTimeField(null=True, blank=True)
+    window_end = models.DateTimeField(null=True, blank=True)
+    cursor = models.CharField(max_length=255, blank=True)
+    retry_from = models.DateTimeField(null=True, blank=True)
+
+    records_synced = models.PositiveBigIntegerField(default=0)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "sync_states"
+        unique_together = (("workspace", "platform", "kind"),)
+
+    def __str__(self):
+        return f"{self.platform} {self.kind} for {self.workspace_id}"
+
+
+class SyncFailure(models.Model):
+    """A record a sync fetched but could not import.
+
+    Every window that fails it again counts an attempt. Until
+    ``SYNC_MAX_ATTEMPTS`` it holds the watermark, so it is fetched again;
+    then it is parked and the watermark moves past it. A parked record comes
+    back when the marketplace changes it (its attempts start over) or when
+    it is retried from the admin. The row is deleted once the record imports.
+    """
+
+    failure_id = models.BigAutoField(primary_key=True)
+    sync = models.ForeignKey(SyncState, on_delete=models.CASCADE, related_name="failures")
+    external_id = models.CharField(max_length=120)
+    modified_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    parked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    workspace_lookup = "sync__workspace"
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "sync_failures"
+        unique_together = (("sync", "external_id"),)
+
+    def __str__(self):
+        return f"{self.external_id} ({self.attempts} attempts)"
+
+
+class WebhookEvent(models.Model):
+    """Raw webhook delivery, stored as received and processed in batches later.
+
+    ``external_id`` / ``event_version`` are filled in while draining; a
+    delivery whose ``(platform, external_id, event_version)`` was already
+    processed is marked duplicate.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSED = "processed", "Processed"
+        DUPLICATE = "duplicate", "Duplicate"
+        FAILED = "failed", "Failed"
+
+    event_id = models.BigAutoField(primary_key=True)
+    workspace = models.ForeignKey("core.Workspace", on_delete=models.CASCADE)
+    platform = models.ForeignKey("orders.PlatformSource", on_delete=models.PROTECT)
+    body = models.BinaryField()
+    headers = models.JSONField(default=dict, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    external_id = models.CharField(max_length=120, blank=True)
+    event_version = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "webhook_events"
+        indexes = [
+            models.Index(
+                fields=["event_id"], name="webhook_events_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+            models.Index(fields=["workspace", "platform", "external_id", "event_version"]),
+            models.Index(fields=["status", "received_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.platform} webhook #{self.pk} ({self.status})"
+
+
+# ---- transactional outbox (integrations.outbox) ----
+
+class OutboxEvent(models.Model):
+    """Domain event written in the same transaction as the change it describes.
+
+    The relay fans each event out to the matching
+    :class:`EventSubscription` rows as :class:`OutboxDelivery` rows and sets
+    ``dispatched_at``; writers never wait for a subscriber.
+    """
+
+    event_id = models.BigAutoField(primary_key=True)
+    workspace = models.ForeignKey("core.Workspace", on_delete=models.CASCADE)
+    event_type = models.CharField(max_length=100)  # e.g. "order.paid"
+    # events of one aggregate are delivered to a subscriber in event_id order
+    aggregate_type = models.CharField(max_length=50)
+    aggregate_id = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "outbox_events"
+        indexes = [
+            models.Index(
+                fields=["event_id"], name="outbox_events_pending_idx",
+                condition=models.Q(dispatched_at__isnull=True),
+            ),
+            models.Index(fields=["workspace", "aggregate_type", "aggregate_id"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.aggregate_type}:{self.aggregate_id} (#{self.pk})"
+
+
+class EventSubscription(models.Model):
+    """A subscriber of a workspace's outbox events."""
+
+    class Kind(models.TextChoices):
+        WEBHOOK = "webhook", "HTTP webhook"
+        REDIS_STREAM = "redis_stream", "Redis stream"
+
+    subscription_id = models.BigAutoField(primary_key=True)
+    workspace = models.ForeignKey("core.Workspace", on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.WEBHOOK)
+    # webhook URL, or the stream name for Redis streams
+    target = models.CharField(max_length=500)
+    # webhooks are signed with it (X-Outbox-Signature: sha256=<hex>)
+    secret = models.CharField(max_length=200, blank=True)
+    # empty: every event type
+    event_types = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    last_delivered_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "event_subscriptions"
+        indexes = [
+            models.Index(fields=["workspace", "is_active"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()})"
+
+    def wants(self, event_type):
+        return not self.event_types or event_type in self.event_types
+
+
+class OutboxDelivery(models.Model):
+    """One event owed to one subscription; retried with backoff until delivered."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DELIVERED = "delivered", "Delivered"
+        FAILED = "failed", "Failed"
+
+    delivery_id = models.BigAutoField(primary_key=True)
+    subscription = models.ForeignKey(EventSubscription, on_delete=models.CASCADE, related_name="deliveries")
+    event = models.ForeignKey(OutboxEvent, on_delete=models.CASCADE, related_name="deliveries")
+    # copied from the event so ordering checks need no join
+    aggregate_key = models.CharField(max_length=120)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    workspace_lookup = "subscription__workspace"
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "outbox_deliveries"
+        unique_together = (("subscription", "event"),)
+        indexes = [
+            models.Index(
+                fields=["subscription", "event"], name="outbox_deliveries_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+            models.Index(fields=["status", "delivered_at"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.event_id} -> {self.subscription_id} ({self.status})"
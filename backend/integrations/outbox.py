@@ -0,0 +1,286 @@
+"""Transactional outbox: domain events for other systems, delivered by a relay.
+
+Writers call :func:`record` (or :func:`record_many`) inside the transaction
+that makes the change, e.g. ``order.paid``, ``print_job.completed`` or
+``filament.below_reorder_point``. That is one INSERT into ``outbox_events``
+on the workspace's shard, committed or rolled back with the change itself;
+nothing talks to a subscriber inline.
+
+The relay (:func:`relay`, run by the ``relay_outbox`` beat task or the
+``run_outbox_relay`` command) works per database alias:
+
+1. fan-out: new events become one :class:`~integrations.models.OutboxDelivery`
+   per matching :class:`~integrations.models.EventSubscription`;
+2. delivery: per subscription, due deliveries go out in batches, either as
+   one signed HTTP POST with a JSON list over a pooled ``requests`` session,
+   or as one pipelined round of ``XADD`` to a Redis stream.
+
+Delivery is at-least-once. A batch counts as delivered only once the
+subscriber acknowledged it (2xx), so receivers dedupe by ``id``.
+
+Events of one aggregate reach a subscriber in ``event_id`` order. While an
+aggregate has an earlier delivery waiting for its retry, its later events
+are held back; other aggregates are not blocked. After
+``OUTBOX_MAX_ATTEMPTS`` a delivery is marked failed (dead letter, can be
+retried from the admin) and stops holding its aggregate back.
+"""
+import hashlib
+import hmac
+import json
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import redis
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EventSubscription, OutboxDelivery, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Outbox-Signature"
+# fan-out and each subscription's deliveries run in one relay at a time
+LOCK_TIMEOUT = 5 * 60
+
+
+class DeliveryError(Exception):
+    """The subscriber did not acknowledge a batch; it is retried with backoff."""
+
+
+# ---- writing ----
+
+def event(workspace_id, event_type, aggregate, payload):
+    """Unsaved event about ``aggregate`` (a model instance) for :func:`record_many`."""
+    return OutboxEvent(
+        workspace_id=workspace_id, event_type=event_type,
+        aggregate_type=aggregate._meta.model_name, aggregate_id=str(aggregate.pk), payload=payload,
+    )
+
+
+def record(workspace_id, event_type, aggregate, payload):
+    """Write one event as part of the current transaction."""
+    obj = event(workspace_id, event_type, aggregate, payload)
+    obj.save(using=OutboxEvent.objects.for_workspace(workspace_id).db)
+    return obj
+
+
+def record_many(workspace_id, events):
+    if events:
+        OutboxEvent.objects.for_workspace(workspace_id).bulk_create(events)
+
+
+# ---- relay ----
+
+def _acquire(lock):
+    return cache.add(lock, 1, LOCK_TIMEOUT)
+
+
+def dispatch(alias, batch_size):
+    """Turn up to ``batch_size`` new events on ``alias`` into deliveries; returns how many."""
+    with transaction.atomic(using=alias):
+        events = list(
+            OutboxEvent.objects.using(alias).filter(dispatched_at__isnull=True).order_by("event_id")[:batch_size]
+        )
+        if not events:
+            return 0
+        subscriptions = defaultdict(list)
+        for subscription in EventSubscription.objects.using(alias).filter(
+            workspace_id__in={e.workspace_id for e in events}, is_active=True
+        ):
+            subscriptions[subscription.workspace_id].append(subscription)
+        deliveries = [
+            OutboxDelivery(
+                subscription=subscription, event=e, aggregate_key=f"{e.aggregate_type}:{e.aggregate_id}"
+            )
+            for e in events
+            for subscription in subscriptions[e.workspace_id]
+            if subscription.wants(e.event_type)
+        ]
+        OutboxDelivery.objects.using(alias).bulk_create(deliveries, ignore_conflicts=True)
+        OutboxEvent.objects.using(alias).filter(pk__in=[e.pk for e in events]).update(dispatched_at=timezone.now())
+    return len(events)
+
+
+def _due(alias, subscription, batch_size, now):
+    """The next batch in event order, skipping aggregates with an earlier delivery not yet due."""
+    pending = (
+        OutboxDelivery.objects.using(alias)
+        .filter(subscription=subscription, status=OutboxDelivery.Status.PENDING)
+        .select_related("event")
+        .order_by("event_id")[:batch_size * 5]
+    )
+    batch, held = [], set()
+    for delivery in pending:
+        if delivery.aggregate_key in held:
+            continue
+        if delivery.next_attempt_at is not None and delivery.next_attempt_at > now:
+            held.add(delivery.aggregate_key)
+            continue
+        batch.append(delivery)
+        if len(batch) == batch_size:
+            break
+    return batch
+
+
+def message(e):
+    return {
+        "id": e.event_id,
+        "type": e.event_type,
+        "workspace_id": e.workspace_id,
+        "aggregate": {"type": e.aggregate_type, "id": e.aggregate_id},
+        "occurred_at": e.created_at,
+        "data": e.payload,
+    }
+
+
+def deliver(alias, subscription, batch_size):
+    """Send one batch of ``subscription``'s due deliveries; returns how many were acknowledged."""
+    now = timezone.now()
+    batch = _due(alias, subscription, batch_size, now)
+    if not batch:
+        return 0
+    try:
+        TRANSPORTS[subscription.kind](subscription, [message(d.event) for d in batch])
+    except DeliveryError as exc:
+        _failed(alias, subscription, batch, str(exc), now)
+        return 0
+    OutboxDelivery.objects.using(alias).filter(pk__in=[d.pk for d in batch]).update(
+        status=OutboxDelivery.Status.DELIVERED, delivered_at=now, next_attempt_at=None, error=""
+    )
+    EventSubscription.objects.using(alias).filter(pk=subscription.pk).update(last_delivered_at=now, last_error="")
+    return len(batch)
+
+
+def _failed(alias, subscription, batch, error, now):
+    logger.warning("Outbox delivery to %s failed: %s", subscription, error)
+    for delivery in batch:
+        delivery.attempts += 1
+        delivery.error = error
+        if delivery.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            delivery.status = OutboxDelivery.Status.FAILED
+            delivery.next_attempt_at = None
+        else:
+            delivery.next_attempt_at = now + timedelta(seconds=get_exponential_backoff_interval(
+                settings.OUTBOX_RETRY_BACKOFF, delivery.attempts - 1, settings.OUTBOX_RETRY_BACKOFF_MAX,
+                full_jitter=False,
+            ))
+    OutboxDelivery.objects.using(alias).bulk_update(batch, ["attempts", "error", "status", "next_attempt_at"])
+    EventSubscription.objects.using(alias).filter(pk=subscription.pk).update(last_error=error)
+
+
+def relay(alias, batch_size=None, max_batches=20):
+    """One relay pass over ``alias``: fan out new events, then deliver what is due."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    dispatched = delivered = 0
+    # a single dispatcher per alias keeps deliveries in event order
+    fanout_lock = f"outbox:{alias}:dispatch"
+    if _acquire(fanout_lock):
+        try:
+            for _ in range(max_batches):
+                count = dispatch(alias, batch_size)
+                dispatched += count
+                if count < batch_size:
+                    break
+        finally:
+            cache.delete(fanout_lock)
+
+    subscriptions = EventSubscription.objects.using(alias).filter(
+        is_active=True, deliveries__status=OutboxDelivery.Status.PENDING
+    ).distinct()
+    for subscription in subscriptions:
+        lock = f"outbox:{alias}:subscription:{subscription.pk}"
+        if not _acquire(lock):
+            continue
+        try:
+            for _ in range(max_batches):
+                count = deliver(alias, subscription, batch_size)
+                delivered += count
+                if count < batch_size:
+                    break
+        finally:
+            cache.delete(lock)
+    return {"dispatched": dispatched, "delivered": delivered}
+
+
+def prune(alias, days=None):
+    """Delete delivered work older than ``OUTBOX_RETENTION_DAYS``; failed deliveries are kept."""
+    cutoff = timezone.now() - timedelta(days=days or settings.OUTBOX_RETENTION_DAYS)
+    deliveries, _ = OutboxDelivery.objects.using(alias).filter(
+        status=OutboxDelivery.Status.DELIVERED, delivered_at__lt=cutoff
+    ).delete()
+    events, _ = OutboxEvent.objects.using(alias).filter(
+        dispatched_at__lt=cutoff, deliveries__isnull=True
+    ).delete()
+    return deliveries, events
+
+
+# ---- transports ----
+
+_http = None
+_redis = None
+
+
+def _session():
+    """Process-wide session: connections to each subscriber are kept alive and reused."""
+    global _http
+    if _http is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.OUTBOX_HTTP_POOL_SIZE,
+                              pool_maxsize=settings.OUTBOX_HTTP_POOL_SIZE)
+        _http.mount("http://", adapter)
+        _http.mount("https://", adapter)
+        _http.headers["User-Agent"] = "3dprintflow-outbox"
+    return _http
+
+
+def sign(secret, body):
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def post_webhook(subscription, messages):
+    import requests
+
+    body = json.dumps({"events": messages}, cls=DjangoJSONEncoder).encode()
+    headers = {"Content-Type": "application/json"}
+    if subscription.secret:
+        headers[SIGNATURE_HEADER] = sign(subscription.secret, body)
+    try:
+        response = _session().post(
+            subscription.target, data=body, headers=headers, timeout=settings.OUTBOX_HTTP_TIMEOUT
+        )
+    except requests.RequestException as exc:
+        raise DeliveryError(f"{type(exc).__name__}: {exc}") from exc
+    if not 200 <= response.status_code < 300:
+        raise DeliveryError(f"{subscription.target} answered {response.status_code}")
+
+
+def add_to_stream(subscription, messages):
+    global _redis
+    if not settings.OUTBOX_REDIS_URL:
+        raise DeliveryError("OUTBOX_REDIS_URL is not set")
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.OUTBOX_REDIS_URL)
+    try:
+        with _redis.pipeline(transaction=False) as pipe:
+            for msg in messages:
+                pipe.xadd(
+                    subscription.target, {"event": json.dumps(msg, cls=DjangoJSONEncoder)},
+                    maxlen=settings.OUTBOX_STREAM_MAXLEN, approximate=True,
+                )
+            pipe.execute()
+    except redis.RedisError as exc:
+        raise DeliveryError(f"{type(exc).__name__}: {exc}") from exc
+
+
+TRANSPORTS = {
+    EventSubscription.Kind.WEBHOOK: post_webhook,
+    EventSubscription.Kind.REDIS_STREAM: add_to_stream,
+}
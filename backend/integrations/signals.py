@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import SyncState
+from .webhooks import forget_secret
+
+
+@receiver([post_save, post_delete], sender=SyncState)
+def refresh_webhook_secret(sender, instance, **kwargs):
+    forget_secret(instance.workspace_id, instance.platform.platform_name)
@@ -0,0 +1,122 @@
+"""Watermark-based incremental marketplace sync.
+
+Every run asks the platform only for records modified since the stored
+watermark (minus a small overlap for clock skew; the upsert is idempotent),
+so steady-state cost follows the number of changes, not the catalogue size.
+Records the upsert rejects hold the watermark back (see
+``SyncState.retry_from``) and are listed in ``last_error``. Each is tracked
+as a :class:`~integrations.models.SyncFailure`; after ``SYNC_MAX_ATTEMPTS``
+windows it is parked and no longer holds the watermark, so a record that can
+never import does not make every later sync fetch all history after it.
+Records without an external id cannot be tracked or retried and never hold
+it.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from orders.upsert import UpsertResult, upsert_orders
+
+from .clients import client_for
+from .models import SyncFailure, SyncState
+from .toolkit import RateLimiter
+
+OVERLAP = timedelta(minutes=2)
+# where to hold the watermark for a failed record without a modification time
+# on the very first sync: the next window starts from the beginning again
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def run_sync(state, client=None, now=None):
+    """Pull everything changed since ``state.watermark`` and upsert it page by page.
+
+    The window end is fixed when a window opens and saved with the cursor,
+    so an interrupted sync resumes at the page it stopped on. Each page is
+    written together with the new cursor in one transaction, and the
+    watermark only advances with the last page.
+    """
+    client = client or client_for(state)
+    states = SyncState.objects.for_workspace(state.workspace_id)
+    now = now or timezone.now()
+    if state.window_end is None:
+        state.window_end, state.cursor = now, ""
+    state.last_started_at = now
+    state.save(update_fields=["window_end", "cursor", "last_started_at", "updated_at"])
+
+    failures = {f.external_id: f for f in SyncFailure.objects.for_workspace(state.workspace_id).filter(sync=state)}
+    since = state.watermark - OVERLAP if state.watermark else None
+    limiter = RateLimiter(state.platform)
+    total = UpsertResult()
+    while True:
+        limiter.acquire()
+        page = client.fetch_orders(since, state.window_end, state.cursor or None)
+        with transaction.atomic(using=states.db):
+            result = upsert_orders(state.workspace_id, state.platform, page.records)
+            total += result
+            if result.errors or failures:
+                _track_failures(state, failures, page.records, result.errors, states.db)
+            state.records_synced += len(page.records)
+            if page.next_cursor:
+                state.cursor = page.next_cursor
+            else:
+                watermark = state.window_end
+                if state.retry_from is not None:
+                    watermark = min(watermark, state.retry_from)
+                state.watermark, state.window_end, state.cursor = watermark, None, ""
+                state.retry_from = None
+                state.last_success_at, state.last_error = timezone.now(), _describe(total.errors, failures)
+            state.save(update_fields=[
+                "watermark", "window_end", "cursor", "retry_from", "records_synced",
+                "last_success_at", "last_error", "updated_at",
+            ])
+        if not page.next_cursor:
+            return total
+
+
+def _track_failures(state, failures, records, errors, db):
+    """Count an attempt per failed record and forget the ones that imported.
+
+    Records that are not parked keep the watermark at or before the
+    earliest of them.
+    """
+    failed = {str(e["external_id"]): e["error"] for e in errors if e["external_id"]}
+    imported = [
+        key for key in (str(r["external_id"]) for r in records if r.get("external_id"))
+        if key in failures and key not in failed
+    ]
+    if imported:
+        SyncFailure.objects.using(db).filter(pk__in=[failures.pop(key).pk for key in imported]).delete()
+
+    modified = {str(r.get("external_id")): r.get("modified_at") for r in records}
+    for key, error in failed.items():
+        at = modified.get(key)
+        failure = failures.get(key) or SyncFailure(sync=state, external_id=key)
+        if at and failure.modified_at and at > failure.modified_at:
+            # changed on the marketplace since it was parked: try it afresh
+            failure.attempts, failure.parked_at = 0, None
+        failure.modified_at = at or failure.modified_at
+        failure.attempts += 1
+        failure.error = error
+        if failure.parked_at is None and failure.attempts >= settings.SYNC_MAX_ATTEMPTS:
+            failure.parked_at = timezone.now()
+        failure.save(using=db)
+        failures[key] = failure
+        if failure.parked_at is None:
+            hold = at or state.watermark or EPOCH
+            if state.retry_from is None or hold < state.retry_from:
+                state.retry_from = hold
+
+
+def _describe(errors, failures, limit=20):
+    if not errors:
+        return ""
+    lines = []
+    for e in errors[:limit]:
+        failure = failures.get(str(e["external_id"]))
+        parked = " (parked)" if failure is not None and failure.parked_at else ""
+        lines.append(f"{e['external_id']}: {e['error']}{parked}")
+    if len(errors) > limit:
+        lines.append(f"... and {len(errors) - limit} more")
+    return f"{len(errors)} records not imported; parked ones are only retried when they change:\n" + "\n".join(lines)
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from core.sharding import shards
+
+from . import outbox, webhooks
+from .models import SyncState, TaskChunk, TaskRun, WebhookEvent
+from .sync import run_sync
+from .toolkit import CLAIM_TIMEOUT, RetryableError, resume_run
+
+SYNC_LOCK_TIMEOUT = 60 * 60
+
+
+@shared_task
+def resume_stalled_runs():
+    """Requeue runs whose chunks were lost with a dead worker or a dropped message."""
+    cutoff = timezone.now() - timedelta(seconds=CLAIM_TIMEOUT * 2)
+    resumed = 0
+    for alias in ["default", *shards()]:
+        stalled = TaskRun.objects.using(alias).filter(
+            status__in=[TaskRun.Status.PENDING, TaskRun.Status.RUNNING], updated_at__lt=cutoff
+        ).filter(
+            Q(chunks__status=TaskChunk.Status.PENDING)
+            | Q(chunks__status=TaskChunk.Status.RUNNING, chunks__started_at__lt=cutoff)
+        ).distinct()
+        for run in stalled:
+            resumed += resume_run(run, include_running=True)
+    return resumed
+
+
+@shared_task
+def sync_marketplaces():
+    """Beat entry point: queue an incremental sync per enabled ``SyncState``."""
+    queued = 0
+    for alias in ["default", *shards()]:
+        for state_id, workspace_id in SyncState.objects.using(alias).filter(is_enabled=True).values_list(
+            "pk", "workspace_id"
+        ):
+            sync_platform.delay(workspace_id, state_id)
+            queued += 1
+    return queued
+
+
+@shared_task(
+    bind=True, acks_late=True, autoretry_for=(RetryableError,), max_retries=6,
+    retry_backoff=10, retry_backoff_max=600, retry_jitter=True,
+)
+def sync_platform(self, workspace_id, state_id):
+    lock = f"sync:{state_id}:lock"
+    if not cache.add(lock, self.request.id or "local", SYNC_LOCK_TIMEOUT):
+        return None  # the previous sync of this state is still running
+    try:
+        states = SyncState.objects.for_workspace(workspace_id)
+        state = states.select_related("platform").get(pk=state_id)
+        try:
+            result = run_sync(state)
+        except Exception as exc:
+            states.filter(pk=state_id).update(last_error=f"{type(exc).__name__}: {exc}")
+            raise
+        return result.as_dict()
+    finally:
+        cache.delete(lock)
+
+
+@shared_task
+def drain_webhooks(batch_size=500, max_batches=20):
+    """Apply pending inbox events in batches (beat, every few seconds)."""
+    handled = 0
+    for alias in ["default", *shards()]:
+        for _ in range(max_batches):
+            count = webhooks.drain(alias, batch_size)
+            handled += count
+            if count < batch_size:
+                break
+    return handled
+
+
+@shared_task
+def prune_webhook_inbox(days=None):
+    days = days if days is not None else settings.WEBHOOK_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    for alias in ["default", *shards()]:
+        deleted += WebhookEvent.objects.using(alias).filter(
+            status__in=[WebhookEvent.Status.PROCESSED, WebhookEvent.Status.DUPLICATE], received_at__lt=cutoff
+        )._raw_delete(alias)
+    return deleted
+
+
+@shared_task
+def relay_outbox():
+    """Fan out and deliver outbox events (beat, every few seconds; see integrations.outbox)."""
+    totals = {"dispatched": 0, "delivered": 0}
+    for alias in ["default", *shards()]:
+        for key, count in outbox.relay(alias).items():
+            totals[key] += count
+    return totals
+
+
+@shared_task
+def prune_outbox(days=None):
+    deleted = 0
+    for alias in ["default", *shards()]:
+        deleted += sum(outbox.prune(alias, days))
+    return deleted
@@ -0,0 +1,475 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from celery import current_app
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from core.models import Workspace
+from orders.models import Customer, Order, OrderItem, OrderStatus, PlatformSource
+from orders.upsert import upsert_orders
+from users.models import User
+
+from . import outbox
+from .clients import client_for
+from .models import (
+    EventSubscription, OutboxDelivery, OutboxEvent, SyncFailure, SyncState, TaskChunk, TaskRun, WebhookEvent,
+)
+from .sync import run_sync
+from .tasks import resume_stalled_runs
+from .toolkit import CLAIM_TIMEOUT, RetryableError, chunk_task, submit_batched
+from .webhooks import drain, endpoint_secret, sign
+
+
+def billbee_order(order_id, modified, total="20.00", state=3, items=1):
+    return {
+        "BillBeeOrderId": order_id,
+        "OrderNumber": f"BB-{order_id}",
+        "State": state,
+        "Currency": "EUR",
+        "TotalCost": total,
+        "LastModifiedAt": modified.strftime("%Y-%m-%dT%H:%M:%S"),
+        "Customer": {"Id": 1000 + order_id % 7, "Name": "Buyer", "Email": f"buyer{order_id % 7}@example.com"},
+        "ShippingAddress": {"FirstName": "Ada", "LastName": "L", "City": "Tunis", "CountryISO2": "TN"},
+        "OrderItems": [
+            {"BillbeeId": order_id * 10 + n, "Quantity": 1, "TotalPrice": "10.00",
+             "Product": {"Id": n, "SKU": f"SKU-{n}", "Title": f"Part {n}"}}
+            for n in range(items)
+        ],
+    }
+
+
+class StubBillbee:
+    """In-process stand-in for Billbee's ``/api/v1/orders`` endpoint."""
+
+    def __init__(self):
+        self.orders = {}
+        self.requests = []
+        self.fail_pages = set()
+        handler = self._handler()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def put(self, order_id, modified, **kwargs):
+        self.orders[order_id] = billbee_order(order_id, modified, **kwargs)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                stub.requests.append(query)
+                page, size = int(query["page"]), int(query["pageSize"])
+                if page in stub.fail_pages:
+                    stub.fail_pages.discard(page)
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                low, high = query.get("modifiedAtMin", ""), query["modifiedAtMax"]
+                rows = sorted(
+                    (o for o in stub.orders.values() if low <= o["LastModifiedAt"] <= high),
+                    key=lambda o: o["BillBeeOrderId"],
+                )
+                pages = (len(rows) + size - 1) // size
+                body = json.dumps({
+                    "Paging": {"Page": page, "TotalPages": pages, "TotalRows": len(rows), "PageSize": size},
+                    "Data": rows[(page - 1) * size:page * size],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class IncrementalSyncTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="sync", email="sync@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Sync shop", owner=owner)
+        self.platform = PlatformSource.objects.create(platform_name="Billbee")
+        self.stub = StubBillbee().__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.state = SyncState.objects.create(
+            workspace=self.workspace, platform=self.platform,
+            config={"base_url": self.stub.url, "api_key": "k", "username": "u", "password": "p"},
+        )
+        self.t0 = datetime(2024, 5, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+    def sync(self, minutes, page_size=None):
+        client = client_for(self.state)
+        if page_size:
+            client.PAGE_SIZE = page_size
+        return run_sync(self.state, client=client, now=self.t0 + timedelta(minutes=minutes))
+
+    def test_full_then_incremental(self):
+        for order_id in range(1, 31):
+            self.stub.put(order_id, self.t0 - timedelta(days=1), items=2)
+        result = self.sync(10, page_size=10)
+        self.assertEqual(result.created, 30)
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertNotIn("modifiedAtMin", self.stub.requests[0])
+        self.assertEqual(Order.objects.for_workspace(self.workspace).count(), 30)
+        self.assertEqual(OrderItem.objects.for_workspace(self.workspace).count(), 60)
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.watermark, self.t0 + timedelta(minutes=10))
+        self.assertIsNone(self.state.window_end)
+
+        # nothing changed: one request, nothing written
+        self.stub.requests.clear()
+        result = self.sync(20, page_size=10)
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual((result.created, result.updated), (0, 0))
+
+        # one changed order: only it comes back and only it is updated
+        self.stub.put(7, self.t0 + timedelta(minutes=25), total="99.00", state=4, items=3)
+        self.stub.requests.clear()
+        with self.assertNumQueries(19):
+            result = self.sync(30, page_size=10)
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 1, 0))
+        order = Order.objects.for_workspace(self.workspace).get(external_id="7")
+        self.assertEqual(str(order.total_cost), "99.00")
+        self.assertEqual(order.status.status_name, "Shipped")
+        self.assertTrue(order.totals_locked)
+        self.assertEqual(order.items.count(), 3)
+
+    def test_failed_page_resumes_from_cursor(self):
+        for order_id in range(1, 26):
+            self.stub.put(order_id, self.t0 - timedelta(hours=1))
+        self.stub.fail_pages = {2}
+        with self.assertRaises(RetryableError):
+            self.sync(10, page_size=10)
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.cursor, "2")
+        self.assertIsNone(self.state.watermark)
+        self.assertEqual(Order.objects.for_workspace(self.workspace).count(), 10)
+
+        self.stub.requests.clear()
+        self.sync(15, page_size=10)
+        self.assertEqual([r["page"] for r in self.stub.requests], ["2", "3"])
+        # the window opened by the failed run is kept, so nothing is skipped
+        self.assertEqual(self.stub.requests[0]["modifiedAtMax"], "2024-05-01T08:10:00")
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.watermark, self.t0 + timedelta(minutes=10))
+        self.assertEqual(Order.objects.for_workspace(self.workspace).count(), 25)
+
+    def test_rejected_records_hold_the_watermark(self):
+        for order_id in range(1, 6):
+            self.stub.put(order_id, self.t0 - timedelta(hours=order_id))
+        self.stub.orders[2]["Customer"] = {}
+        result = self.sync(10)
+        self.assertEqual(result.created, 4)
+        self.assertEqual(result.errors, [{"external_id": "2", "error": "New order without a customer external_id."}])
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.watermark, self.t0 - timedelta(hours=2))
+        self.assertIsNone(self.state.retry_from)
+        self.assertIn("2: New order without a customer", self.state.last_error)
+
+        # the next window reaches back to the failed record, which now imports
+        self.stub.put(2, self.t0 - timedelta(hours=2))
+        self.stub.requests.clear()
+        result = self.sync(20)
+        self.assertEqual(self.stub.requests[0]["modifiedAtMin"], "2024-05-01T05:58:00")
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.state.refresh_from_db()
+        self.assertEqual((self.state.watermark, self.state.last_error), (self.t0 + timedelta(minutes=20), ""))
+        self.assertFalse(SyncFailure.objects.exists())
+
+    @override_settings(SYNC_MAX_ATTEMPTS=2)
+    def test_records_that_keep_failing_are_parked(self):
+        for order_id in range(1, 4):
+            self.stub.put(order_id, self.t0 - timedelta(days=order_id))
+        self.stub.orders[3]["Customer"] = {}
+        self.sync(10)
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.watermark, self.t0 - timedelta(days=3))
+
+        # the second failure parks it, and the watermark moves past it
+        self.sync(20)
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.watermark, self.t0 + timedelta(minutes=20))
+        failure = SyncFailure.objects.get(sync=self.state)
+        self.assertEqual((failure.external_id, failure.attempts), ("3", 2))
+        self.assertIsNotNone(failure.parked_at)
+        self.assertIn("3: New order without a customer external_id. (parked)", self.state.last_error)
+
+        # later syncs only fetch what changed
+        self.stub.requests.clear()
+        self.sync(30)
+        self.assertEqual(self.stub.requests[0]["modifiedAtMin"], "2024-05-01T08:18:00")
+        self.state.refresh_from_db()
+        self.assertEqual((self.state.watermark, self.state.last_error), (self.t0 + timedelta(minutes=30), ""))
+
+        # once the marketplace fixes the record it comes back and imports
+        self.stub.put(3, self.t0 + timedelta(minutes=35))
+        self.sync(40)
+        self.assertTrue(Order.objects.for_workspace(self.workspace).filter(external_id="3").exists())
+        self.assertFalse(SyncFailure.objects.exists())
+
+
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="hooks", email="hooks@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Hook shop", owner=owner)
+        self.platform = PlatformSource.objects.create(platform_name="Billbee")
+        SyncState.objects.create(
+            workspace=self.workspace, platform=self.platform, config={"webhook_secret": "s3cret"}
+        )
+        self.url = reverse("webhook-receiver", args=[self.workspace.pk, "billbee"])
+
+    def deliver(self, order_id, modified, total="20.00", secret="s3cret"):
+        body = json.dumps(billbee_order(order_id, modified, total=total)).encode()
+        return self.client.post(
+            self.url, body, content_type="application/json",
+            HTTP_X_WEBHOOK_SIGNATURE=sign(secret, body),
+        )
+
+    def test_receiver_is_one_insert(self):
+        endpoint_secret(self.workspace.pk, "billbee")  # warm the secret cache
+        with self.assertNumQueries(1):
+            response = self.deliver(1, datetime(2024, 5, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.deliver(1, datetime(2024, 5, 1), secret="wrong").status_code, 401)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_drain_dedupes_retries_and_stale_versions(self):
+        t = datetime(2024, 5, 1, 8, tzinfo=dt_timezone.utc)
+        self.deliver(1, t, total="10.00")
+        self.deliver(1, t, total="10.00")  # marketplace retry
+        self.deliver(1, t + timedelta(minutes=5), total="12.00")
+        self.deliver(2, t)
+        self.assertEqual(drain("default"), 4)
+
+        statuses = dict(
+            WebhookEvent.objects.filter(status=WebhookEvent.Status.PROCESSED).values_list("external_id", "event_version")
+        )
+        self.assertEqual(statuses, {"1": "2024-05-01T08:05:00", "2": "2024-05-01T08:00:00"})
+        self.assertEqual(WebhookEvent.objects.filter(status=WebhookEvent.Status.DUPLICATE).count(), 2)
+        order = Order.objects.for_workspace(self.workspace).get(external_id="1")
+        self.assertEqual(str(order.total_cost), "12.00")
+
+        # a late redelivery of the old version does not roll the order back
+        self.deliver(1, t, total="10.00")
+        drain("default")
+        order.refresh_from_db()
+        self.assertEqual(str(order.total_cost), "12.00")
+        self.assertEqual(WebhookEvent.objects.filter(status=WebhookEvent.Status.DUPLICATE).count(), 3)
+
+    def test_rejected_records_fail_their_event(self):
+        t = datetime(2024, 5, 1, 8, tzinfo=dt_timezone.utc)
+        order = billbee_order(1, t)
+        order["Customer"] = {}
+        body = json.dumps(order).encode()
+        self.client.post(self.url, body, content_type="application/json", HTTP_X_WEBHOOK_SIGNATURE=sign("s3cret", body))
+        self.deliver(2, t)
+        drain("default")
+        failed = WebhookEvent.objects.get(status=WebhookEvent.Status.FAILED)
+        self.assertEqual((failed.external_id, failed.error), ("1", "New order without a customer external_id."))
+        self.assertEqual(WebhookEvent.objects.filter(status=WebhookEvent.Status.PROCESSED).count(), 1)
+
+
+class StubSubscriber:
+    """Webhook subscriber recording every POST; answers 503 ``fail`` times first."""
+
+    def __init__(self, fail=0):
+        self.batches = []
+        self.signatures = []
+        self.fail = fail
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if stub.fail:
+                    stub.fail -= 1
+                    self.send_response(503)
+                else:
+                    stub.batches.append(json.loads(body)["events"])
+                    stub.signatures.append((self.headers.get(outbox.SIGNATURE_HEADER), body))
+                    self.send_response(204)
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hooks"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# items seen by collect_items, and items that make it fail (once, or always)
+SEEN, FAIL_ONCE, FAIL = [], set(), set()
+
+
+@chunk_task(retry_backoff=0)
+def collect_items(ctx, items):
+    for item in items:
+        if item in FAIL_ONCE:
+            FAIL_ONCE.discard(item)
+            raise RetryableError(f"item {item} timed out")
+        if item in FAIL:
+            raise ValueError(f"item {item} is broken")
+    SEEN.extend(items)
+    return {"seen": len(items)}
+
+
+class BatchedTaskTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SEEN.clear()
+        FAIL_ONCE.clear()
+        FAIL.clear()
+        eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, "task_always_eager", eager)
+        owner = User.objects.create_user(username="batched", email="batched@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Batch shop", owner=owner)
+
+    def submit(self, items, key="job", execute=True):
+        with self.captureOnCommitCallbacks(execute=execute):
+            run = submit_batched(collect_items, self.workspace, items, key=key, chunk_size=2)
+        run.refresh_from_db()
+        return run
+
+    def test_submitting_a_key_again_is_a_no_op(self):
+        run = self.submit([1, 2, 3])
+        self.assertEqual((run.status, run.total_chunks, run.done_items), (TaskRun.Status.SUCCEEDED, 2, 3))
+        again = self.submit([1, 2, 3, 4, 5])
+        self.assertEqual(again.pk, run.pk)
+        self.assertEqual(TaskRun.objects.count(), 1)
+        self.assertEqual(TaskChunk.objects.count(), 2)
+        self.assertEqual(sorted(SEEN), [1, 2, 3])
+
+    def test_default_key_covers_the_items(self):
+        run = self.submit([1, 2, 3], key=None)
+        self.assertEqual(self.submit([1, 2, 3], key=None).pk, run.pk)
+        other = self.submit([4, 5], key=None)
+        self.assertNotEqual(other.pk, run.pk)
+        self.assertEqual((other.status, other.total_items), (TaskRun.Status.SUCCEEDED, 2))
+        self.assertEqual(TaskRun.objects.count(), 2)
+        self.assertEqual(TaskChunk.objects.count(), 3)
+        self.assertEqual(sorted(SEEN), [1, 2, 3, 4, 5])
+
+    def test_transient_failures_are_retried(self):
+        FAIL_ONCE.add(3)
+        run = self.submit([1, 2, 3])
+        self.assertEqual(run.status, TaskRun.Status.SUCCEEDED)
+        self.assertEqual(list(run.chunks.values_list("attempts", flat=True)), [1, 2])
+        self.assertEqual(sorted(SEEN), [1, 2, 3])
+
+    def test_failed_chunks_resume_on_resubmission(self):
+        FAIL.add(3)
+        with self.assertLogs("integrations.toolkit", "WARNING"):
+            run = self.submit([1, 2, 3, 4, 5])
+        self.assertEqual((run.status, run.done_chunks, run.failed_chunks), (TaskRun.Status.FAILED, 2, 1))
+        self.assertIn("item 3 is broken", run.chunks.get(index=1).error)
+
+        FAIL.clear()
+        run = self.submit([1, 2, 3, 4, 5])
+        self.assertEqual((run.status, run.done_chunks, run.failed_chunks), (TaskRun.Status.SUCCEEDED, 3, 0))
+        # only the failed chunk ran again
+        self.assertEqual(SEEN, [1, 2, 5, 3, 4])
+
+    def test_resume_stalled_runs(self):
+        stalled = self.submit([1, 2, 3], key="lost", execute=False)  # messages never delivered
+        fresh = self.submit([4], key="queued", execute=False)
+        long_ago = timezone.now() - timedelta(seconds=CLAIM_TIMEOUT * 3)
+        TaskRun.objects.filter(pk=stalled.pk).update(updated_at=long_ago)
+        # a worker died holding the second chunk
+        stalled.chunks.filter(index=1).update(status=TaskChunk.Status.RUNNING, started_at=long_ago)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(resume_stalled_runs(), 2)
+        stalled.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stalled.status, TaskRun.Status.SUCCEEDED)
+        self.assertEqual(fresh.status, TaskRun.Status.PENDING)
+        self.assertEqual(sorted(SEEN), [1, 2, 3])
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="outbox", email="outbox@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Outbox shop", owner=owner)
+        self.customer = Customer.objects.create(workspace=self.workspace, name="Ada")
+        self.status = OrderStatus.objects.create(status_name="Paid")
+
+    def order(self, number, **kwargs):
+        return Order.objects.create(
+            workspace=self.workspace, order_number=number, customer=self.customer, status=self.status, **kwargs
+        )
+
+    def test_events_are_written_with_the_change(self):
+        order = self.order("1")
+        self.assertFalse(OutboxEvent.objects.exists())
+        order.paid_at = timezone.now()
+        order.save()
+        order.save()  # still paid: no second event
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.event_type, event.aggregate_id), ("order.paid", str(order.pk)))
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.order("2", paid_at=timezone.now())
+            raise RuntimeError  # rolled back together with the order
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+        platform = PlatformSource.objects.create(platform_name="Shop")
+        record = {
+            "external_id": "X1", "order_number": "X1", "status": "Paid", "total": Decimal("5.00"),
+            "paid_at": timezone.now(), "customer": {"external_id": "c1", "name": "Bob"}, "items": [],
+        }
+        upsert_orders(self.workspace, platform, [record])
+        upsert_orders(self.workspace, platform, [record])
+        self.assertEqual(OutboxEvent.objects.filter(event_type="order.paid").count(), 2)
+
+    def test_relay_batches_and_keeps_aggregate_order(self):
+        subscriber = StubSubscriber(fail=1)
+        self.addCleanup(subscriber.close)
+        EventSubscription.objects.create(
+            workspace=self.workspace, name="ERP", target=subscriber.url, secret="k", event_types=["order.paid"]
+        )
+        a, b = self.order("A"), self.order("B")
+        outbox.record(self.workspace.pk, "order.paid", a, {"n": 1})
+        outbox.record(self.workspace.pk, "order.paid", b, {"n": 2})
+        outbox.record(self.workspace.pk, "order.created", b, {})  # not subscribed
+
+        self.assertEqual(outbox.relay("default"), {"dispatched": 3, "delivered": 0})
+        self.assertEqual(OutboxDelivery.objects.filter(attempts=1).count(), 2)
+        outbox.record(self.workspace.pk, "order.paid", a, {"n": 3})
+        self.assertEqual(outbox.relay("default"), {"dispatched": 1, "delivered": 0})  # all backing off
+
+        # b's retry comes due first: a's newer event must wait for its older one
+        OutboxDelivery.objects.filter(aggregate_key=f"order:{b.pk}").update(next_attempt_at=None)
+        self.assertEqual(outbox.relay("default")["delivered"], 1)
+        OutboxDelivery.objects.update(next_attempt_at=None)
+        self.assertEqual(outbox.relay("default")["delivered"], 2)
+
+        self.assertEqual([[e["data"]["n"] for e in batch] for batch in subscriber.batches], [[2], [1, 3]])
+        signature, body = subscriber.signatures[-1]
+        self.assertEqual(signature, outbox.sign("k", body))
+        self.assertFalse(OutboxDelivery.objects.exclude(status=OutboxDelivery.Status.DELIVERED).exists())
@@ -0,0 +1,364 @@
+"""Batched, idempotent and resumable Celery tasks for integration syncs.
+
+A job is submitted once with :func:`submit_batched`: its work items (ids or
+small dicts) are split into :class:`~integrations.models.TaskChunk` rows and
+one Celery message is queued per chunk. Chunk handlers are plain functions
+wrapped by :func:`chunk_task`::
+
+    @chunk_task(max_retries=5)
+    def import_orders(ctx, items):
+        for order_id in items:
+            ctx.throttle()           # PlatformSource.requests_per_minute
+            ...
+        return {"imported": len(items)}
+
+    run = submit_batched(import_orders, workspace, order_ids, platform=billbee)
+
+Progress is stored per chunk, so a run that failed halfway is picked up again
+with :func:`resume_run` (or by submitting the same idempotency key) and only
+unfinished chunks are queued again.
+"""
+import hashlib
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from itertools import islice
+
+from celery import Task, current_app, shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TaskChunk, TaskRun
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+# a chunk is claimed by one worker at a time; the claim expires if it dies
+CLAIM_TIMEOUT = 15 * 60
+
+
+class _Duplicate(Exception):
+    """Rolls back a submission whose items turned out to match an earlier run."""
+
+    def __init__(self, run):
+        self.run = run
+
+
+class RetryableError(Exception):
+    """Transient failure (timeout, 5xx, 429): retry the chunk with backoff."""
+
+
+class RateLimited(RetryableError):
+    def __init__(self, wait):
+        super().__init__(f"Rate limited, retry in {wait:.1f}s")
+        self.wait = wait
+
+
+def make_key(*parts):
+    """Stable idempotency key for JSON-serialisable ``parts``."""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# ---- rate limiting ----
+
+class RateLimiter:
+    """Per-platform request budget shared by all workers through the cache.
+
+    ``PlatformSource.requests_per_minute`` is enforced as a fixed-window
+    counter (``cache.incr`` is atomic on Redis); windows are shorter than a
+    minute so the budget is spread out instead of spent in one burst.
+    """
+
+    def __init__(self, platform, window=10):
+        self.platform_id = getattr(platform, "pk", None)
+        self.limit = getattr(platform, "requests_per_minute", None)
+        if self.limit and self.limit * window < 60:
+            window = 60
+        self.window = window
+        self.per_window = max(1, (self.limit or 0) * window // 60)
+
+    def try_acquire(self, cost=1):
+        """Take ``cost`` requests from the budget; return 0 or seconds to wait."""
+        if not self.limit:
+            return 0.0
+        now = time.time()
+        slot = int(now // self.window)
+        key = f"ratelimit:{self.platform_id}:{slot}"
+        cache.add(key, 0, timeout=self.window * 2)
+        try:
+            used = cache.incr(key, cost)
+        except ValueError:  # expired between add() and incr()
+            cache.set(key, cost, timeout=self.window * 2)
+            used = cost
+        if used <= self.per_window:
+            return 0.0
+        return (slot + 1) * self.window - now
+
+    def acquire(self, cost=1, max_wait=5.0):
+        """Block for short waits; raise :class:`RateLimited` for longer ones."""
+        while True:
+            wait = self.try_acquire(cost)
+            if not wait:
+                return
+            if wait > max_wait:
+                raise RateLimited(wait)
+            # jitter so waiting workers don't all hit the next window at once
+            time.sleep(wait + random.uniform(0, 0.25))
+
+
+@dataclass
+class ChunkContext:
+    run: TaskRun
+    chunk: TaskChunk
+    limiter: RateLimiter
+    # longer waits requeue the chunk instead of blocking the worker
+    max_wait: float = 5.0
+
+    @property
+    def workspace_id(self):
+        return self.run.workspace_id
+
+    @property
+    def params(self):
+        return self.run.params
+
+    def throttle(self, cost=1):
+        self.limiter.acquire(cost, self.max_wait)
+
+
+# ---- tasks ----
+
+class ChunkTask(Task):
+    """Base class of :func:`chunk_task` tasks.
+
+    Retries on ``retry_on`` exceptions with exponential, jittered backoff
+    (``retry_backoff`` seconds doubling up to ``retry_backoff_max``); a chunk
+    that exhausts ``max_retries`` is marked failed and the rest of the run
+    carries on.
+    """
+
+    acks_late = True
+    max_retries = 8
+    retry_on = (RetryableError,)
+    retry_backoff = 5
+    retry_backoff_max = 600
+    retry_jitter = True
+
+    def process_chunk(self, handler, workspace_id, chunk_id):
+        claim = f"taskchunk:{chunk_id}:claim"
+        if not cache.add(claim, self.request.id or "local", CLAIM_TIMEOUT):
+            # duplicate delivery while another worker holds the chunk
+            return None
+        try:
+            chunks = TaskChunk.objects.for_workspace(workspace_id)
+            chunk = chunks.select_related("run__platform").get(pk=chunk_id)
+            if chunk.status == TaskChunk.Status.DONE:
+                return chunk.result
+            run = chunk.run
+            now = timezone.now()
+            chunks.filter(pk=chunk.pk).update(
+                status=TaskChunk.Status.RUNNING, attempts=F("attempts") + 1, started_at=now
+            )
+            _runs(workspace_id).filter(pk=run.pk, status=TaskRun.Status.PENDING).update(
+                status=TaskRun.Status.RUNNING, updated_at=now
+            )
+            ctx = ChunkContext(run=run, chunk=chunk, limiter=RateLimiter(run.platform))
+            if self.request.is_eager:
+                ctx.max_wait = float("inf")
+            try:
+                result = handler(ctx, chunk.items)
+            except RateLimited as exc:
+                # waiting for budget is not a failure: requeue without using a retry
+                chunks.filter(pk=chunk.pk).update(status=TaskChunk.Status.PENDING, attempts=F("attempts") - 1)
+                self.apply_async(args=(workspace_id, chunk_id), countdown=exc.wait + random.uniform(0, 1))
+                return None
+            except self.retry_on as exc:
+                if self.request.retries >= self.max_retries:
+                    _fail_chunk(workspace_id, chunk, exc)
+                    raise
+                chunks.filter(pk=chunk.pk).update(status=TaskChunk.Status.PENDING, error=str(exc))
+                countdown = get_exponential_backoff_interval(
+                    self.retry_backoff, self.request.retries, self.retry_backoff_max, self.retry_jitter
+                )
+                cache.delete(claim)  # eager retries run before retry() returns
+                raise self.retry(exc=exc, countdown=countdown)
+            except Exception as exc:
+                _fail_chunk(workspace_id, chunk, exc)
+                raise
+            _complete_chunk(workspace_id, chunk, result)
+            return result
+        finally:
+            cache.delete(claim)
+
+
+def chunk_task(*args, **options):
+    """Turn ``handler(ctx, items)`` into a Celery task processing one chunk."""
+
+    def decorator(handler):
+        options.setdefault("name", f"{handler.__module__}.{handler.__name__}")
+
+        @shared_task(bind=True, base=ChunkTask, **options)
+        def task(self, workspace_id, chunk_id):
+            return self.process_chunk(handler, workspace_id, chunk_id)
+
+        task.handler = handler
+        return task
+
+    if args and callable(args[0]):
+        return decorator(args[0])
+    return decorator
+
+
+def _runs(workspace_id):
+    return TaskRun.objects.for_workspace(workspace_id)
+
+
+def _complete_chunk(workspace_id, chunk, result):
+    now = timezone.now()
+    with transaction.atomic(using=_runs(workspace_id).db):
+        TaskChunk.objects.for_workspace(workspace_id).filter(pk=chunk.pk).update(
+            status=TaskChunk.Status.DONE, result=result, error="", finished_at=now
+        )
+        _runs(workspace_id).filter(pk=chunk.run_id).update(
+            done_chunks=F("done_chunks") + 1, done_items=F("done_items") + len(chunk.items), updated_at=now
+        )
+    _settle(workspace_id, chunk.run_id)
+
+
+def _fail_chunk(workspace_id, chunk, exc):
+    logger.warning("Chunk %s/%s failed: %s", chunk.run_id, chunk.index, exc)
+    now = timezone.now()
+    with transaction.atomic(using=_runs(workspace_id).db):
+        TaskChunk.objects.for_workspace(workspace_id).filter(pk=chunk.pk).update(
+            status=TaskChunk.Status.FAILED, error=f"{type(exc).__name__}: {exc}", finished_at=now
+        )
+        _runs(workspace_id).filter(pk=chunk.run_id).update(
+            failed_chunks=F("failed_chunks") + 1, updated_at=now
+        )
+    _settle(workspace_id, chunk.run_id)
+
+
+def _settle(workspace_id, run_id):
+    """Close the run once every chunk is done or failed (single UPDATEs, race free)."""
+    active = _runs(workspace_id).filter(
+        pk=run_id, status__in=[TaskRun.Status.PENDING, TaskRun.Status.RUNNING]
+    )
+    now = timezone.now()
+    active.filter(done_chunks__gte=F("total_chunks")).update(
+        status=TaskRun.Status.SUCCEEDED, finished_at=now, updated_at=now
+    )
+    active.filter(
+        failed_chunks__gt=0, total_chunks__lte=F("done_chunks") + F("failed_chunks")
+    ).update(status=TaskRun.Status.FAILED, finished_at=now, updated_at=now)
+
+
+# ---- submitting / resuming ----
+
+def _dispatch(task, workspace_id, chunk_ids):
+    for chunk_id in chunk_ids:
+        task.apply_async(args=(workspace_id, chunk_id))
+
+
+def submit_batched(task, workspace, items, *, key=None, platform=None, params=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE):
+    """Persist ``items`` as chunks of ``chunk_size`` and queue ``task`` for each.
+
+    ``items`` can be any iterable of JSON-serialisable values; it is consumed
+    lazily. ``key`` defaults to a hash of the task, workspace, ``params`` and
+    ``items``; the items are hashed while they are chunked, and the new run
+    is rolled back if an earlier one had the same key. Submitting a key
+    again returns the existing run and resumes it if it failed, so callers
+    can retry submission freely.
+    """
+    params = params or {}
+    runs = _runs(workspace.pk)
+    if key is not None:
+        key = f"{workspace.pk}:{key}"
+        run = runs.filter(idempotency_key=key).first()
+        if run is not None:
+            return _submitted_again(run)
+
+    alias = runs.db
+    iterator = iter(items)
+    digest = hashlib.sha256() if key is None else None
+    try:
+        with transaction.atomic(using=alias):
+            run = TaskRun(
+                workspace=workspace, platform=platform, task_name=task.name,
+                # replaced by the items' digest below
+                idempotency_key=key or f"{workspace.pk}:pending:{uuid.uuid4().hex}", params=params,
+            )
+            run.save(using=alias)
+            total_items, index, batch = 0, 0, []
+            chunks = TaskChunk.objects.for_workspace(workspace.pk)
+            while True:
+                part = list(islice(iterator, chunk_size))
+                if not part:
+                    break
+                if digest is not None:
+                    digest.update(json.dumps(part, sort_keys=True, default=str, separators=(",", ":")).encode())
+                batch.append(TaskChunk(run=run, index=index, items=part))
+                total_items += len(part)
+                index += 1
+                if len(batch) >= 100:
+                    chunks.bulk_create(batch)
+                    batch = []
+            chunks.bulk_create(batch)
+            if digest is not None:
+                key = f"{workspace.pk}:{make_key(task.name, params, digest.hexdigest())}"
+                earlier = runs.filter(idempotency_key=key).first()
+                if earlier is not None:
+                    raise _Duplicate(earlier)
+                run.idempotency_key = key
+            run.total_chunks, run.total_items = index, total_items
+            if not index:
+                run.status, run.finished_at = TaskRun.Status.SUCCEEDED, timezone.now()
+            run.save(using=alias, update_fields=[
+                "idempotency_key", "total_chunks", "total_items", "status", "finished_at",
+            ])
+    except _Duplicate as duplicate:
+        return _submitted_again(duplicate.run)
+    except IntegrityError:
+        # a concurrent submission with the same key won
+        return runs.get(idempotency_key=key)
+
+    chunk_ids = list(run.chunks.values_list("pk", flat=True))
+    transaction.on_commit(lambda: _dispatch(task, workspace.pk, chunk_ids), using=alias)
+    return run
+
+
+def _submitted_again(run):
+    if run.status == TaskRun.Status.FAILED:
+        resume_run(run)
+    return run
+
+
+def resume_run(run, include_running=False):
+    """Queue the unfinished chunks of ``run`` again; returns how many were queued.
+
+    ``include_running`` also requeues chunks stuck in ``running`` (their worker
+    died); their claims have expired by then.
+    """
+    task = current_app.tasks[run.task_name]
+    statuses = [TaskChunk.Status.PENDING, TaskChunk.Status.FAILED]
+    if include_running:
+        statuses.append(TaskChunk.Status.RUNNING)
+    runs = _runs(run.workspace_id)
+    with transaction.atomic(using=runs.db):
+        chunks = TaskChunk.objects.for_workspace(run.workspace_id).filter(run=run, status__in=statuses)
+        chunk_ids = list(chunks.values_list("pk", flat=True))
+        chunks.update(status=TaskChunk.Status.PENDING, error="")
+        runs.filter(pk=run.pk).update(
+            status=TaskRun.Status.RUNNING, failed_chunks=0, finished_at=None, updated_at=timezone.now()
+        )
+    transaction.on_commit(lambda: _dispatch(task, run.workspace_id, chunk_ids), using=runs.db)
+    run.refresh_from_db()
+    _settle(run.workspace_id, run.pk)
+    return len(chunk_ids)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import webhook_receiver
+
+urlpatterns = [
+    path("webhooks/<int:workspace_id>/<slug:platform>/", webhook_receiver, name="webhook-receiver"),
+]
@@ -0,0 +1,20 @@
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .webhooks import SIGNATURE_HEADER, endpoint_secret, ingest, verify
+
+
+@csrf_exempt
+@require_POST
+def webhook_receiver(request, workspace_id, platform):
+    """Verify and store a marketplace webhook; processing happens in ``drain_webhooks``."""
+    endpoint = endpoint_secret(workspace_id, platform)
+    if endpoint is None:
+        return HttpResponse(status=404)
+    platform_id, secret = endpoint
+    body = request.body
+    if not verify(secret, body, request.META.get(SIGNATURE_HEADER)):
+        return HttpResponse(status=401)
+    ingest(workspace_id, platform_id, body, request.META)
+    return HttpResponse(status=202)
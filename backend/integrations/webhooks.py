@@ -0,0 +1,168 @@
+"""Webhook inbox: cheap ingestion, batched processing.
+
+The HTTP handler only checks the HMAC signature (secret from the cache) and
+stores the raw body with a single INSERT. :func:`drain` later parses pending
+events in batches, drops retried or stale deliveries and applies the rest
+through :func:`orders.upsert.upsert_orders`.
+
+Senders sign the raw body with HMAC-SHA256 using the ``webhook_secret`` of
+the workspace's :class:`~integrations.models.SyncState` and send it as
+``X-Webhook-Signature: sha256=<hex>``.
+"""
+import hashlib
+import hmac
+import json
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import PlatformSource
+from orders.upsert import upsert_orders
+
+from .clients import client_class
+from .models import SyncState, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+SECRET_CACHE_TIMEOUT = 300
+SIGNATURE_HEADER = "HTTP_X_WEBHOOK_SIGNATURE"
+# delivery metadata worth keeping next to the body
+KEPT_HEADERS = {
+    "HTTP_X_WEBHOOK_EVENT": "event",
+    "HTTP_X_WEBHOOK_DELIVERY": "delivery",
+}
+
+
+def _secret_key(workspace_id, platform_name):
+    return f"webhooks:secret:{workspace_id}:{platform_name.lower()}"
+
+
+def endpoint_secret(workspace_id, platform_name):
+    """``(platform_id, secret)`` for a webhook endpoint, or ``None`` if it is not set up."""
+    key = _secret_key(workspace_id, platform_name)
+    found = cache.get(key)
+    if found is None:
+        row = (
+            SyncState.objects.for_workspace(workspace_id)
+            .filter(platform__platform_name__iexact=platform_name, is_enabled=True)
+            .values_list("platform_id", "config")
+            .first()
+        )
+        secret = (row[1] or {}).get("webhook_secret") if row else None
+        found = (row[0], secret) if secret else ()
+        cache.set(key, found, SECRET_CACHE_TIMEOUT)
+    return found or None
+
+
+def forget_secret(workspace_id, platform_name):
+    cache.delete(_secret_key(workspace_id, platform_name))
+
+
+def sign(secret, body):
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify(secret, body, signature):
+    return bool(signature) and hmac.compare_digest(sign(secret, body), signature.strip())
+
+
+def ingest(workspace_id, platform_id, body, meta):
+    """Append a verified delivery to the inbox (one INSERT)."""
+    headers = {name: meta[header] for header, name in KEPT_HEADERS.items() if header in meta}
+    return WebhookEvent.objects.for_workspace(workspace_id).create(
+        workspace_id=workspace_id, platform_id=platform_id, body=body, headers=headers
+    )
+
+
+# ---- draining ----
+
+def _parse(event, platform):
+    payload = json.loads(bytes(event.body))
+    return client_class(platform).webhook_event(payload)
+
+
+def drain(alias, batch_size=500):
+    """Process one batch of pending events on ``alias``; returns how many were handled."""
+    with transaction.atomic(using=alias):
+        events = list(
+            WebhookEvent.objects.using(alias)
+            .select_for_update(skip_locked=True)
+            .filter(status=WebhookEvent.Status.PENDING)
+            .order_by("event_id")[:batch_size]
+        )
+        if not events:
+            return 0
+        platforms = PlatformSource.objects.in_bulk({e.platform_id for e in events})
+        groups = {}
+        for event in events:
+            try:
+                event.external_id, event.event_version, record = _parse(event, platforms[event.platform_id])
+            except Exception as exc:
+                _mark(alias, [event], WebhookEvent.Status.FAILED, f"{type(exc).__name__}: {exc}")
+                continue
+            groups.setdefault((event.workspace_id, event.platform_id), []).append((event, record))
+        for (workspace_id, platform_id), parsed in groups.items():
+            _apply(alias, workspace_id, platforms[platform_id], parsed)
+    return len(events)
+
+
+def _apply(alias, workspace_id, platform, parsed):
+    """Dedupe one workspace/platform group and upsert the newest version of each record."""
+    processed = {}
+    for external_id, version in WebhookEvent.objects.using(alias).filter(
+        workspace_id=workspace_id, platform=platform, status=WebhookEvent.Status.PROCESSED,
+        external_id__in={event.external_id for event, _ in parsed},
+    ).values_list("external_id", "event_version"):
+        processed[external_id] = max(processed.get(external_id, ""), version)
+
+    # versions compare as strings (ISO timestamps / zero-padded counters);
+    # deliveries without a version are always applied
+    latest, duplicates = {}, []
+    for event, record in parsed:
+        version = event.event_version
+        if version and version <= processed.get(event.external_id, ""):
+            duplicates.append(event)  # retried or superseded delivery
+            continue
+        current = latest.get(event.external_id)
+        if current is not None and version and current[0].event_version >= version:
+            duplicates.append(event)
+            continue
+        if current is not None:
+            duplicates.append(current[0])
+        latest[event.external_id] = (event, record)
+
+    applied, rejected = [event for event, _ in latest.values()], {}
+    try:
+        with transaction.atomic(using=alias):
+            result = upsert_orders(workspace_id, platform, [record for _, record in latest.values()])
+        rejected = {e["external_id"]: e["error"] for e in result.errors}
+    except Exception:
+        logger.exception("Webhook batch failed for workspace %s, retrying one by one", workspace_id)
+        applied = []
+        for event, record in latest.values():
+            try:
+                with transaction.atomic(using=alias):
+                    result = upsert_orders(workspace_id, platform, [record])
+            except Exception as exc:
+                _mark(alias, [event], WebhookEvent.Status.FAILED, f"{type(exc).__name__}: {exc}")
+            else:
+                applied.append(event)
+                rejected.update({e["external_id"]: e["error"] for e in result.errors})
+    for event in [e for e in applied if e.external_id in rejected]:
+        applied.remove(event)
+        _mark(alias, [event], WebhookEvent.Status.FAILED, rejected[event.external_id])
+    _mark(alias, applied, WebhookEvent.Status.PROCESSED)
+    _mark(alias, duplicates, WebhookEvent.Status.DUPLICATE)
+
+
+def _mark(alias, events, status, error=""):
+    if not events:
+        return
+    now = timezone.now()
+    for event in events:
+        event.status, event.error, event.processed_at = status, error, now
+    WebhookEvent.objects.using(alias).bulk_update(
+        events, ["status", "external_id", "event_version", "error", "processed_at"]
+    )
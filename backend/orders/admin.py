@@ -1,9 +1,16 @@
-from django.contrib import admin
-from .models import PlatformSource, OrderStatus, Customer, Order, OrderItem
+from itertools import groupby
+
+from django.contrib import admin, messages
+
+from core.admin_performance import BoundedInlineMixin, FastAdminMixin
+from core.models import Workspace
+
+from .models import PlatformSource, OrderStatus, Customer, Order, OrderItem, OrderNumberSequence, Invoice
+from .tasks import submit_invoices
 
 @admin.register(PlatformSource)
 class PlatformSourceAdmin(admin.ModelAdmin):
-    list_display = ("platform_name", "is_active", "created_at")
+    list_display = ("platform_name", "is_active", "requests_per_minute", "created_at")
     list_filter = ("is_active",)
     search_fields = ("platform_name", "description")
 
@@ -14,13 +21,13 @@ class OrderStatusAdmin(admin.ModelAdmin):
     search_fields = ("status_name",)
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("name", "email", "phone", "platform", "workspace", "updated_at")
     list_filter = ("platform", "workspace")
     search_fields = ("name", "email", "phone")
     autocomplete_fields = ("workspace", "platform")
 
-class OrderItemInline(admin.TabularInline):
+class OrderItemInline(BoundedInlineMixin, admin.TabularInline):
     model = OrderItem
     extra = 1
     fields = ("product", "quantity", "unit_price", "total_price", "is_personalized", "attributes", "external_id")
@@ -28,7 +35,7 @@ class OrderItemInline(admin.TabularInline):
     autocomplete_fields = ("product",)
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(FastAdminMixin, admin.ModelAdmin):
     # If you added 'currency', 'totals_locked', 'external_total_cost' keep them here; if not, remove them.
     list_display = (
         "order_number", "customer", "status", "currency", "total_cost",
@@ -38,10 +45,19 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ("order_number", "invoice_number", "customer__name", "customer__email")
     autocomplete_fields = ("workspace", "customer", "status", "platform")
     inlines = [OrderItemInline]
+    actions = ["render_invoices"]
+
+    @admin.action(description="Render invoices")
+    def render_invoices(self, request, queryset):
+        rows = queryset.order_by("workspace_id", "pk").values_list("workspace_id", "pk")
+        for workspace_id, group in groupby(rows, key=lambda row: row[0]):
+            workspace = Workspace.objects.get(pk=workspace_id)
+            run = submit_invoices(workspace, [pk for _, pk in group])
+            self.message_user(request, f"{workspace}: rendering {run.total_items} invoices (run {run.pk})", messages.INFO)
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("order", "product", "quantity", "unit_price", "total_price", "is_personalized", "updated_at")
     list_filter = ("is_personalized", "order__workspace")
     search_fields = ("order__order_number", "product__title", "external_id")
@@ -55,3 +71,18 @@ class OrderItemAdmin(admin.ModelAdmin):
         if "attributes" in form.base_fields:
             form.base_fields["attributes"].initial = {}
         return form
+
+
+@admin.register(OrderNumberSequence)
+class OrderNumberSequenceAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("workspace", "last_value", "number_format", "updated_at")
+    search_fields = ("workspace__name",)
+    autocomplete_fields = ("workspace",)
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("order", "digest", "size", "rendered_at")
+    search_fields = ("order__order_number", "digest")
+    raw_id_fields = ("order",)
+    readonly_fields = ("digest", "file", "size", "rendered_at")
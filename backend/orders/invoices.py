@@ -0,0 +1,268 @@
+"""Invoice PDFs: rendered in batches, stored by content, zipped as a stream.
+
+An order's invoice is a function of :func:`invoice_payload` (seller,
+numbers, date, customer, lines, totals). The PDF is stored under the
+SHA-256 of that payload (``INVOICE_STORAGE_DIR/ab/<digest>.pdf`` in the
+default storage) and :class:`~orders.models.Invoice` remembers which digest
+an order was rendered for. Rendering again is a no-op for an order whose
+payload did not change, and re-uses the stored file when an earlier
+version comes back.
+
+Batches run through :func:`orders.tasks.submit_invoices` (one Celery
+message per chunk of ``INVOICE_CHUNK_SIZE`` orders, spread over the
+worker's processes). :func:`month_archive` streams a month's invoices as a
+ZIP, rendering whatever is missing on the way; the archive is written
+through a small buffer that is emptied after every file, so memory does
+not grow with the month. Under ASGI, :func:`amonth_archive` drives the same
+generator one chunk at a time through ``sync_to_async``.
+"""
+import hashlib
+import json
+import zipfile
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Invoice, Order, OrderItem
+
+# bump when the layout changes, so every invoice is rendered again
+TEMPLATE_VERSION = 1
+BATCH_SIZE = 200
+
+
+# ---- content ----
+
+def invoice_payload(order):
+    """Everything the invoice shows; needs ``workspace``, ``customer`` and ``items__product`` loaded."""
+    customer = order.customer
+    return {
+        "template": TEMPLATE_VERSION,
+        "seller": order.workspace.name,
+        "invoice_number": order.invoice_number or order.order_number,
+        "order_number": order.order_number,
+        "date": timezone.localdate(order.paid_at or order.created_at).isoformat(),
+        "customer": {"name": customer.name, "email": customer.email or "", "address": customer.address},
+        "shipping_address": order.shipping_address,
+        "currency": order.currency,
+        "lines": [
+            [item.product.sku or "", item.product.title, str(item.quantity), str(item.unit_price or ""),
+             str(item.total_price or "")]
+            for item in order.items.all()
+        ],
+        "total": str(order.total_cost or ""),
+    }
+
+
+def digest(payload):
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def storage_path(content_digest):
+    return f"{settings.INVOICE_STORAGE_DIR}/{content_digest[:2]}/{content_digest}.pdf"
+
+
+# ---- PDF ----
+
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN, LEADING = 595, 842, 50, 14
+FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold", "F3": "Courier"}
+
+
+def _text(value):
+    encoded = str(value).encode("cp1252", "replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _lines(payload):
+    """``(font, size, text)`` rows, top to bottom."""
+    customer = payload["customer"]
+    rows = [
+        ("F2", 16, payload["seller"]),
+        ("F1", 10, ""),
+        ("F2", 12, f"Invoice {payload['invoice_number']}"),
+        ("F1", 10, f"Order {payload['order_number']} · {payload['date']}"),
+        ("F1", 10, ""),
+        ("F2", 10, "Bill to"),
+        ("F1", 10, customer["name"]),
+    ]
+    rows += [("F1", 10, line) for line in (customer["email"], *customer["address"].splitlines()) if line]
+    if payload["shipping_address"]:
+        rows += [("F1", 10, ""), ("F2", 10, "Ship to")]
+        rows += [("F1", 10, line) for line in payload["shipping_address"].splitlines()]
+    rows += [("F1", 10, ""), ("F3", 9, f"{'SKU':<14}{'Item':<36}{'Qty':>8}{'Unit':>11}{'Total':>11}")]
+    for sku, title, quantity, unit, total in payload["lines"]:
+        rows.append(("F3", 9, f"{sku[:13]:<14}{title[:35]:<36}{quantity:>8}{unit:>11}{total:>11}"))
+    rows += [("F1", 10, ""), ("F2", 11, f"Total: {payload['total']} {payload['currency']}")]
+    return rows
+
+
+def render_pdf(payload):
+    """A plain A4 PDF of the invoice; the same payload always gives the same bytes."""
+    per_page = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+    rows = _lines(payload)
+    pages = [rows[i:i + per_page] for i in range(0, len(rows), per_page)]
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None]
+    font_refs = []
+    for name, base in FONTS.items():
+        objects.append(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>".encode())
+        font_refs.append(f"/{name} {len(objects)} 0 R")
+    resources = f"<< /Font << {' '.join(font_refs)} >> >>"
+    kids = []
+    for page in pages:
+        stream = [b"BT"]
+        y = PAGE_HEIGHT - MARGIN
+        for font, size, text in page:
+            stream.append(b"/%s %d Tf 1 0 0 1 %d %d Tm (%s) Tj" % (font.encode(), size, MARGIN, y, _text(text)))
+            y -= LEADING
+        stream.append(b"ET")
+        content = b"\n".join(stream)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources {resources} /Contents {len(objects)} 0 R >>".encode()
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# ---- rendering ----
+
+def _orders(workspace_id):
+    items = OrderItem.objects.select_related("product").order_by("pk")
+    return (
+        Order.objects.for_workspace(workspace_id)
+        .select_related("workspace", "customer")
+        .prefetch_related(Prefetch("items", queryset=items))
+    )
+
+
+def _ensure(workspace_id, orders):
+    """``[(order, file name, rendered)]`` for ``orders``, rendering and storing what changed."""
+    current = {
+        invoice.order_id: invoice
+        for invoice in Invoice.objects.for_workspace(workspace_id).filter(order_id__in=[o.pk for o in orders])
+    }
+    result, changed = [], []
+    for order in orders:
+        payload = invoice_payload(order)
+        content_digest = digest(payload)
+        invoice = current.get(order.pk)
+        if invoice is not None and invoice.digest == content_digest:
+            result.append((order, invoice.file.name, False))
+            continue
+        path = storage_path(content_digest)
+        if default_storage.exists(path):
+            size = default_storage.size(path)
+        else:
+            pdf = render_pdf(payload)
+            # a concurrent render of the same content may have won: keep whichever name we got
+            path, size = default_storage.save(path, ContentFile(pdf)), len(pdf)
+        changed.append(Invoice(order=order, digest=content_digest, file=path, size=size, rendered_at=timezone.now()))
+        result.append((order, path, True))
+    if changed:
+        Invoice.objects.for_workspace(workspace_id).bulk_create(
+            changed, update_conflicts=True, unique_fields=["order"],
+            update_fields=["digest", "file", "size", "rendered_at"],
+        )
+    return result
+
+
+def render_orders(workspace_id, order_ids):
+    """Bring the invoices of ``order_ids`` up to date; returns counts."""
+    counts = {"rendered": 0, "unchanged": 0}
+    order_ids = list(order_ids)
+    for start in range(0, len(order_ids), BATCH_SIZE):
+        orders = list(_orders(workspace_id).filter(pk__in=order_ids[start:start + BATCH_SIZE]))
+        for _, _, rendered in _ensure(workspace_id, orders):
+            counts["rendered" if rendered else "unchanged"] += 1
+    return counts
+
+
+# ---- monthly archive ----
+
+def month_range(year, month):
+    start = timezone.make_aware(datetime(year, month, 1))
+    end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    return start, end
+
+
+def month_orders(workspace_id, year, month):
+    """Orders paid in the month, by id."""
+    start, end = month_range(year, month)
+    return Order.objects.for_workspace(workspace_id).filter(paid_at__gte=start, paid_at__lt=end)
+
+
+class _Buffer:
+    """Write-only file for ``zipfile`` whose contents are taken out as they are produced."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _archive_name(order):
+    return f"{order.order_number.replace('/', '_')}.pdf"
+
+
+def month_archive(workspace_id, year, month):
+    """Yield a ZIP of the month's invoices chunk by chunk."""
+    buffer = _Buffer()
+    ids = month_orders(workspace_id, year, month).order_by("pk").values_list("pk", flat=True)
+    last = 0
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        while True:
+            batch = list(ids.filter(pk__gt=last)[:BATCH_SIZE])
+            if not batch:
+                break
+            last = batch[-1]
+            orders = list(_orders(workspace_id).filter(pk__in=batch).order_by("pk"))
+            for order, name, _ in _ensure(workspace_id, orders):
+                with default_storage.open(name) as source, archive.open(_archive_name(order), "w") as target:
+                    for chunk in source.chunks():
+                        target.write(chunk)
+                        yield buffer.take()
+                yield buffer.take()
+    # the central directory, written on close
+    yield buffer.take()
+
+
+async def amonth_archive(workspace_id, year, month):
+    """:func:`month_archive` for async servers, without collecting the whole ZIP first."""
+    chunks = month_archive(workspace_id, year, month)
+    # thread-sensitive, so every step runs on the thread holding the generator's connection
+    step = sync_to_async(next)
+    while (chunk := await step(chunks, None)) is not None:
+        yield chunk
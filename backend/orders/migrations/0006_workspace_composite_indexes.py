@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_workspace_options_workspace_owner_and_more'),
+        ('orders', '0005_alter_orderitem_attributes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['workspace', '-created_at'], name='orders_workspa_fb0c64_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['workspace', 'status', '-created_at'], name='orders_workspa_082973_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['workspace', 'paid_at'], name='orders_workspa_125773_idx'),
+        ),
+    ]
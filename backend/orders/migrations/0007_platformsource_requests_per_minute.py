@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_workspace_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='platformsource',
+            name='requests_per_minute',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_workspace_db_alias'),
+        ('orders', '0007_platformsource_requests_per_minute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberSequence',
+            fields=[
+                ('workspace', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_number_sequence', serialize=False, to='core.workspace')),
+                ('last_value', models.BigIntegerField(default=0, help_text='Last number handed out. Lowering it makes the next orders collide with existing ones.')),
+                ('number_format', models.CharField(blank=True, help_text='str.format() pattern with {number}, e.g. "WEB-{number:05d}"; blank uses ORDER_NUMBER_FORMAT.', max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'order_number_sequences',
+            },
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='order_number',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='invoice', serialize=False, to='orders.order')),
+                ('digest', models.CharField(max_length=64)),
+                ('file', models.FileField(max_length=255, upload_to='')),
+                ('size', models.IntegerField()),
+                ('rendered_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'order_invoices',
+            },
+        ),
+    ]
@@ -3,6 +3,9 @@ from decimal import Decimal, ROUND_HALF_UP
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from core.events import ChangeTrackingMixin
+from core.managers import WorkspaceManager
+
 
 # --------- Platform & Status catalogs ---------
 
@@ -14,6 +17,8 @@ class PlatformSource(models.Model):
     platform_name = models.CharField(max_length=50, unique=True)
     description = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
+    # outbound API budget shared by all integration workers; empty = unlimited
+    requests_per_minute = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -67,6 +72,8 @@ class Customer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = WorkspaceManager()
+
     class Meta:
         db_table = "customers"
         indexes = [
@@ -96,7 +103,7 @@ class Customer(models.Model):
 
 # --------- Orders & Items ---------
 
-class Order(models.Model):
+class Order(ChangeTrackingMixin, models.Model):
     """Customer order scoped to a workspace.
 
     Integrations (Billbee/Shopify/etc.) should:
@@ -110,7 +117,8 @@ class Order(models.Model):
     order_id = models.BigAutoField(primary_key=True)
     workspace = models.ForeignKey('core.Workspace', on_delete=models.CASCADE)
 
-    order_number = models.CharField(max_length=50)  # unique per workspace
+    # unique per workspace; left blank, save() takes the next one from orders.numbering
+    order_number = models.CharField(max_length=50, blank=True)
     order_billbee_id = models.BigIntegerField(null=True, blank=True)
 
     customer = models.ForeignKey('orders.Customer', on_delete=models.PROTECT)
@@ -134,6 +142,11 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = WorkspaceManager()
+    # order.paid goes to the outbox when paid_at is first set (orders.signals)
+    event_fields = ("paid_at",)
+    str_related = ("customer",)
+
     class Meta:
         db_table = "orders"
         ordering = ["-created_at"]
@@ -144,6 +157,10 @@ class Order(models.Model):
             models.Index(fields=["paid_at"]),
             models.Index(fields=["workspace", "order_number"]),
             models.Index(fields=["workspace", "platform", "external_id"]),
+            # workspace-leading, matching the default ordering and hot filters
+            models.Index(fields=["workspace", "-created_at"]),
+            models.Index(fields=["workspace", "status", "-created_at"]),
+            models.Index(fields=["workspace", "paid_at"]),
         ]
         unique_together = (("workspace", "order_number"),)
         constraints = [
@@ -157,6 +174,13 @@ class Order(models.Model):
     def __str__(self) -> str:
         return f"{self.order_number} — {self.customer.name}"
 
+    def save(self, *args, **kwargs):
+        if not self.order_number:
+            from .numbering import allocate
+
+            self.order_number = allocate(self.workspace_id)[0]
+        super().save(*args, **kwargs)
+
     def recompute_total(self):
         agg = self.items.aggregate(s=models.Sum("total_price"))
         self.total_cost = agg["s"] or Decimal("0.00")
@@ -192,6 +216,10 @@ class OrderItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    workspace_lookup = "order__workspace"
+    objects = WorkspaceManager()
+    str_related = ("order", "product")
+
     class Meta:
         db_table = "order_items"
         indexes = [
@@ -227,7 +255,8 @@ class OrderItem(models.Model):
         if self.unit_price is not None and self.unit_price < 0:
             raise ValidationError({"unit_price": "Must be ≥ 0"})
 
-    def save(self, *args, **kwargs):
+    def apply_defaults(self):
+        """Fill ``attributes`` and prices as described above (also used before bulk inserts)."""
         if self.attributes is None:
             self.attributes = {}
 
@@ -243,4 +272,56 @@ class OrderItem(models.Model):
             self.total_price = (self.unit_price * self.quantity).quantize(
                 Decimal("0.01"), rounding=ROUND_HALF_UP
             )
+
+    def save(self, *args, **kwargs):
+        self.apply_defaults()
         super().save(*args, **kwargs)
+
+
+class OrderNumberSequence(models.Model):
+    """Per-workspace order number counter; see :mod:`orders.numbering`."""
+    workspace = models.OneToOneField(
+        'core.Workspace', on_delete=models.CASCADE, primary_key=True, related_name="order_number_sequence"
+    )
+    last_value = models.BigIntegerField(
+        default=0, help_text="Last number handed out. Lowering it makes the next orders collide with existing ones."
+    )
+    number_format = models.CharField(
+        max_length=50, blank=True,
+        help_text="str.format() pattern with {number}, e.g. \"WEB-{number:05d}\"; blank uses ORDER_NUMBER_FORMAT.",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "order_number_sequences"
+
+    def __str__(self) -> str:
+        return f"{self.workspace_id}: {self.last_value}"
+
+    def clean(self):
+        from .numbering import format_number
+
+        try:
+            format_number(self.number_format, 1)
+        except (KeyError, IndexError, ValueError) as exc:
+            raise ValidationError({"number_format": f"Invalid pattern: {exc}"})
+
+
+class Invoice(models.Model):
+    """An order's rendered invoice PDF, stored under the digest of what it shows (orders.invoices)."""
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name="invoice")
+    digest = models.CharField(max_length=64)
+    file = models.FileField(max_length=255)
+    size = models.IntegerField()
+    rendered_at = models.DateTimeField()
+
+    workspace_lookup = "order__workspace"
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "order_invoices"
+
+    def __str__(self) -> str:
+        return f"Invoice of order {self.order_id}"
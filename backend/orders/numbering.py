@@ -0,0 +1,86 @@
+"""Order numbers: a counter row per workspace, advanced in one statement.
+
+:func:`allocate` reserves a block of consecutive numbers with a single
+``UPDATE ... RETURNING`` on the workspace's shard. Concurrent callers queue
+on the row lock until the allocating transaction commits. Bulk imports
+should therefore take one block per batch, not one number per order.
+
+The first call in a workspace finds no row and creates it with
+``INSERT ... ON CONFLICT DO UPDATE``. It starts after the highest number the
+workspace's orders already carry in ``ORDER_NUMBER_FORMAT`` (orders created
+by hand or before numbering existed), so new numbers never collide with
+them.
+
+Numbers of a rolled-back transaction are reused. A committed block whose
+orders were never created leaves a gap. The counter is a row, not a
+database sequence, so it moves with the workspace between shards
+(``move_workspace``).
+
+Formatting uses ``OrderNumberSequence.number_format`` or, when blank,
+``ORDER_NUMBER_FORMAT``: a ``str.format`` pattern with ``{number}``.
+"""
+import re
+import string
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Order, OrderNumberSequence
+
+
+def format_number(pattern, number):
+    return (pattern or settings.ORDER_NUMBER_FORMAT).format(number=number)
+
+
+def number_regex(pattern):
+    """Regex matching numbers formatted with ``pattern``; group 1 is the number."""
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(pattern or settings.ORDER_NUMBER_FORMAT):
+        parts.append(re.escape(literal))
+        if field is not None:
+            parts.append(r"(\d+)")
+    return f"^{''.join(parts)}$"
+
+
+def highest_used(workspace_id):
+    """Highest number the workspace's orders carry in ``ORDER_NUMBER_FORMAT`` (0 if none)."""
+    regex = number_regex(None)
+    numbers = Order.objects.for_workspace(workspace_id).filter(order_number__regex=regex)
+    matcher = re.compile(regex)
+    return max(
+        (int(matcher.match(n).group(1)) for n in numbers.values_list("order_number", flat=True).iterator()),
+        default=0,
+    )
+
+
+def allocate(workspace, count=1):
+    """Reserve ``count`` consecutive order numbers in ``workspace``; returns them formatted."""
+    if count < 1:
+        return []
+    workspace_id = getattr(workspace, "pk", workspace)
+    db = OrderNumberSequence.objects.for_workspace(workspace_id).db
+    connection = connections[db]
+    table = connection.ops.quote_name(OrderNumberSequence._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET last_value = last_value + %s, updated_at = %s "
+            f"WHERE workspace_id = %s RETURNING last_value, number_format",
+            [count, now, workspace_id],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            # first allocation; a concurrent first caller makes this an update
+            start = max(settings.ORDER_NUMBER_START - 1, highest_used(workspace_id))
+            cursor.execute(
+                f"INSERT INTO {table} (workspace_id, last_value, number_format, updated_at) "
+                f"VALUES (%s, %s, '', %s) "
+                f"ON CONFLICT (workspace_id) DO UPDATE "
+                f"SET last_value = {table}.last_value + %s, updated_at = EXCLUDED.updated_at "
+                f"RETURNING last_value, number_format",
+                [workspace_id, start + count, now, count],
+            )
+            row = cursor.fetchone()
+        last, pattern = row
+    return [format_number(pattern, number) for number in range(last - count + 1, last + 1)]
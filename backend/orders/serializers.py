@@ -0,0 +1,52 @@
+from rest_framework import serializers
+
+from catalog.models import Product
+from core.api import BulkRelatedField
+
+from .models import Order, OrderItem
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source="product.sku", read_only=True)
+    title = serializers.CharField(source="product.title", read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = (
+            "order_item_id", "product", "sku", "title", "quantity", "unit_price", "total_price",
+            "is_personalized", "attributes", "updated_at",
+        )
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source="status.status_name", read_only=True)
+    customer_name = serializers.CharField(source="customer.name", read_only=True)
+    platform = serializers.CharField(source="platform.platform_name", read_only=True, default=None)
+
+    class Meta:
+        model = Order
+        fields = (
+            "order_id", "order_number", "status", "customer", "customer_name", "platform", "external_id",
+            "total_cost", "currency", "totals_locked", "paid_at", "is_personalized", "created_at", "updated_at",
+        )
+
+
+class OrderDetailSerializer(OrderSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        fields = (*OrderSerializer.Meta.fields, "shipping_address", "invoice_number", "items")
+
+
+class OrderItemWriteSerializer(serializers.ModelSerializer):
+    order = BulkRelatedField(queryset=Order.objects.all())
+    product = BulkRelatedField(queryset=Product.objects.all())
+
+    class Meta:
+        model = OrderItem
+        fields = (
+            "order", "product", "quantity", "unit_price", "total_price", "is_personalized", "attributes",
+            "external_id",
+        )
+        # uniqueness is left to the database, checked for the whole batch at once
+        validators = []
@@ -1,13 +1,43 @@
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import OrderItem
+from core.response_cache import track_changes
+from integrations import outbox
+
+from .models import Customer, Order, OrderItem, OrderStatus, PlatformSource
 
 
 @receiver([post_save, post_delete], sender=OrderItem)
 def update_order_total(sender, instance, **kwargs):
-    order = instance.order
+    refresh_total(instance.order)
+
+
+def refresh_total(order):
     if order.totals_locked:
         return
     order.recompute_total()
     order.save(update_fields=["total_cost", "updated_at"])
+
+
+@receiver(post_save, sender=Order)
+def record_order_paid(sender, instance, created, **kwargs):
+    if instance.paid_at is None or instance.previous_event_state().get("paid_at") is not None:
+        return
+    outbox.record(instance.workspace_id, "order.paid", instance, order_paid_payload(instance))
+
+
+def order_paid_payload(order):
+    return {
+        "order_id": order.pk,
+        "order_number": order.order_number,
+        "external_id": order.external_id,
+        "total_cost": order.total_cost,
+        "currency": order.currency,
+        "paid_at": order.paid_at,
+    }
+
+
+for model in (Order, OrderItem, Customer):
+    track_changes(model, "orders")
+for model in (OrderStatus, PlatformSource):
+    track_changes(model, "reference")
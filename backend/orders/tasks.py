@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.models import Max
+
+from integrations.toolkit import chunk_task, make_key, submit_batched
+
+from . import invoices
+from .models import Order
+
+
+@chunk_task
+def render_invoices(ctx, items):
+    return invoices.render_orders(ctx.workspace_id, items)
+
+
+def submit_invoices(workspace, order_ids):
+    """Render the invoices of ``order_ids`` in chunks spread over the Celery workers."""
+    order_ids = sorted(set(order_ids))
+    # the same orders, unchanged since, make the same run
+    changed = Order.objects.for_workspace(workspace.pk).filter(pk__in=order_ids).aggregate(
+        orders=Max("updated_at"), items=Max("items__updated_at"), customers=Max("customer__updated_at"),
+    )
+    key = make_key("invoices", order_ids, changed)
+    return submit_batched(render_invoices, workspace, order_ids, key=key, chunk_size=settings.INVOICE_CHUNK_SIZE)
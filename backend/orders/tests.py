@@ -1,3 +1,323 @@
-from django.test import TestCase
+import io
+import tempfile
+import threading
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authapp.serializers import WorkspaceTokenObtainPairSerializer
+from catalog.importers import import_catalog
+from catalog.models import Product
+from core.models import Membership, Workspace
+from users.models import User
+
+from . import invoices, numbering
+from .models import Customer, Invoice, Order, OrderItem, OrderNumberSequence, OrderStatus, PlatformSource
+from .upsert import upsert_orders
+
+
+class OrderListCacheTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="poll@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Polled shop", owner=owner)
+        Membership.objects.create(user=owner, workspace=self.workspace, role=Membership.OWNER)
+        self.customer = Customer.objects.create(workspace=self.workspace, name="Ada")
+        self.status = OrderStatus.objects.create(status_name="Paid")
+        self.order = Order.objects.create(
+            workspace=self.workspace, order_number="1", customer=self.customer, status=self.status
+        )
+        token = WorkspaceTokenObtainPairSerializer.get_token(owner).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_WORKSPACE_ID=str(self.workspace.pk))
+
+    def test_quiet_polling_hits_cache_and_revalidates(self):
+        first = self.client.get("/api/orders/")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data["count"], 1)
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/orders/")
+            unchanged = self.client.get("/api/orders/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(unchanged.status_code, 304)
+
+        # a new line on the order bumps the version after commit
+        product = Product.objects.create(workspace=self.workspace, sku="MUG", title="Mug", price=Decimal("9.50"))
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem.objects.create(order=self.order, product=product, quantity=Decimal(2))
+        changed = self.client.get("/api/orders/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+        self.assertEqual(changed.data["results"][0]["total_cost"], "19.00")
+
+        detail = self.client.get(f"/api/orders/{self.order.pk}/")
+        self.assertEqual([item["sku"] for item in detail.data["items"]], ["MUG"])
+
+    def test_related_rows_change_the_etag(self):
+        product = Product.objects.create(workspace=self.workspace, sku="MUG", title="Mug", price=Decimal("9.50"))
+        OrderItem.objects.create(order=self.order, product=product, quantity=Decimal(1))
+        url = f"/api/orders/{self.order.pk}/"
+
+        def revalidate(etag):
+            return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(revalidate(etag).status_code, 304)
+
+        # a renamed status (a global reference row)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.status.status_name = "Settled"
+            self.status.save()
+        response = revalidate(etag)
+        self.assertEqual((response.status_code, response.data["status"]), (200, "Settled"))
+        etag = response["ETag"]
+
+        # a retitled product shown on the lines
+        with self.captureOnCommitCallbacks(execute=True):
+            product.title = "Big mug"
+            product.save()
+        response = revalidate(etag)
+        self.assertEqual((response.status_code, response.data["items"][0]["title"]), (200, "Big mug"))
+        etag = response["ETag"]
+
+        # a catalog import (bulk upsert, no signals)
+        import_catalog(self.workspace, "products", b"sku,title\nMUG,Huge mug\n", "csv")
+        response = revalidate(etag)
+        self.assertEqual((response.status_code, response.data["items"][0]["title"]), (200, "Huge mug"))
+
+    def test_requires_membership(self):
+        other = Workspace.objects.create(name="Other shop", owner=User.objects.create_user(email="o@example.com"))
+        response = self.client.get("/api/orders/", HTTP_X_WORKSPACE_ID=str(other.pk))
+        self.assertEqual(response.status_code, 403)
+
+
+class InvoiceTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        owner = User.objects.create_user(email="invoices@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Invoicing shop", owner=owner)
+        Membership.objects.create(user=owner, workspace=self.workspace, role=Membership.OWNER)
+        customer = Customer.objects.create(workspace=self.workspace, name="Ada", address="1 Main St\nTown")
+        status = OrderStatus.objects.create(status_name="Paid")
+        self.product = Product.objects.create(workspace=self.workspace, sku="MUG", title="Mug", price=Decimal("9.50"))
+        paid_at = timezone.make_aware(datetime(2026, 3, 14, 12))
+        self.orders = []
+        for n in range(3):
+            order = Order.objects.create(
+                workspace=self.workspace, order_number=f"INV/{n}", customer=customer, status=status, paid_at=paid_at
+            )
+            OrderItem.objects.create(order=order, product=self.product, quantity=Decimal(n + 1))
+            self.orders.append(order)
+        Order.objects.create(workspace=self.workspace, order_number="APRIL", customer=customer, status=status,
+                             paid_at=timezone.make_aware(datetime(2026, 4, 1, 12)))
+        token = WorkspaceTokenObtainPairSerializer.get_token(owner).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_WORKSPACE_ID=str(self.workspace.pk))
+
+    def test_unchanged_orders_are_not_rendered_again(self):
+        ids = [order.pk for order in self.orders]
+        self.assertEqual(invoices.render_orders(self.workspace.pk, ids), {"rendered": 3, "unchanged": 0})
+        first = Invoice.objects.get(order=self.orders[0])
+        self.assertTrue(default_storage.open(first.file.name).read().startswith(b"%PDF-1.4"))
+        self.assertEqual(first.file.name, invoices.storage_path(first.digest))
+
+        self.assertEqual(invoices.render_orders(self.workspace.pk, ids), {"rendered": 0, "unchanged": 3})
+        self.assertEqual(Invoice.objects.get(order=self.orders[0]).rendered_at, first.rendered_at)
+
+        item = self.orders[0].items.get()
+        item.quantity = Decimal(5)
+        item.save()
+        self.assertEqual(invoices.render_orders(self.workspace.pk, ids), {"rendered": 1, "unchanged": 2})
+        changed = Invoice.objects.get(order=self.orders[0])
+        self.assertNotEqual(changed.digest, first.digest)
+        # the earlier version stays stored, and is reused if the order changes back
+        self.assertTrue(default_storage.exists(first.file.name))
+
+    def test_month_archive_streams_in_chunks(self):
+        with self.settings(INVOICE_STORAGE_DIR="month"):
+            chunks = list(invoices.month_archive(self.workspace.pk, 2026, 3))
+        self.assertGreater(len([chunk for chunk in chunks if chunk]), 3)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            self.assertEqual(archive.namelist(), ["INV_0.pdf", "INV_1.pdf", "INV_2.pdf"])
+            self.assertTrue(archive.read("INV_2.pdf").startswith(b"%PDF-1.4"))
+        self.assertEqual(Invoice.objects.count(), 3)
+
+    def test_archive_endpoint(self):
+        response = self.client.get("/api/invoices/2026/3/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="invoices-2026-03.zip"')
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+        for month in (0, 13):
+            self.assertEqual(self.client.get(f"/api/invoices/2026/{month}/").status_code, 400)
+
+    async def test_async_archive_yields_as_it_goes(self):
+        chunks = [chunk async for chunk in invoices.amonth_archive(self.workspace.pk, 2026, 3)]
+        self.assertGreater(len([chunk for chunk in chunks if chunk]), 3)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            self.assertEqual(archive.namelist(), ["INV_0.pdf", "INV_1.pdf", "INV_2.pdf"])
+
+
+class OrderItemBulkTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="bulk@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Bulk shop", owner=owner)
+        Membership.objects.create(user=owner, workspace=self.workspace, role=Membership.OWNER)
+        customer = Customer.objects.create(workspace=self.workspace, name="Ada")
+        status = OrderStatus.objects.create(status_name="Open")
+        self.orders = [
+            Order.objects.create(workspace=self.workspace, order_number=str(n), customer=customer, status=status)
+            for n in range(2)
+        ]
+        self.products = [
+            Product.objects.create(workspace=self.workspace, sku=f"P{n}", title=f"Part {n}", price=Decimal("2.50"))
+            for n in range(40)
+        ]
+        token = WorkspaceTokenObtainPairSerializer.get_token(owner).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_WORKSPACE_ID=str(self.workspace.pk))
+        self.url = "/api/order-items/bulk/"
+
+    def lines(self, count, start=0):
+        return [
+            {"order": self.orders[n % 2].pk, "product": self.products[start + n].pk, "quantity": "2"}
+            for n in range(count)
+        ]
+
+    def test_atomic_batch_costs_the_same_queries_at_any_size(self):
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(self.url, {"items": self.lines(4)}, format="json")
+        self.assertEqual(response.status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, {"items": self.lines(30, start=4)}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(response.data["created"], 30)
+        self.assertEqual(len({r["id"] for r in response.data["results"]}), 30)
+        # unit prices default to the product price, totals follow once per order
+        for order in self.orders:
+            order.refresh_from_db()
+            self.assertEqual(order.total_cost, Decimal("85.00"))
+
+    def test_atomic_creates_nothing_when_an_item_is_invalid(self):
+        other = Workspace.objects.create(name="Other shop", owner=self.workspace.owner)
+        foreign = Product.objects.create(workspace=other, sku="X", title="Theirs")
+        items = self.lines(3)
+        items[1]["quantity"] = "0"
+        items[2]["product"] = foreign.pk
+        response = self.client.post(self.url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual([sorted(r.get("errors", {})) for r in response.data["results"]],
+                         [[], ["quantity"], ["product"]])
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_partial_creates_the_valid_items(self):
+        items = self.lines(3)
+        items.append(dict(items[0]))  # the same line twice breaks unique_together
+        items.append({"order": self.orders[0].pk, "quantity": "1"})
+        response = self.client.post(f"{self.url}?mode=partial", items, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data["created"], response.data["failed"]), (3, 2))
+        results = response.data["results"]
+        self.assertIn("id", results[0])
+        self.assertIn("non_field_errors", results[3]["errors"])
+        self.assertIn("product", results[4]["errors"])
+        self.assertEqual(OrderItem.objects.count(), 3)
+
+    def test_bodies_that_are_not_a_list_or_object_are_rejected(self):
+        for body in ("x", 5, None, []):
+            response = self.client.post(self.url, body, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("items", response.data)
+
+    def test_viewers_cannot_write(self):
+        viewer = User.objects.create_user(email="viewer@example.com", password="x")
+        Membership.objects.create(user=viewer, workspace=self.workspace, role=Membership.VIEWER)
+        token = WorkspaceTokenObtainPairSerializer.get_token(viewer).access_token
+        client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_WORKSPACE_ID=str(self.workspace.pk))
+        self.assertEqual(client.post(self.url, {"items": self.lines(1)}, format="json").status_code, 403)
+
+
+@override_settings(ORDER_NUMBER_FORMAT="ORD-{number:04d}")
+class OrderNumberTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="numbers@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Numbered shop", owner=owner)
+        self.customer = Customer.objects.create(workspace=self.workspace, name="Ada")
+        self.status = OrderStatus.objects.create(status_name="Paid")
+
+    def test_blocks_are_consecutive_and_one_statement(self):
+        # the first call also creates the counter
+        with self.assertNumQueries(3):
+            self.assertEqual(numbering.allocate(self.workspace), ["ORD-0001"])
+        with self.assertNumQueries(1):
+            self.assertEqual(numbering.allocate(self.workspace, 3), ["ORD-0002", "ORD-0003", "ORD-0004"])
+        other = Workspace.objects.create(name="Other shop", owner=self.workspace.owner)
+        self.assertEqual(numbering.allocate(other.pk), ["ORD-0001"])
+
+        OrderNumberSequence.objects.filter(workspace=self.workspace).update(number_format="W{number}")
+        self.assertEqual(numbering.allocate(self.workspace), ["W5"])
+        with self.assertRaises(ValidationError):
+            OrderNumberSequence(workspace=self.workspace, number_format="{count}").clean()
+
+    def test_orders_without_number_get_one(self):
+        order = Order.objects.create(workspace=self.workspace, customer=self.customer, status=self.status)
+        self.assertEqual(order.order_number, "ORD-0001")
+        kept = Order.objects.create(
+            workspace=self.workspace, customer=self.customer, status=self.status, order_number="BB-1"
+        )
+        self.assertEqual(kept.order_number, "BB-1")
+
+        platform = PlatformSource.objects.create(platform_name="Shop")
+        records = [
+            {"external_id": str(n), "status": "Paid", "customer": {"external_id": "c", "name": "Bob"}, "items": []}
+            for n in range(3)
+        ] + [{"external_id": "x", "order_number": "BB-2", "status": "Paid",
+              "customer": {"external_id": "c", "name": "Bob"}, "items": []}]
+        upsert_orders(self.workspace, platform, records)
+        self.assertEqual(
+            sorted(Order.objects.filter(platform=platform).values_list("order_number", flat=True)),
+            ["BB-2", "ORD-0002", "ORD-0003", "ORD-0004"],
+        )
+
+    def test_counter_starts_after_existing_numbers(self):
+        for number in ("ORD-0001", "ORD-0007", "ORD-12", "ORD-0100-B"):
+            Order.objects.create(
+                workspace=self.workspace, customer=self.customer, status=self.status, order_number=number
+            )
+        order = Order.objects.create(workspace=self.workspace, customer=self.customer, status=self.status)
+        self.assertEqual(order.order_number, "ORD-0013")
+        self.assertEqual(numbering.allocate(self.workspace, 2), ["ORD-0014", "ORD-0015"])
+
+
+@skipUnless(connection.vendor == "postgresql", "needs concurrent writers")
+class ConcurrentOrderNumberTests(TransactionTestCase):
+    def test_concurrent_allocations_never_collide(self):
+        owner = User.objects.create_user(email="race@example.com", password="x")
+        workspace = Workspace.objects.create(name="Race shop", owner=owner)
+        numbers, lock = [], threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(20):
+                    block = numbering.allocate(workspace.pk, 5)
+                    with lock:
+                        numbers.extend(block)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(numbers), 800)
+        self.assertEqual(len(set(numbers)), 800)
@@ -0,0 +1,330 @@
+"""Bulk upsert of marketplace orders (customers, orders and items).
+
+Integrations normalise their payloads into plain dicts::
+
+    {
+        "external_id": "4711", "order_number": "BB-4711", "status": "Paid",
+        "currency": "EUR", "total": Decimal("19.90"), "paid_at": datetime | None,
+        "shipping_address": "...", "billbee_id": 4711, "payload": {...},
+        "modified_at": datetime | None,  # last change on the platform
+        "customer": {"external_id": "9", "name": "...", "email": "...",
+                     "phone": "...", "address": "...", "billbee_id": 9},
+        "items": [{"external_id": "55", "sku": "MUG-1", "title": "Mug",
+                   "quantity": Decimal("2"), "unit_price": Decimal("9.95"),
+                   "total_price": Decimal("19.90"), "attributes": {...},
+                   "billbee_id": 55}],
+    }
+
+A batch costs a fixed number of queries whatever its size (existing rows are
+selected by external id, then ``bulk_create`` / ``bulk_update``), and rows
+whose values did not change are not written at all. Imported orders keep the
+marketplace total and are created with ``totals_locked=True``.
+Records without an ``order_number`` are numbered from one block taken from
+:mod:`orders.numbering` for the whole batch. Records that cannot be stored
+(no ``external_id``, or a new order without a customer) are skipped and
+reported in ``UpsertResult.errors``; the rest of the batch is written.
+"""
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.models import Product
+from core.response_cache import bump_resource_version
+from integrations import outbox
+
+from . import numbering
+from .models import Customer, Order, OrderItem, OrderStatus
+from .signals import order_paid_payload
+
+ORDER_FIELDS = (
+    "order_number", "status_id", "customer_id", "currency", "total_cost", "external_total_cost",
+    "paid_at", "shipping_address", "external_payload", "order_billbee_id",
+)
+CUSTOMER_FIELDS = ("name", "email", "phone", "address", "customer_billbee_id")
+ITEM_FIELDS = (
+    "product_id", "quantity", "unit_price", "total_price", "is_personalized", "attributes",
+    "order_item_billbee_id",
+)
+
+
+@dataclass
+class UpsertResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # [{"external_id": ..., "error": ...}] for records that were skipped
+    errors: list = field(default_factory=list)
+
+    def __add__(self, other):
+        return UpsertResult(
+            self.created + other.created, self.updated + other.updated, self.unchanged + other.unchanged,
+            self.errors + other.errors,
+        )
+
+    def as_dict(self):
+        return {
+            "created": self.created, "updated": self.updated, "unchanged": self.unchanged, "errors": self.errors,
+        }
+
+
+def _fit(model, field, value):
+    """Trim strings to the column length so one long value cannot fail a whole batch."""
+    max_length = model._meta.get_field(field).max_length
+    if isinstance(value, str) and max_length:
+        return value[:max_length]
+    return value
+
+
+def _apply(obj, values):
+    """Copy ``values`` onto ``obj``; return whether anything changed."""
+    changed = False
+    for field, value in values.items():
+        if getattr(obj, field) != value:
+            setattr(obj, field, value)
+            changed = True
+    return changed
+
+
+def _same(a, b):
+    return b is not None and (a is b or (a.pk is not None and a.pk == b.pk))
+
+
+def _statuses(names):
+    statuses = dict(OrderStatus.objects.filter(status_name__in=names).values_list("status_name", "pk"))
+    for name in set(names) - set(statuses):
+        statuses[name] = OrderStatus.objects.get_or_create(status_name=name)[0].pk
+    return statuses
+
+
+def _customers(workspace_id, platform, records):
+    """Map customer external id -> customer_id, creating / updating as needed."""
+    wanted = {}
+    for record in records:
+        customer = record.get("customer") or {}
+        if customer.get("external_id"):
+            wanted[str(customer["external_id"])] = customer
+    if not wanted:
+        return {}
+
+    scoped = Customer.objects.for_workspace(workspace_id)
+    existing = {c.external_id: c for c in scoped.filter(platform=platform, external_id__in=list(wanted))}
+    emails = {c["email"] for c in wanted.values() if c.get("email")}
+    # emails are unique per workspace: remember who owns each one
+    owners = {c.email: c for c in scoped.filter(email__in=emails)} if emails else {}
+
+    to_create, to_update = [], []
+    for key, data in wanted.items():
+        values = {
+            "name": _fit(Customer, "name", data.get("name") or data.get("email") or key),
+            "email": _fit(Customer, "email", data.get("email") or None),
+            "phone": _fit(Customer, "phone", data.get("phone") or ""),
+            "address": data.get("address") or "",
+            "customer_billbee_id": data.get("billbee_id"),
+        }
+        customer, linked = existing.get(key), False
+        owner = owners.get(values["email"])
+        if customer is None and owner is not None and owner.external_id is None:
+            # link the manually created customer instead of duplicating it
+            customer, linked = owner, True
+            customer.platform, customer.external_id = platform, key
+            existing[key] = customer
+        if owner is not None and not _same(owner, customer):
+            values["email"] = customer.email if customer is not None else None
+        if customer is None:
+            customer = Customer(workspace_id=workspace_id, platform=platform, external_id=key, **values)
+            to_create.append(customer)
+            existing[key] = customer
+        elif _apply(customer, values) or linked:
+            to_update.append(customer)
+        if values["email"]:
+            owners[values["email"]] = customer
+
+    now = timezone.now()
+    for customer in to_update:
+        customer.updated_at = now
+    scoped.bulk_create(to_create)
+    if to_update:
+        scoped.bulk_update(to_update, [*CUSTOMER_FIELDS, "platform", "external_id", "updated_at"])
+    return {key: c.pk for key, c in existing.items()}
+
+
+def _products(workspace_id, records):
+    """Map SKU -> product_id; unknown SKUs get a minimal product to attach lines to."""
+    wanted = {}
+    for record in records:
+        for item in record.get("items") or ():
+            wanted.setdefault(item["sku"], item)
+    if not wanted:
+        return {}
+    scoped = Product.objects.for_workspace(workspace_id)
+    found = dict(scoped.filter(sku__in=list(wanted)).values_list("sku", "pk"))
+    missing = [
+        Product(
+            workspace_id=workspace_id,
+            sku=_fit(Product, "sku", sku),
+            title=_fit(Product, "title", item.get("title") or sku),
+            price=item.get("unit_price"),
+            billbee_id=item.get("product_billbee_id"),
+        )
+        for sku, item in wanted.items() if sku not in found
+    ]
+    if missing:
+        scoped.bulk_create(missing, ignore_conflicts=True)
+        found.update(scoped.filter(sku__in=[p.sku for p in missing]).values_list("sku", "pk"))
+    return found
+
+
+def _line_values(item, product_id):
+    quantity = Decimal(item["quantity"])
+    unit_price = item.get("unit_price")
+    total_price = item.get("total_price")
+    if total_price is None and unit_price is not None:
+        total_price = (Decimal(unit_price) * quantity).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return {
+        "product_id": product_id,
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "total_price": total_price,
+        "is_personalized": bool(item.get("is_personalized")),
+        "attributes": item.get("attributes") or {},
+        "order_item_billbee_id": item.get("billbee_id"),
+    }
+
+
+def upsert_orders(workspace, platform, records):
+    """Create or update ``records`` (see module docstring) in ``workspace``."""
+    workspace_id = getattr(workspace, "pk", workspace)
+    result = UpsertResult()
+    records = list(records)
+    result.errors += [
+        {"external_id": None, "error": "Missing external_id."} for r in records if not r.get("external_id")
+    ]
+    records = [r for r in records if r.get("external_id")]
+    if not records:
+        return result
+    records = list({str(r["external_id"]): r for r in records}.values())  # last one wins
+
+    statuses = _statuses({r["status"] for r in records})
+    customers = _customers(workspace_id, platform, records)
+    products = _products(workspace_id, records)
+
+    orders = Order.objects.for_workspace(workspace_id)
+    existing = {
+        o.external_id: o
+        for o in orders.filter(platform=platform, external_id__in=[str(r["external_id"]) for r in records])
+    }
+    missing_customer = [
+        r for r in records
+        if str(r["external_id"]) not in existing
+        and str((r.get("customer") or {}).get("external_id") or "") not in customers
+    ]
+    if missing_customer:
+        # a new order needs a customer; report the record instead of dropping it
+        result.errors += [
+            {"external_id": str(r["external_id"]), "error": "New order without a customer external_id."}
+            for r in missing_customer
+        ]
+        skipped = {id(r) for r in missing_customer}
+        records = [r for r in records if id(r) not in skipped]
+    new_records = [r for r in records if str(r["external_id"]) not in existing]
+    new_numbers = [r["order_number"] for r in new_records if r.get("order_number")]
+    taken_numbers = set(orders.filter(order_number__in=new_numbers).values_list("order_number", flat=True))
+    # one block of our own numbers for platforms that send none
+    allocated = iter(numbering.allocate(workspace_id, len(new_records) - len(new_numbers)))
+
+    now = timezone.now()
+    to_create, to_update, paid = [], [], []
+    for record in records:
+        key = str(record["external_id"])
+        customer_key = str((record.get("customer") or {}).get("external_id") or "")
+        values = {
+            "status_id": statuses[record["status"]],
+            "currency": record.get("currency") or "EUR",
+            "total_cost": record.get("total"),
+            "external_total_cost": record.get("total"),
+            "paid_at": record.get("paid_at"),
+            "shipping_address": record.get("shipping_address") or "",
+            "external_payload": record.get("payload"),
+            "order_billbee_id": record.get("billbee_id"),
+        }
+        if customer_key in customers:
+            values["customer_id"] = customers[customer_key]
+        order = existing.get(key)
+        if order is not None and order.paid_at is None and values["paid_at"] is not None:
+            paid.append(order)
+        if order is None:
+            number = record.get("order_number") or next(allocated)
+            if number in taken_numbers:
+                number = f"{number}/{key}"
+            taken_numbers.add(number)
+            order = Order(
+                workspace_id=workspace_id, platform=platform, external_id=key,
+                order_number=_fit(Order, "order_number", number), totals_locked=True, **values,
+            )
+            to_create.append(order)
+            existing[key] = order
+        elif _apply(order, values):
+            order.updated_at = now
+            to_update.append(order)
+        else:
+            result.unchanged += 1
+
+    orders.bulk_create(to_create)
+    if to_update:
+        orders.bulk_update(to_update, [*ORDER_FIELDS, "updated_at"])
+    # bulk writes send no signals: record order.paid in the same transaction here
+    paid += [order for order in to_create if order.paid_at is not None]
+    outbox.record_many(workspace_id, [
+        outbox.event(workspace_id, "order.paid", order, order_paid_payload(order)) for order in paid
+    ])
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+    _upsert_items(workspace_id, records, existing, products, now)
+    # bulk writes send no signals, so invalidate cached order listings here
+    transaction.on_commit(lambda: bump_resource_version(workspace_id, "orders"), using=orders.db)
+    return result
+
+
+def _upsert_items(workspace_id, records, orders_by_key, products, now):
+    items = OrderItem.objects.for_workspace(workspace_id)
+    order_ids = [o.pk for o in orders_by_key.values() if o.pk]
+    existing = {}
+    for item in items.filter(order_id__in=order_ids):
+        existing[(item.order_id, item.external_id)] = item
+
+    to_create, to_update, keep = [], [], set()
+    for record in records:
+        order = orders_by_key.get(str(record["external_id"]))
+        if order is None or order.pk is None:
+            continue
+        seen = set()
+        for data in record.get("items") or ():
+            key = str(data.get("external_id") or data["sku"])
+            values = _line_values(data, products[data["sku"]])
+            # (order, product, is_personalized, attributes) must stay unique
+            identity = (values["product_id"], values["is_personalized"], repr(sorted(values["attributes"].items())))
+            if identity in seen:
+                continue
+            seen.add(identity)
+            item = existing.get((order.pk, key))
+            if item is None:
+                to_create.append(OrderItem(order_id=order.pk, external_id=key, **values))
+            else:
+                keep.add(item.pk)
+                if _apply(item, values):
+                    item.updated_at = now
+                    to_update.append(item)
+
+    # lines that disappeared from a marketplace order
+    stale = [
+        item.pk for (order_id, key), item in existing.items()
+        if item.pk not in keep and key is not None
+    ]
+    if stale:
+        items.filter(pk__in=stale).delete()
+    if to_update:
+        items.bulk_update(to_update, [*ITEM_FIELDS, "updated_at"])
+    items.bulk_create(to_create)
@@ -0,0 +1,13 @@
+from django.urls import path
+from rest_framework.routers import SimpleRouter
+
+from .views import InvoiceArchiveView, OrderItemBulkView, OrderViewSet
+
+router = SimpleRouter()
+router.register("orders", OrderViewSet, basename="order")
+
+urlpatterns = [
+    path("order-items/bulk/", OrderItemBulkView.as_view(), name="order-item-bulk"),
+    path("invoices/<int:year>/<int:month>/", InvoiceArchiveView.as_view(), name="invoice-archive"),
+    *router.urls,
+]
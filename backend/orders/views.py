@@ -1,3 +1,71 @@
-from django.shortcuts import render
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from authapp.authentication import StatelessJWTAuthentication
+from core.api import BulkCreateView, WorkspaceReadOnlyViewSet
+from core.permissions import IsWorkspaceMember
+from core.response_cache import bump_resource_version
+
+from . import invoices
+from .models import Order, OrderItem
+from .serializers import OrderDetailSerializer, OrderItemWriteSerializer, OrderSerializer
+from .signals import refresh_total
+
+
+class OrderViewSet(WorkspaceReadOnlyViewSet):
+    queryset = Order.objects.select_related("status", "customer", "platform")
+    serializer_class = OrderSerializer
+    # status / platform names, and product sku / title on the detail's lines
+    cache_resources = ("orders", "catalog", "reference")
+    filter_fields = ("status__status_name", "platform__platform_name")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            items = OrderItem.objects.select_related("product").order_by("pk")
+            queryset = queryset.prefetch_related(Prefetch("items", queryset=items))
+        return queryset
+
+    def get_serializer_class(self):
+        return OrderDetailSerializer if self.action == "retrieve" else OrderSerializer
+
+
+class InvoiceArchiveView(APIView):
+    """The invoices of orders paid in a month, as a ZIP streamed while it is built."""
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated, IsWorkspaceMember]
+
+    def get(self, request, year, month):
+        try:
+            invoices.month_range(year, month)
+        except (ValueError, OverflowError):
+            return Response({"month": ["Not a valid month."]}, status.HTTP_400_BAD_REQUEST)
+        # an ASGI server needs an async iterator, or it collects the whole archive first
+        archive = invoices.amonth_archive if isinstance(request._request, ASGIRequest) else invoices.month_archive
+        response = StreamingHttpResponse(
+            archive(self.workspace_id, year, month), content_type="application/zip"
+        )
+        response["Content-Disposition"] = f'attachment; filename="invoices-{year:04d}-{month:02d}.zip"'
+        return response
+
+
+class OrderItemBulkView(BulkCreateView):
+    """Add many lines at once; each affected order's total is recomputed once."""
+    serializer_class = OrderItemWriteSerializer
+
+    def build(self, validated_data):
+        item = super().build(validated_data)
+        item.apply_defaults()
+        return item
+
+    def after_create(self, items):
+        # the orders were loaded once for validation, so they are shared between items
+        for order in {item.order_id: item.order for item in items}.values():
+            refresh_total(order)
+        workspace_id = self.workspace_id
+        transaction.on_commit(lambda: bump_resource_version(workspace_id, "orders"), using=self.get_queryset().db)
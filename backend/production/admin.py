@@ -1,5 +1,13 @@
-from django.contrib import admin
-from .models import PrinterType, Printer, Filament, FilamentTransaction, PrintJob
+from django.contrib import admin, messages
+from django.urls import reverse
+from django.utils.html import format_html
+
+from core.admin_performance import BoundedInlineMixin, FastAdminMixin
+
+from .agent import issue_agent_token
+from .models import (
+    Filament, FilamentStockCheckpoint, FilamentTransaction, FilamentTransactionArchive, PrinterType, Printer, PrintJob,
+)
 
 @admin.register(PrinterType)
 class PrinterTypeAdmin(admin.ModelAdmin):
@@ -8,33 +16,79 @@ class PrinterTypeAdmin(admin.ModelAdmin):
     list_filter = ("is_active",)
 
 @admin.register(Printer)
-class PrinterAdmin(admin.ModelAdmin):
-    list_display = ("machine_name", "printer_type", "status", "workspace", "location", "updated_at")
+class PrinterAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("machine_name", "printer_type", "status", "workspace", "location", "last_seen_at", "updated_at")
     list_filter = ("status", "printer_type", "workspace")
     search_fields = ("machine_name", "location")
     autocomplete_fields = ("workspace", "printer_type")
+    readonly_fields = ("agent_version", "last_seen_at", "telemetry")
+    actions = ["issue_token"]
+
+    @admin.action(description="Issue a new agent token")
+    def issue_token(self, request, queryset):
+        # tokens are only stored hashed, so this is the one chance to copy them
+        for printer in queryset:
+            self.message_user(request, f"{printer.machine_name}: {issue_agent_token(printer)}", messages.WARNING)
 
-class FilamentTransactionInline(admin.TabularInline):
+class FilamentTransactionInline(BoundedInlineMixin, admin.TabularInline):
     model = FilamentTransaction
+    ordering = ("-pk",)  # the newest page; older ones in the transaction changelist
     extra = 1
+    raw_id_fields = ("print_job",)
     readonly_fields = ("previous_stock", "new_stock", "created_at")
 
 @admin.register(Filament)
-class FilamentAdmin(admin.ModelAdmin):
+class FilamentAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("filament_name", "material", "color", "current_stock_grams", "location", "workspace", "is_available")
     list_filter = ("material", "color", "workspace", "is_available")
     search_fields = ("filament_name", "filament_code", "location")
     autocomplete_fields = ("workspace", "material", "color")
+    readonly_fields = ("archived_transactions",)
     inlines = [FilamentTransactionInline]
 
+    @admin.display(description="Archived transactions")
+    def archived_transactions(self, obj):
+        if obj.pk is None:
+            return "-"
+        url = reverse("admin:production_filamenttransactionarchive_changelist") + f"?filament={obj.pk}"
+        return format_html('<a href="{}">Archive</a>', url)
+
+@admin.register(FilamentStockCheckpoint)
+class FilamentStockCheckpointAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("filament", "as_of_transaction_id", "balance_grams", "total_in_grams", "total_out_grams",
+                    "transaction_count", "created_at")
+    list_select_related = ("filament",)
+    raw_id_fields = ("filament",)
+
+@admin.register(FilamentTransactionArchive)
+class FilamentTransactionArchiveAdmin(FastAdminMixin, admin.ModelAdmin):
+    list_display = ("filament", "first_transaction_id", "last_transaction_id", "first_created_at", "last_created_at",
+                    "transaction_count", "total_in_grams", "total_out_grams")
+    list_select_related = ("filament",)
+    exclude = ("data",)
+    readonly_fields = ("archived_rows",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Transactions")
+    def archived_rows(self, obj):
+        return format_html("<pre>{}</pre>", "\n".join(
+            f"#{r['transaction_id']} {r['created_at']} {r['kind']} {r['quantity_grams']}g {r['reason']}"
+            for r in obj.rows()
+        ))
+
 @admin.register(FilamentTransaction)
-class FilamentTransactionAdmin(admin.ModelAdmin):
+class FilamentTransactionAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("filament", "kind", "quantity_grams", "previous_stock", "new_stock", "created_at", "created_by")
     list_filter = ("kind", "created_at")
     autocomplete_fields = ("filament", "print_job")
 
 @admin.register(PrintJob)
-class PrintJobAdmin(admin.ModelAdmin):
+class PrintJobAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ("print_job_id", "product", "order_item", "status", "priority", "printer", "filament_used", "updated_at")
     list_filter = ("status", "priority", "printer", "workspace")
     search_fields = ("product__title", "order_item__order__order_number")
@@ -0,0 +1,293 @@
+"""Printer agent API: async endpoints for check-ins, telemetry, job long-polls and event streams.
+
+Agents (the small daemon next to each printer) and dashboards spend most of
+a request waiting, so these views are ``async def`` and meant to be served
+by the ASGI app (``backend.asgi``): one worker keeps thousands of long-polls
+open while a WSGI worker holds a thread per request. ORM calls use the
+async API; the remaining sync pieces (shard lookup, JWT denylist, workspace
+roles) run through ``sync_to_async``.
+
+Long-polls do not poll the database: they watch the workspace's
+``print_jobs`` version in :mod:`core.response_cache`, which every job
+change bumps, and only query when it moved.
+
+Shop-floor screens subscribe to :func:`event_stream` (Server-Sent Events)
+instead of polling: job and printer changes arrive as coalesced deltas
+through :mod:`core.events`, and an idle stream is a suspended coroutine.
+
+Agents authenticate with ``Authorization: Agent <token>``; tokens look like
+``<workspace_id>.<printer_id>.<secret>`` so the printer row is found on its
+shard without a global index, and only the secret's SHA-256 is stored.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import secrets
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import AuthenticationFailed
+
+from authapp.authentication import StatelessJWTAuthentication
+from core import events
+from core.response_cache import abump_resource_version, aresource_versions
+from core.utils import request_workspace_id, workspace_role
+
+from .models import Printer, PrinterTelemetry, PrintJob
+
+AUTH_SCHEME = "Agent"
+
+
+def _hash(secret):
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def issue_agent_token(printer):
+    """Create (or rotate) ``printer``'s agent token; only the returned value can authenticate."""
+    secret = secrets.token_urlsafe(32)
+    printer.agent_token_hash = _hash(secret)
+    Printer.objects.for_workspace(printer.workspace_id).filter(pk=printer.pk).update(
+        agent_token_hash=printer.agent_token_hash
+    )
+    return f"{printer.workspace_id}.{printer.pk}.{secret}"
+
+
+def _error(detail, status):
+    return JsonResponse({"detail": detail}, status=status)
+
+
+async def _agent_printer(request):
+    """Printer owning the request's agent token, or ``None``."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    parts = token.strip().split(".", 2)
+    if scheme != AUTH_SCHEME or len(parts) != 3 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    workspace_id, printer_id, secret = int(parts[0]), int(parts[1]), parts[2]
+    printers = await sync_to_async(Printer.objects.for_workspace)(workspace_id)
+    printer = await printers.filter(pk=printer_id).exclude(agent_token_hash="").afirst()
+    if printer is None or not hmac.compare_digest(printer.agent_token_hash, _hash(secret)):
+        return None
+    return printer
+
+
+def _wait_seconds(request):
+    try:
+        wait = float(request.GET.get("wait", 0))
+    except ValueError:
+        wait = 0
+    return min(max(wait, 0), settings.LONGPOLL_MAX_WAIT)
+
+
+async def _wait_for_jobs_change(workspace_id, deadline):
+    """Sleep until the workspace's print job version moves; ``False`` on timeout."""
+    start = await aresource_versions(workspace_id, ["print_jobs"])
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(settings.LONGPOLL_TICK, remaining))
+        if await aresource_versions(workspace_id, ["print_jobs"]) != start:
+            return True
+
+
+def _read_json(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+# ---- agent endpoints ----
+
+@csrf_exempt
+@require_POST
+async def check_in(request):
+    """Heartbeat: ``{"status": "online", "agent_version": "1.4.0"}``."""
+    printer = await _agent_printer(request)
+    if printer is None:
+        return _error("Invalid agent token.", 401)
+    body = _read_json(request)
+    if body is None:
+        return _error("Body must be JSON.", 400)
+    status = body.get("status", printer.status)
+    if status not in Printer.Status.values:
+        return _error(f"Unknown status {status!r}.", 400)
+
+    now = timezone.now()
+    changes = {"last_seen_at": now, "agent_version": str(body.get("agent_version", printer.agent_version))[:50]}
+    if status != printer.status:
+        changes.update(status=status, updated_at=now)
+    await Printer.objects.using(printer._state.db).filter(pk=printer.pk).aupdate(**changes)
+    if status != printer.status:
+        # the listing only changes with the status, not with every heartbeat
+        await abump_resource_version(printer.workspace_id, "printers")
+        await sync_to_async(events.publish, thread_sensitive=False)(
+            printer.workspace_id, [{"type": "printer", "id": printer.pk, "status": status}]
+        )
+    queued = await PrintJob.objects.using(printer._state.db).filter(
+        printer=printer, status=PrintJob.Status.QUEUED
+    ).acount()
+    return JsonResponse({
+        "printer_id": printer.pk,
+        "status": status,
+        "queued_jobs": queued,
+        "poll_interval": settings.AGENT_POLL_INTERVAL,
+    })
+
+
+@csrf_exempt
+@require_POST
+async def upload_telemetry(request):
+    """``{"samples": [{"recorded_at": iso, "nozzle_temp": 215.0, "bed_temp": 60, "progress": 42.5, ...}]}``"""
+    printer = await _agent_printer(request)
+    if printer is None:
+        return _error("Invalid agent token.", 401)
+    body = _read_json(request)
+    samples = body.get("samples") if isinstance(body, dict) else None
+    if not isinstance(samples, list) or not samples:
+        return _error("Expected a non-empty 'samples' list.", 400)
+    if len(samples) > settings.AGENT_TELEMETRY_MAX_SAMPLES:
+        return _error(f"At most {settings.AGENT_TELEMETRY_MAX_SAMPLES} samples per upload.", 400)
+
+    now = timezone.now()
+    rows = []
+    for sample in samples:
+        if not isinstance(sample, dict):
+            return _error("Samples must be objects.", 400)
+        extra = {k: v for k, v in sample.items() if k not in ("recorded_at", "nozzle_temp", "bed_temp", "progress")}
+        try:
+            rows.append(PrinterTelemetry(
+                printer=printer,
+                recorded_at=parse_datetime(sample.get("recorded_at") or "") or now,
+                nozzle_temp=_number(sample.get("nozzle_temp")),
+                bed_temp=_number(sample.get("bed_temp")),
+                progress=_number(sample.get("progress")),
+                data=extra,
+            ))
+        except (TypeError, ValueError):
+            return _error("Invalid sample values.", 400)
+
+    alias = printer._state.db
+    await PrinterTelemetry.objects.using(alias).abulk_create(rows)
+    latest = max(samples, key=lambda s: s.get("recorded_at") or "")
+    await Printer.objects.using(alias).filter(pk=printer.pk).aupdate(last_seen_at=now, telemetry=latest)
+    return JsonResponse({"accepted": len(rows)}, status=201)
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+@require_GET
+async def next_job(request):
+    """Long-poll for the next queued job of the agent's printer (``?wait=`` seconds, 204 on timeout)."""
+    printer = await _agent_printer(request)
+    if printer is None:
+        return _error("Invalid agent token.", 401)
+    deadline = time.monotonic() + _wait_seconds(request)
+    jobs = PrintJob.objects.using(printer._state.db).filter(printer=printer, status=PrintJob.Status.QUEUED)
+    while True:
+        job = await jobs.order_by("-priority", "created_at").values(
+            "print_job_id", "product_id", "component_label", "priority", "estimated_print_time", "notes"
+        ).afirst()
+        if job is not None:
+            return JsonResponse(job)
+        if not await _wait_for_jobs_change(printer.workspace_id, deadline):
+            return HttpResponse(status=204)
+
+
+# ---- dashboard endpoints ----
+
+def _jwt_user(request, allow_query_token):
+    auth = StatelessJWTAuthentication()
+    raw = request.GET.get("token") if allow_query_token else None
+    if not raw:
+        result = auth.authenticate(request)
+        return result[0] if result else None
+    return auth.get_user(auth.get_validated_token(raw))
+
+
+async def _authenticate_user(request, allow_query_token=False):
+    try:
+        return await sync_to_async(_jwt_user)(request, allow_query_token)
+    except AuthenticationFailed:
+        return None
+
+
+async def _member_workspace(request, user):
+    workspace_id = request_workspace_id(request)
+    if workspace_id is None or await sync_to_async(workspace_role)(user, workspace_id) is None:
+        return None
+    return workspace_id
+
+
+@require_GET
+async def job_status(request, pk):
+    """Long-poll a job's status: returns at once unless it still equals ``?since=``."""
+    user = await _authenticate_user(request)
+    if user is None:
+        return _error("Authentication credentials were not provided or are invalid.", 401)
+    workspace_id = await _member_workspace(request, user)
+    if workspace_id is None:
+        return _error("Select a workspace you are a member of (X-Workspace-ID header).", 403)
+
+    jobs = await sync_to_async(PrintJob.objects.for_workspace)(workspace_id)
+    since = request.GET.get("since")
+    deadline = time.monotonic() + _wait_seconds(request)
+    while True:
+        job = await jobs.filter(pk=pk).values("print_job_id", "status", "printer_id", "updated_at").afirst()
+        if job is None:
+            return _error("Not found.", 404)
+        if job["status"] != since or not await _wait_for_jobs_change(workspace_id, deadline):
+            return JsonResponse(job)
+
+
+@require_GET
+async def event_stream(request):
+    """Server-Sent Events of the workspace's job and printer changes.
+
+    ``EventSource`` cannot send headers, so the access token and workspace
+    may also be passed as ``?token=`` and ``?workspace=``. Events are
+    ``job`` / ``printer`` deltas (``{"id": ..., "status": ...}``, or
+    ``{"id": ..., "deleted": true}``), ``ready`` on connect and ``resync``
+    when deltas were dropped. Streams end after ``EVENTS_STREAM_MAX_AGE``
+    and the browser reconnects on its own.
+    """
+    user = await _authenticate_user(request, allow_query_token=True)
+    if user is None:
+        return _error("Authentication credentials were not provided or are invalid.", 401)
+    workspace_id = await _member_workspace(request, user)
+    if workspace_id is None:
+        return _error("Select a workspace you are a member of (?workspace=).", 403)
+
+    response = StreamingHttpResponse(_events(workspace_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx would otherwise hold events back
+    return response
+
+
+async def _events(workspace_id):
+    subscription = events.subscribe(workspace_id)
+    try:
+        yield events.format_sse("ready", {"workspace_id": workspace_id}, retry=3000)
+        deadline = time.monotonic() + settings.EVENTS_STREAM_MAX_AGE
+        while (remaining := deadline - time.monotonic()) > 0:
+            batch, overflow = await subscription.get(min(settings.EVENTS_HEARTBEAT, remaining))
+            if overflow:
+                yield events.format_sse("resync")
+            elif batch:
+                yield "".join(
+                    events.format_sse(event["type"], {k: v for k, v in event.items() if k != "type"})
+                    for event in batch
+                )
+            else:
+                yield ": keepalive\n\n"
+    finally:
+        subscription.close()
@@ -0,0 +1,75 @@
+"""Shop-floor dashboard: one summary of a workspace's floor in four queries.
+
+Each table is read once with conditional aggregates (``Count(filter=...)``,
+``Sum(filter=...)``) instead of one query per number; all four run on the
+workspace's shard. :func:`cached_summary` keeps the result for
+``DASHBOARD_CACHE_TTL`` seconds per workspace, so screens polling the
+dashboard share one computation.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from orders.models import Order
+
+from .models import Filament, Printer, PrintJob
+
+# jobs still ahead of the floor; their estimates add up to the queue
+OPEN_JOB_STATUSES = (PrintJob.Status.PENDING, PrintJob.Status.QUEUED, PrintJob.Status.PRINTING)
+
+
+def _by_status(statuses):
+    return {value: Count("pk", filter=Q(status=value)) for value in statuses.values}
+
+
+def summary(workspace_id):
+    now = timezone.localtime()
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    jobs = PrintJob.objects.for_workspace(workspace_id).aggregate(
+        queue_minutes=Sum("estimated_print_time", filter=Q(status__in=OPEN_JOB_STATUSES)),
+        **_by_status(PrintJob.Status),
+    )
+    queue_minutes = jobs.pop("queue_minutes") or 0
+
+    printers = Printer.objects.for_workspace(workspace_id).aggregate(**_by_status(Printer.Status))
+
+    low_stock = list(
+        Filament.objects.for_workspace(workspace_id)
+        .filter(current_stock_grams__lt=F("reorder_point_grams"))
+        .order_by("current_stock_grams", "pk")
+        .values("filament_id", "filament_name", "current_stock_grams", "reorder_point_grams")
+    )
+
+    # one row per currency; totals in different currencies are not added up
+    revenue = list(
+        Order.objects.for_workspace(workspace_id)
+        .filter(paid_at__gte=day_start, paid_at__lt=day_start + timedelta(days=1))
+        .values("currency")
+        .annotate(orders=Count("pk"), revenue=Sum("total_cost"))
+        .order_by("currency")
+    )
+
+    return {
+        "generated_at": now,
+        "jobs": jobs,
+        "queue_hours": round(queue_minutes / 60, 1),
+        "printers": printers,
+        "filaments_below_reorder_point": low_stock,
+        "paid_today": {
+            "orders": sum(row["orders"] for row in revenue),
+            "revenue": [{"currency": row["currency"], "amount": row["revenue"] or 0} for row in revenue],
+        },
+    }
+
+
+def cached_summary(workspace_id):
+    key = f"dashboard:{workspace_id}"
+    data = cache.get(key)
+    if data is None:
+        data = summary(workspace_id)
+        cache.set(key, data, settings.DASHBOARD_CACHE_TTL)
+    return data
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+
+from authapp.serializers import WorkspaceTokenObtainPairSerializer
+from core import events
+from core.models import Membership, Workspace
+from production.agent import issue_agent_token
+from production.models import Printer, PrinterType
+from users.models import User
+
+PATH = "/api/agent/jobs/next/?wait={wait}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent agent long-polls one worker serves through the ASGI handler "
+        "(one event loop) and the WSGI handler (a thread per request), in process, and what idle "
+        "event streams cost. Prints JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+        parser.add_argument("--wait", type=float, default=1.0, help="Long-poll wait per request (seconds)")
+        parser.add_argument("--wsgi-threads", type=int, default=8, help="Threads of the WSGI worker")
+        parser.add_argument("--streams", type=int, default=1000, help="Event streams to hold open (0 skips)")
+        parser.add_argument("--output", help="Write the JSON report to this path")
+
+    def handle(self, *args, **opts):
+        workspace, token = self._agent()
+        headers = {"Authorization": f"Agent {token}"}
+        path = PATH.format(wait=opts["wait"])
+        try:
+            results = [
+                {
+                    "concurrency": n,
+                    "asgi": asyncio.run(self._asgi(path, headers, n)),
+                    "wsgi": self._wsgi(path, headers, n, opts["wsgi_threads"]),
+                }
+                for n in opts["concurrency"]
+            ]
+            streams = asyncio.run(self._streams(workspace, opts["streams"])) if opts["streams"] else None
+        finally:
+            workspace.owner.delete()  # cascades to the workspace and its printer
+        report = {"wait_s": opts["wait"], "wsgi_threads": opts["wsgi_threads"], "results": results, "streams": streams}
+        data = json.dumps(report, indent=2)
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                fh.write(data)
+        self.stdout.write(data)
+
+    def _agent(self):
+        stamp = time.time_ns()
+        owner = User.objects.create_user(email=f"agent-bench-{stamp}@example.com", password=None)
+        workspace = Workspace.objects.create(name=f"agent bench {stamp}", owner=owner)
+        Membership.objects.create(user=owner, workspace=workspace, role=Membership.OWNER)
+        printer_type, _ = PrinterType.objects.get_or_create(type_name="Benchmark")
+        printer = Printer.objects.create(workspace=workspace, machine_name="bench", printer_type=printer_type)
+        return workspace, issue_agent_token(printer)
+
+    async def _asgi(self, path, headers, n):
+        client = AsyncClient()
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path, headers=headers) for _ in range(n)))
+        return _summary(start, [r.status_code for r in responses])
+
+    def _wsgi(self, path, headers, n, threads):
+        def call(_):
+            try:
+                return Client().get(path, headers=headers).status_code
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            statuses = list(pool.map(call, range(n)))
+        return _summary(start, statuses)
+
+    async def _streams(self, workspace, n):
+        """Open ``n`` idle streams, then time one event's fan-out to all of them."""
+        token = WorkspaceTokenObtainPairSerializer.get_token(workspace.owner).access_token
+        path = f"/api/events/?workspace={workspace.pk}&token={token}"
+        client = AsyncClient()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        responses = await asyncio.gather(*(client.get(path) for _ in range(n)))
+        streams = [aiter(r.streaming_content) for r in responses]
+        await asyncio.gather(*(anext(s) for s in streams))  # "ready"
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        events.publish(workspace.pk, [{"type": "printer", "id": 0, "status": "online"}])
+        chunks = await asyncio.gather(*(anext(s) for s in streams))
+        fanout = time.perf_counter() - start
+
+        pending = [asyncio.ensure_future(anext(s)) for s in streams]
+        await asyncio.sleep(0)
+        for task in pending:
+            task.cancel()  # what a client disconnect does
+        await asyncio.gather(*pending, return_exceptions=True)
+        return {
+            "open": n,
+            "bytes_per_stream": memory // n,
+            "delivered": sum(b"event: printer" in c for c in chunks),
+            "fanout_ms": round(fanout * 1000, 1),
+            "coalesce_window_ms": settings.EVENTS_COALESCE_WINDOW * 1000,
+            "still_subscribed": events.hub.count(),
+        }
+
+
+def _summary(start, statuses):
+    elapsed = time.perf_counter() - start
+    return {
+        "wall_s": round(elapsed, 3),
+        "requests_per_s": round(len(statuses) / elapsed, 1),
+        "statuses": dict(Counter(statuses)),
+    }
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_meshanalysis_productdocument_model_kind'),
+        ('core', '0003_alter_workspace_options_workspace_owner_and_more'),
+        ('orders', '0006_workspace_composite_indexes'),
+        ('production', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='filament',
+            name='filaments_workspa_5c93d7_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='filament',
+            name='filaments_materia_bfc8f9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='filament',
+            name='filaments_is_avai_200dfb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='printer',
+            name='printers_workspa_1427cc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='printer',
+            name='printers_status_24c88e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='printjob',
+            name='print_jobs_workspa_4bdbc2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='printjob',
+            name='print_jobs_status_4509dc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='printjob',
+            name='print_jobs_priorit_1bac25_idx',
+        ),
+        migrations.AddIndex(
+            model_name='filament',
+            index=models.Index(fields=['workspace', 'is_available'], name='filaments_workspa_62be1f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filament',
+            index=models.Index(fields=['workspace', 'material', 'color'], name='filaments_workspa_77b7ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printer',
+            index=models.Index(fields=['workspace', 'status'], name='printers_workspa_ff1016_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printjob',
+            index=models.Index(fields=['workspace', 'status', '-priority', 'created_at'], name='print_jobs_workspa_85fab9_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0002_workspace_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printer',
+            name='agent_token_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='agent_version',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='telemetry',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='PrinterTelemetry',
+            fields=[
+                ('telemetry_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('recorded_at', models.DateTimeField()),
+                ('nozzle_temp', models.FloatField(blank=True, null=True)),
+                ('bed_temp', models.FloatField(blank=True, null=True)),
+                ('progress', models.FloatField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_samples', to='production.printer')),
+            ],
+            options={
+                'db_table': 'printer_telemetry',
+                'indexes': [models.Index(fields=['printer', '-recorded_at'], name='printer_tel_printer_243401_idx'), models.Index(fields=['received_at'], name='printer_tel_receive_50e7c4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0003_printer_agent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilamentStockCheckpoint',
+            fields=[
+                ('checkpoint_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('as_of_transaction_id', models.BigIntegerField()),
+                ('balance_grams', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('total_in_grams', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('total_out_grams', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('transaction_count', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('filament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='production.filament')),
+            ],
+            options={
+                'db_table': 'filament_stock_checkpoints',
+                'ordering': ['filament', '-as_of_transaction_id'],
+                'constraints': [models.UniqueConstraint(fields=('filament', 'as_of_transaction_id'), name='uniq_filament_checkpoint')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FilamentTransactionArchive',
+            fields=[
+                ('archive_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('first_transaction_id', models.BigIntegerField()),
+                ('last_transaction_id', models.BigIntegerField()),
+                ('first_created_at', models.DateTimeField()),
+                ('last_created_at', models.DateTimeField()),
+                ('transaction_count', models.IntegerField()),
+                ('total_in_grams', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('total_out_grams', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('filament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='production.filament')),
+            ],
+            options={
+                'db_table': 'filament_transaction_archives',
+                'ordering': ['filament', 'first_transaction_id'],
+                'indexes': [models.Index(fields=['filament', 'first_transaction_id'], name='filament_tr_filamen_ab301a_idx')],
+            },
+        ),
+    ]
@@ -1,10 +1,15 @@
 from django.db import models
 
 # Create your models here.
+import json
+import zlib
 from decimal import Decimal
 from django.db import models
 from django.core.exceptions import ValidationError
 
+from core.events import ChangeTrackingMixin
+from core.managers import WorkspaceManager
+
 # ---- Printers ----
 
 class PrinterType(models.Model):
@@ -24,7 +29,7 @@ class PrinterType(models.Model):
         return self.type_name
 
 
-class Printer(models.Model):
+class Printer(ChangeTrackingMixin, models.Model):
     class Status(models.TextChoices):
         ONLINE = "online", "Online"
         OFFLINE = "offline", "Offline"
@@ -44,14 +49,23 @@ class Printer(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.OFFLINE)
     nozzle_temperature_max = models.IntegerField(default=300)
     bed_temperature_max = models.IntegerField(default=120)
+    # printer agent (production.agent): SHA-256 of its token, last check-in and telemetry
+    agent_token_hash = models.CharField(max_length=64, blank=True, editable=False)
+    agent_version = models.CharField(max_length=50, blank=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    telemetry = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = WorkspaceManager()
+    # pushed to event streams when they change (production.signals)
+    event_fields = ("status",)
+    str_related = ("printer_type",)
+
     class Meta:
         db_table = "printers"
         indexes = [
-            models.Index(fields=["workspace"]),
-            models.Index(fields=["status"]),
+            models.Index(fields=["workspace", "status"]),
             models.Index(fields=["printer_type"]),
         ]
 
@@ -59,6 +73,31 @@ class Printer(models.Model):
         return f"{self.machine_name} ({self.printer_type})"
 
 
+class PrinterTelemetry(models.Model):
+    """One sample uploaded by a printer agent."""
+    telemetry_id = models.BigAutoField(primary_key=True)
+    printer = models.ForeignKey(Printer, on_delete=models.CASCADE, related_name="telemetry_samples")
+    recorded_at = models.DateTimeField()
+    nozzle_temp = models.FloatField(null=True, blank=True)
+    bed_temp = models.FloatField(null=True, blank=True)
+    progress = models.FloatField(null=True, blank=True)  # percent of the current job
+    data = models.JSONField(default=dict, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    workspace_lookup = "printer__workspace"
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "printer_telemetry"
+        indexes = [
+            models.Index(fields=["printer", "-recorded_at"]),
+            models.Index(fields=["received_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.printer_id} @ {self.recorded_at:%Y-%m-%d %H:%M:%S}"
+
+
 # ---- Filament inventory ----
 
 class Filament(models.Model):
@@ -77,12 +116,14 @@ class Filament(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = WorkspaceManager()
+    str_related = ("material", "color")
+
     class Meta:
         db_table = "filaments"
         indexes = [
-            models.Index(fields=["workspace"]),
-            models.Index(fields=["material", "color"]),
-            models.Index(fields=["is_available"]),
+            models.Index(fields=["workspace", "is_available"]),
+            models.Index(fields=["workspace", "material", "color"]),
         ]
 
     def __str__(self):
@@ -110,6 +151,10 @@ class FilamentTransaction(models.Model):
 
     print_job = models.ForeignKey("production.PrintJob", on_delete=models.SET_NULL, null=True, blank=True)
 
+    workspace_lookup = "filament__workspace"
+    objects = WorkspaceManager()
+    str_related = ("filament__material", "filament__color")
+
     class Meta:
         db_table = "filament_transactions"
         indexes = [
@@ -125,9 +170,78 @@ class FilamentTransaction(models.Model):
         return f"{self.kind} {self.quantity_grams}g on {self.filament}"
 
 
+class FilamentStockCheckpoint(models.Model):
+    """A filament's stock as of ``as_of_transaction_id`` (that transaction included).
+
+    Stock is rebuilt from the latest checkpoint plus the transactions after
+    it (:mod:`production.stock`), so older transactions can be archived.
+    ``total_in`` / ``total_out`` are cumulative since the spool's first
+    transaction and keep the audit totals exact after archiving.
+    """
+
+    checkpoint_id = models.BigAutoField(primary_key=True)
+    filament = models.ForeignKey(Filament, on_delete=models.CASCADE, related_name="checkpoints")
+    as_of_transaction_id = models.BigIntegerField()
+    balance_grams = models.DecimalField(max_digits=14, decimal_places=3)
+    total_in_grams = models.DecimalField(max_digits=14, decimal_places=3)
+    total_out_grams = models.DecimalField(max_digits=14, decimal_places=3)
+    transaction_count = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    workspace_lookup = "filament__workspace"
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "filament_stock_checkpoints"
+        ordering = ["filament", "-as_of_transaction_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["filament", "as_of_transaction_id"], name="uniq_filament_checkpoint",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.filament_id}: {self.balance_grams}g as of #{self.as_of_transaction_id}"
+
+
+class FilamentTransactionArchive(models.Model):
+    """Archived filament transactions: one zlib-compressed JSON block per chunk.
+
+    Rows leave ``filament_transactions`` only behind a checkpoint covering
+    them; the per-chunk totals add up to that checkpoint's.
+    """
+
+    archive_id = models.BigAutoField(primary_key=True)
+    filament = models.ForeignKey(Filament, on_delete=models.CASCADE, related_name="archives")
+    first_transaction_id = models.BigIntegerField()
+    last_transaction_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    transaction_count = models.IntegerField()
+    total_in_grams = models.DecimalField(max_digits=14, decimal_places=3)
+    total_out_grams = models.DecimalField(max_digits=14, decimal_places=3)
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    workspace_lookup = "filament__workspace"
+    objects = WorkspaceManager()
+
+    class Meta:
+        db_table = "filament_transaction_archives"
+        ordering = ["filament", "first_transaction_id"]
+        indexes = [models.Index(fields=["filament", "first_transaction_id"])]
+
+    def __str__(self):
+        return f"{self.filament_id}: #{self.first_transaction_id}-#{self.last_transaction_id}"
+
+    def rows(self):
+        """The archived transactions as dicts (``quantity_grams`` etc. as strings)."""
+        return json.loads(zlib.decompress(bytes(self.data)))
+
+
 # ---- Print jobs (minimal) ----
 
-class PrintJob(models.Model):
+class PrintJob(ChangeTrackingMixin, models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
         QUEUED = "queued", "Queued"
@@ -160,12 +274,15 @@ class PrintJob(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = WorkspaceManager()
+    event_fields = ("status", "printer_id", "priority")
+    str_related = ("product", "order_item")
+
     class Meta:
         db_table = "print_jobs"
         indexes = [
-            models.Index(fields=["workspace"]),
-            models.Index(fields=["status"]),
-            models.Index(fields=["priority"]),
+            # serves the queue listing: workspace filter + default ordering
+            models.Index(fields=["workspace", "status", "-priority", "created_at"]),
             models.Index(fields=["printer"]),
         ]
         ordering = ["status", "-priority", "created_at"]
@@ -0,0 +1,69 @@
+from rest_framework import serializers
+
+from catalog.models import Product
+from core.api import BulkRelatedField
+from orders.models import OrderItem
+
+from .models import Filament, FilamentTransaction, Printer, PrintJob
+
+
+class PrinterSerializer(serializers.ModelSerializer):
+    printer_type = serializers.CharField(source="printer_type.type_name", read_only=True)
+
+    class Meta:
+        model = Printer
+        # connection credentials (printer_url, api_user, api_key) stay out of the API
+        fields = (
+            "printer_id", "machine_name", "printer_type", "connection_type", "location", "status",
+            "nozzle_temperature_max", "bed_temperature_max", "updated_at",
+        )
+
+
+class FilamentSerializer(serializers.ModelSerializer):
+    material = serializers.CharField(source="material.material_name", read_only=True)
+    color = serializers.CharField(source="color.color_name", read_only=True)
+    hex_value = serializers.CharField(source="color.hex_value", read_only=True)
+
+    class Meta:
+        model = Filament
+        fields = (
+            "filament_id", "filament_name", "filament_code", "material", "color", "hex_value",
+            "current_stock_grams", "safety_stock_grams", "reorder_point_grams", "location", "is_available",
+            "updated_at",
+        )
+
+
+class PrintJobSerializer(serializers.ModelSerializer):
+    order_number = serializers.CharField(source="order_item.order.order_number", read_only=True)
+    product_title = serializers.CharField(source="product.title", read_only=True)
+
+    class Meta:
+        model = PrintJob
+        fields = (
+            "print_job_id", "order_item", "order_number", "product", "product_title", "component_label",
+            "printer", "filament_used", "status", "priority", "estimated_print_time", "actual_print_time",
+            "material_used_grams", "start_time", "end_time", "created_at", "updated_at",
+        )
+
+
+class PrintJobWriteSerializer(serializers.ModelSerializer):
+    order_item = BulkRelatedField(queryset=OrderItem.objects.all())
+    product = BulkRelatedField(queryset=Product.objects.all())
+    printer = BulkRelatedField(queryset=Printer.objects.all(), allow_null=True, required=False)
+    filament_used = BulkRelatedField(queryset=Filament.objects.all(), allow_null=True, required=False)
+
+    class Meta:
+        model = PrintJob
+        fields = (
+            "order_item", "product", "component_label", "printer", "filament_used", "status", "priority",
+            "estimated_print_time", "notes",
+        )
+
+
+class FilamentTransactionWriteSerializer(serializers.ModelSerializer):
+    filament = BulkRelatedField(queryset=Filament.objects.all())
+    print_job = BulkRelatedField(queryset=PrintJob.objects.all(), allow_null=True, required=False)
+
+    class Meta:
+        model = FilamentTransaction
+        fields = ("filament", "kind", "quantity_grams", "reason", "notes", "print_job")
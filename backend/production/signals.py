@@ -1,12 +1,60 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import FilamentTransaction
+
+from core.events import publish_changes
+from core.response_cache import track_changes
+from integrations import outbox
+
+from . import stock
+from .models import Filament, FilamentTransaction, Printer, PrinterType, PrintJob
 
 @receiver([post_save, post_delete], sender=FilamentTransaction)
-def update_filament_stock(sender, instance, **kwargs):
-    f = instance.filament
-    # recompute from scratch to stay consistent
-    total_in = f.transactions.filter(kind__in=["in","adjustment"]).aggregate(s=models.Sum("quantity_grams"))["s"] or 0
-    total_out = f.transactions.filter(kind__in=["out","waste"]).aggregate(s=models.Sum("quantity_grams"))["s"] or 0
-    f.current_stock_grams = total_in - total_out
+def update_filament_stock(sender, instance, using=None, created=False, **kwargs):
+    if not created:
+        # an edit or delete changes history the checkpoints already counted
+        stock.invalidate(instance.filament_id, instance.pk, using)
+    refresh_stock(instance.filament, using)
+
+
+def refresh_stock(f, using):
+    before = f.current_stock_grams
+    # recompute from the latest checkpoint to stay consistent
+    f.current_stock_grams = stock.current_stock(f, using)
     f.save(update_fields=["current_stock_grams", "updated_at"])
+    if before >= f.reorder_point_grams > f.current_stock_grams:
+        outbox.record(f.workspace_id, "filament.below_reorder_point", f, {
+            "filament_id": f.pk,
+            "current_stock_grams": f.current_stock_grams,
+            "reorder_point_grams": f.reorder_point_grams,
+        })
+
+
+@receiver(post_save, sender=PrintJob)
+def record_job_completed(sender, instance, **kwargs):
+    if instance.status != PrintJob.Status.COMPLETED:
+        return
+    if instance.previous_event_state().get("status") == PrintJob.Status.COMPLETED:
+        return
+    outbox.record(instance.workspace_id, "print_job.completed", instance, job_completed_payload(instance))
+
+
+def job_completed_payload(job):
+    return {
+        "print_job_id": job.pk,
+        "order_item_id": job.order_item_id,
+        "product_id": job.product_id,
+        "printer_id": job.printer_id,
+        "material_used_grams": job.material_used_grams,
+        "actual_print_time": job.actual_print_time,
+        "end_time": job.end_time,
+    }
+
+
+track_changes(Printer, "printers")
+track_changes(Filament, "filaments")
+track_changes(PrintJob, "print_jobs")
+track_changes(PrinterType, "reference")
+
+# shop-floor screens (production.agent.event_stream)
+publish_changes(Printer, "printer")
+publish_changes(PrintJob, "job")
@@ -0,0 +1,184 @@
+"""Filament stock from checkpoints, and archiving of old transactions.
+
+A spool's stock is its latest :class:`~production.models.FilamentStockCheckpoint`
+plus the transactions after it, so a rebuild reads only recent history.
+Checkpoints are taken every ``FILAMENT_CHECKPOINT_EVERY`` transactions and
+before archiving; editing or deleting a transaction drops the checkpoints
+that already counted it.
+
+:func:`archive` moves transactions older than ``FILAMENT_ARCHIVE_MONTHS``
+into zlib-compressed blocks in ``filament_transaction_archives``. It
+checkpoints exactly at the last archived transaction and writes that
+checkpoint and every block in one transaction, holding the checkpoint's row
+lock, so an edit cannot drop it halfway through. :func:`invalidate` never
+drops checkpoints inside the archived range either (no live transaction is
+counted by them any more): the audit totals (grams in / out, transaction
+count) stay exact.
+"""
+import json
+import zlib
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Filament, FilamentStockCheckpoint, FilamentTransaction, FilamentTransactionArchive
+
+IN_KINDS = (FilamentTransaction.Kind.IN, FilamentTransaction.Kind.ADJUSTMENT)
+OUT_KINDS = (FilamentTransaction.Kind.OUT, FilamentTransaction.Kind.WASTE)
+
+ARCHIVED_FIELDS = (
+    "transaction_id", "kind", "quantity_grams", "previous_stock", "new_stock",
+    "reason", "notes", "created_by", "created_at", "print_job_id",
+)
+
+
+def _totals(transactions):
+    return transactions.aggregate(
+        total_in=Coalesce(Sum("quantity_grams", filter=Q(kind__in=IN_KINDS)), Decimal(0)),
+        total_out=Coalesce(Sum("quantity_grams", filter=Q(kind__in=OUT_KINDS)), Decimal(0)),
+        count=Count("pk"),
+        last_id=Max("pk"),
+    )
+
+
+def latest_checkpoint(filament, using, upto_id=None):
+    checkpoints = FilamentStockCheckpoint.objects.using(using).filter(filament=filament)
+    if upto_id is not None:
+        checkpoints = checkpoints.filter(as_of_transaction_id__lte=upto_id)
+    return checkpoints.order_by("-as_of_transaction_id").first()
+
+
+def current_stock(filament, using):
+    """Stock of ``filament``: latest checkpoint plus the transactions after it (two queries)."""
+    base = latest_checkpoint(filament, using)
+    recent = FilamentTransaction.objects.using(using).filter(filament=filament)
+    if base is not None:
+        recent = recent.filter(pk__gt=base.as_of_transaction_id)
+    totals = _totals(recent)
+    start = base.balance_grams if base is not None else 0
+    return start + totals["total_in"] - totals["total_out"]
+
+
+def checkpoint(filament, using, upto_id=None):
+    """Checkpoint ``filament`` at ``upto_id`` (default: its last transaction); ``None`` if nothing is new."""
+    base = latest_checkpoint(filament, using, upto_id)
+    transactions = FilamentTransaction.objects.using(using).filter(filament=filament)
+    if base is not None:
+        if base.as_of_transaction_id == upto_id:
+            return base
+        transactions = transactions.filter(pk__gt=base.as_of_transaction_id)
+    if upto_id is not None:
+        transactions = transactions.filter(pk__lte=upto_id)
+    totals = _totals(transactions)
+    if not totals["count"]:
+        return base
+    total_in = (base.total_in_grams if base else 0) + totals["total_in"]
+    total_out = (base.total_out_grams if base else 0) + totals["total_out"]
+    obj, _ = FilamentStockCheckpoint.objects.using(using).get_or_create(
+        filament=filament, as_of_transaction_id=upto_id or totals["last_id"],
+        defaults={
+            "balance_grams": total_in - total_out,
+            "total_in_grams": total_in,
+            "total_out_grams": total_out,
+            "transaction_count": (base.transaction_count if base else 0) + totals["count"],
+        },
+    )
+    return obj
+
+
+def invalidate(filament_id, transaction_id, using):
+    """Drop checkpoints that counted ``transaction_id`` before it was edited or deleted.
+
+    Checkpoints at or below the last archived transaction stay: the archived
+    rows they sum up are gone, so nothing could rebuild them.
+    """
+    archived = FilamentTransactionArchive.objects.using(using).filter(filament_id=filament_id).aggregate(
+        last=Max("last_transaction_id")
+    )["last"] or 0
+    FilamentStockCheckpoint.objects.using(using).filter(
+        filament_id=filament_id, as_of_transaction_id__gte=max(transaction_id, archived + 1)
+    ).delete()
+
+
+def checkpoint_busy(using, every):
+    """Checkpoint filaments with at least ``every`` transactions since their last checkpoint."""
+    last = FilamentStockCheckpoint.objects.filter(filament=OuterRef("pk")).order_by("-as_of_transaction_id")
+    busy = (
+        Filament.objects.using(using)
+        .annotate(last_checkpoint=Coalesce(Subquery(last.values("as_of_transaction_id")[:1]), 0))
+        .annotate(since=Count("transactions", filter=Q(transactions__pk__gt=F("last_checkpoint"))))
+        .filter(since__gte=every)
+    )
+    return sum(checkpoint(filament, using) is not None for filament in busy.only("pk"))
+
+
+def archive(filament, before, using, chunk_size=5000):
+    """Move ``filament``'s transactions created before ``before`` to the archive; returns how many."""
+    boundary = (
+        FilamentTransaction.objects.using(using)
+        .filter(filament=filament, created_at__lt=before)
+        .aggregate(last=Max("pk"))["last"]
+    )
+    if boundary is None:
+        return 0
+
+    moved = 0
+    # one transaction: the checkpoint is never committed without the blocks it
+    # covers, and its row lock holds off a concurrent invalidate() until the end
+    with transaction.atomic(using=using):
+        base = checkpoint(filament, using, upto_id=boundary)
+        FilamentStockCheckpoint.objects.using(using).select_for_update().filter(pk=base.pk).first()
+        while True:
+            # chunks keep memory bounded; each becomes one archive block
+            rows = list(
+                FilamentTransaction.objects.using(using)
+                .filter(filament=filament, pk__lte=boundary)
+                .order_by("pk")
+                .values(*ARCHIVED_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                return moved
+            FilamentTransactionArchive.objects.using(using).create(
+                filament=filament,
+                first_transaction_id=rows[0]["transaction_id"],
+                last_transaction_id=rows[-1]["transaction_id"],
+                first_created_at=min(row["created_at"] for row in rows),
+                last_created_at=max(row["created_at"] for row in rows),
+                transaction_count=len(rows),
+                total_in_grams=sum(r["quantity_grams"] for r in rows if r["kind"] in IN_KINDS),
+                total_out_grams=sum(r["quantity_grams"] for r in rows if r["kind"] in OUT_KINDS),
+                data=zlib.compress(json.dumps(rows, cls=DjangoJSONEncoder).encode()),
+            )
+            # no per-row signals: the stock is unchanged, the checkpoint covers these rows
+            FilamentTransaction.objects.using(using).filter(
+                pk__in=[row["transaction_id"] for row in rows]
+            )._raw_delete(using)
+            moved += len(rows)
+
+
+def months_before(moment, months):
+    month = moment.month - months
+    year = moment.year + (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    # clamp to the last day of a shorter month
+    day = moment.day
+    while True:
+        try:
+            return moment.replace(year=year, month=month, day=day)
+        except ValueError:
+            day -= 1
+
+
+def compact(using, months, every):
+    """Checkpoint busy filaments and archive transactions older than ``months`` on ``using``."""
+    before = months_before(timezone.now(), months)
+    checkpoints = checkpoint_busy(using, every)
+    old = FilamentTransaction.objects.using(using).filter(created_at__lt=before)
+    archived = 0
+    for filament in Filament.objects.using(using).filter(pk__in=old.values("filament_id")).only("pk"):
+        archived += archive(filament, before, using)
+    return {"checkpoints": checkpoints, "archived": archived}
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from core.sharding import shards
+
+from . import stock
+from .models import PrinterTelemetry
+
+
+@shared_task
+def prune_printer_telemetry(days=None):
+    days = days if days is not None else settings.TELEMETRY_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    for alias in ["default", *shards()]:
+        deleted += PrinterTelemetry.objects.using(alias).filter(received_at__lt=cutoff)._raw_delete(alias)
+    return deleted
+
+
+@shared_task
+def compact_filament_transactions(months=None):
+    """Checkpoint busy spools and archive transactions older than ``FILAMENT_ARCHIVE_MONTHS``."""
+    months = months if months is not None else settings.FILAMENT_ARCHIVE_MONTHS
+    totals = {"checkpoints": 0, "archived": 0}
+    for alias in ["default", *shards()]:
+        result = stock.compact(alias, months, settings.FILAMENT_CHECKPOINT_EVERY)
+        for key in totals:
+            totals[key] += result[key]
+    return totals
@@ -1,3 +1,351 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authapp.serializers import WorkspaceTokenObtainPairSerializer
+from catalog.models import Color, Material, Product
+from core import events
+from core.models import Membership, Workspace
+from core.response_cache import bump_resource_version
+from integrations.models import OutboxEvent
+from orders.models import Customer, Order, OrderItem, OrderStatus
+from users.models import User
+
+from . import dashboard, stock
+from .agent import issue_agent_token
+from .models import (
+    Filament, FilamentStockCheckpoint, FilamentTransaction, FilamentTransactionArchive, Printer, PrinterTelemetry,
+    PrinterType, PrintJob,
+)
+
+
+@override_settings(LONGPOLL_TICK=0.05)
+class AgentApiTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="farm@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Print farm", owner=owner)
+        self.printer = Printer.objects.create(
+            workspace=self.workspace, machine_name="P1", printer_type=PrinterType.objects.create(type_name="MK4")
+        )
+        self.token = issue_agent_token(self.printer)
+        self.agent = AsyncClient()
+
+    def call(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Agent {token or self.token}"}
+        if method == "get":
+            return self.agent.get(path, headers=headers)
+        return self.agent.post(path, json.dumps(body or {}), content_type="application/json", headers=headers)
+
+    def make_job(self, status):
+        product = Product.objects.create(workspace=self.workspace, sku=f"SKU-{status}", title="Clip")
+        order = Order.objects.create(
+            workspace=self.workspace, order_number=status,
+            customer=Customer.objects.create(workspace=self.workspace, name=status),
+            status=OrderStatus.objects.get_or_create(status_name="Paid")[0],
+        )
+        item = OrderItem.objects.create(order=order, product=product, quantity=1)
+        return PrintJob.objects.create(
+            workspace=self.workspace, order_item=item, product=product, printer=self.printer, status=status
+        )
+
+    async def test_check_in_and_telemetry(self):
+        response = await self.call("post", "/api/agent/check-in/", {"status": "online", "agent_version": "1.2"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "online")
+        forged = await self.call("post", "/api/agent/check-in/", token=f"{self.token[:-2]}xx")
+        self.assertEqual(forged.status_code, 401)
+
+        samples = [{"recorded_at": f"2024-05-01T08:00:0{n}Z", "nozzle_temp": 215, "progress": n * 10, "fan": 80}
+                   for n in range(3)]
+        response = await self.call("post", "/api/agent/telemetry/", {"samples": samples})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(await PrinterTelemetry.objects.filter(printer=self.printer).acount(), 3)
+        printer = await Printer.objects.aget(pk=self.printer.pk)
+        self.assertEqual((printer.status, printer.agent_version), ("online", "1.2"))
+        self.assertEqual(printer.telemetry["progress"], 20)
+
+    async def test_next_job_long_poll_wakes_on_change(self):
+        self.assertEqual((await self.call("get", "/api/agent/jobs/next/")).status_code, 204)
+        job = await sync_to_async(self.make_job)(PrintJob.Status.PENDING)
+
+        async def queue_later():
+            await asyncio.sleep(0.2)
+            await PrintJob.objects.filter(pk=job.pk).aupdate(status=PrintJob.Status.QUEUED)
+            await sync_to_async(bump_resource_version)(self.workspace.pk, "print_jobs")
+
+        poll, _ = await asyncio.gather(self.call("get", "/api/agent/jobs/next/?wait=5"), queue_later())
+        self.assertEqual(poll.status_code, 200)
+        self.assertEqual(poll.json()["print_job_id"], job.pk)
+
+
+@override_settings(EVENTS_COALESCE_WINDOW=0.05, EVENTS_HEARTBEAT=0.2)
+class EventStreamTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="floor@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Shop floor", owner=owner)
+        Membership.objects.create(user=owner, workspace=self.workspace, role=Membership.OWNER)
+        self.token = WorkspaceTokenObtainPairSerializer.get_token(owner).access_token
+        self.printer = Printer.objects.create(
+            workspace=self.workspace, machine_name="P1", printer_type=PrinterType.objects.create(type_name="MK4")
+        )
+
+    def change_printer(self, *statuses):
+        printer = Printer.objects.get(pk=self.printer.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            printer.machine_name = "P1 renamed"  # not pushed on its own
+            printer.save()
+            for status in statuses:
+                printer.status = status
+                printer.save()
+
+    async def test_stream_pushes_coalesced_deltas(self):
+        path = f"/api/events/?workspace={self.workspace.pk}"
+        self.assertEqual((await self.async_client.get(path)).status_code, 401)
+        response = await self.async_client.get(f"{path}&token={self.token}")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertIn(b"event: ready", await anext(stream))
+
+        await sync_to_async(self.change_printer)(Printer.Status.ONLINE, Printer.Status.PRINTING)
+        chunk = (await anext(stream)).decode()
+        # two status changes of one printer arrive as one event with the latest state
+        self.assertEqual(chunk.count("event: printer"), 1)
+        self.assertIn(f'data: {{"id":{self.printer.pk},"status":"printing"}}', chunk)
+
+        self.assertEqual(await anext(stream), b": keepalive\n\n")
+        await sync_to_async(self.change_printer)()
+        self.assertEqual(await anext(stream), b": keepalive\n\n")
+        # a client disconnect cancels the pending read; the subscription goes with it
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(events.hub.count(), 0)
+
+    async def test_overflow_asks_for_resync(self):
+        subscription = events.subscribe(self.workspace.pk)
+        with override_settings(EVENTS_MAX_PENDING=2):
+            events.publish(self.workspace.pk, [{"type": "job", "id": n, "status": "queued"} for n in range(3)])
+            await asyncio.sleep(0)
+            self.assertEqual(await subscription.get(1), ([], True))
+        events.publish(self.workspace.pk + 1, [{"type": "job", "id": 1}])
+        self.assertEqual(await subscription.get(0.1), ([], False))
+        subscription.close()
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="board@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Dashboard farm", owner=owner)
+        Membership.objects.create(user=owner, workspace=self.workspace, role=Membership.OWNER)
+        token = WorkspaceTokenObtainPairSerializer.get_token(owner).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_WORKSPACE_ID=str(self.workspace.pk))
+
+        printer_type = PrinterType.objects.create(type_name="MK4")
+        for name, status in [("P1", "printing"), ("P2", "printing"), ("P3", "error")]:
+            Printer.objects.create(workspace=self.workspace, machine_name=name, printer_type=printer_type, status=status)
+        material = Material.objects.create(workspace=self.workspace, material_name="PLA")
+        color = Color.objects.create(workspace=self.workspace, color_name="Black")
+        for name, stock in [("Low", 200), ("Plenty", 5000)]:
+            Filament.objects.create(
+                workspace=self.workspace, material=material, color=color, filament_name=name,
+                current_stock_grams=Decimal(stock),
+            )
+
+        customer = Customer.objects.create(workspace=self.workspace, name="Ada")
+        paid = OrderStatus.objects.create(status_name="Paid")
+        product = Product.objects.create(workspace=self.workspace, sku="CLIP", title="Clip")
+        for number, total, currency, paid_at in [
+            ("1", "10.00", "EUR", timezone.now()), ("2", "5.50", "EUR", timezone.now()),
+            ("3", "30.00", "TND", timezone.now()), ("4", "99.00", "EUR", None),
+        ]:
+            order = Order.objects.create(
+                workspace=self.workspace, order_number=number, customer=customer, status=paid,
+                total_cost=Decimal(total), currency=currency, paid_at=paid_at, totals_locked=True,
+            )
+            item = OrderItem.objects.create(order=order, product=product, quantity=1)
+            for status, minutes in [("queued", 90), ("printing", 60), ("completed", 45)]:
+                PrintJob.objects.create(
+                    workspace=self.workspace, order_item=item, product=product, status=status,
+                    estimated_print_time=minutes,
+                )
+
+    def test_summary_query_budget(self):
+        # one conditional-aggregate query per table
+        with self.assertNumQueries(4):
+            data = dashboard.summary(self.workspace.pk)
+        self.assertEqual(data["jobs"]["queued"], 4)
+        self.assertEqual(data["jobs"]["completed"], 4)
+        self.assertEqual(data["jobs"]["failed"], 0)
+        self.assertEqual(data["queue_hours"], 10.0)
+        self.assertEqual((data["printers"]["printing"], data["printers"]["error"]), (2, 1))
+        self.assertEqual([f["filament_name"] for f in data["filaments_below_reorder_point"]], ["Low"])
+        self.assertEqual(data["paid_today"]["orders"], 3)
+        self.assertEqual(data["paid_today"]["revenue"], [
+            {"currency": "EUR", "amount": Decimal("15.50")}, {"currency": "TND", "amount": Decimal("30.00")},
+        ])
+
+    def test_endpoint_is_cached_per_workspace(self):
+        cache.delete(f"dashboard:{self.workspace.pk}")
+        first = self.client.get("/api/dashboard/")
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/dashboard/")
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(self.client.get("/api/dashboard/", HTTP_X_WORKSPACE_ID="0").status_code, 403)
+
+
+class FilamentStockTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="spool@example.com", password="x", is_staff=True, is_superuser=True)
+        self.owner = owner
+        workspace = Workspace.objects.create(name="Spools", owner=owner)
+        self.filament = Filament.objects.create(
+            workspace=workspace, filament_name="PLA black",
+            material=Material.objects.create(workspace=workspace, material_name="PLA"),
+            color=Color.objects.create(workspace=workspace, color_name="Black"),
+        )
+
+    def move(self, kind, grams, age_days=0):
+        tx = FilamentTransaction.objects.create(filament=self.filament, kind=kind, quantity_grams=Decimal(grams))
+        if age_days:
+            FilamentTransaction.objects.filter(pk=tx.pk).update(created_at=timezone.now() - timedelta(days=age_days))
+        return tx
+
+    def stock(self):
+        self.filament.refresh_from_db()
+        return self.filament.current_stock_grams
+
+    def test_rebuild_starts_from_checkpoint(self):
+        first = self.move("in", 1000)
+        self.move("out", 150)
+        stock.checkpoint(self.filament, "default")
+        self.move("waste", 20)
+        self.assertEqual(self.stock(), Decimal("830"))
+        with self.assertNumQueries(2):
+            self.assertEqual(stock.current_stock(self.filament, "default"), Decimal("830"))
+
+        # editing counted history drops the checkpoint instead of going stale
+        first.quantity_grams = Decimal(2000)
+        first.save()
+        self.assertFalse(FilamentStockCheckpoint.objects.exists())
+        self.assertEqual(self.stock(), Decimal("1830"))
+
+    def test_compaction_archives_old_history_with_exact_totals(self):
+        for _ in range(3):
+            self.move("in", 1000, age_days=500)
+            self.move("out", 300, age_days=500)
+        self.move("adjustment", 50, age_days=30)
+        recent = self.move("out", 25)
+
+        result = stock.compact("default", months=12, every=2)
+        self.assertEqual(result["archived"], 6)
+        self.assertEqual(list(FilamentTransaction.objects.values_list("kind", flat=True).order_by("pk")),
+                         ["adjustment", "out"])
+        archive = FilamentTransactionArchive.objects.get()
+        self.assertEqual((archive.transaction_count, archive.total_in_grams, archive.total_out_grams),
+                         (6, Decimal(3000), Decimal(900)))
+        self.assertEqual([r["kind"] for r in archive.rows()][:2], ["in", "out"])
+
+        latest = stock.latest_checkpoint(self.filament, "default")
+        self.assertEqual((latest.total_in_grams, latest.total_out_grams, latest.transaction_count),
+                         (Decimal(3050), Decimal(925), 8))
+        self.assertEqual(self.stock(), Decimal(2125))
+        # a live transaction edited after compaction still rebuilds on top of the archive
+        recent.delete()
+        self.assertEqual(self.stock(), Decimal(2150))
+
+    def test_archived_checkpoints_are_never_invalidated(self):
+        old = [self.move("in", 100, age_days=500) for _ in range(5)]
+        recent = self.move("out", 30)
+        self.assertEqual(stock.archive(self.filament, timezone.now() - timedelta(days=400), "default", chunk_size=2), 5)
+        self.assertEqual(FilamentTransactionArchive.objects.count(), 3)
+        boundary = stock.latest_checkpoint(self.filament, "default")
+        self.assertEqual(boundary.as_of_transaction_id, old[-1].pk)
+
+        # a late invalidation reaching into the archived range (an edit racing
+        # the archive) keeps the checkpoint the archive relies on
+        stock.invalidate(self.filament.pk, old[1].pk, "default")
+        self.assertTrue(FilamentStockCheckpoint.objects.filter(pk=boundary.pk).exists())
+        self.assertEqual(stock.current_stock(self.filament, "default"), Decimal(470))
+
+        # checkpoints above the archive still go
+        later = stock.checkpoint(self.filament, "default")
+        stock.invalidate(self.filament.pk, recent.pk, "default")
+        self.assertFalse(FilamentStockCheckpoint.objects.filter(pk=later.pk).exists())
+        self.assertEqual(stock.current_stock(self.filament, "default"), Decimal(470))
+
+    @override_settings(ADMIN_INLINE_MAX_ROWS=5)
+    def test_admin_inline_shows_newest_page(self):
+        for n in range(12):
+            self.move("in", n + 1)
+        self.client.force_login(self.owner)
+        response = self.client.get(f"/admin/production/filament/{self.filament.pk}/change/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["inline_admin_formsets"][0].formset.initial_form_count(), 5)
+        self.assertContains(response, f"?filament={self.filament.pk}")
+        history = self.client.get(f"/admin/production/filamenttransaction/?filament={self.filament.pk}")
+        self.assertEqual(history.context["cl"].result_count, 12)
+
+
+class BulkWriteTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="pallet@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Pallet farm", owner=owner)
+        Membership.objects.create(user=owner, workspace=self.workspace, role=Membership.OPERATOR)
+        token = WorkspaceTokenObtainPairSerializer.get_token(owner).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_WORKSPACE_ID=str(self.workspace.pk))
+        material = Material.objects.create(workspace=self.workspace, material_name="PETG")
+        color = Color.objects.create(workspace=self.workspace, color_name="Blue")
+        self.filaments = [
+            Filament.objects.create(
+                workspace=self.workspace, material=material, color=color, filament_name=f"Spool {n}",
+                reorder_point_grams=Decimal(500),
+            )
+            for n in range(2)
+        ]
+
+    def test_pallet_of_spools_rebuilds_stock_once_per_spool(self):
+        items = [{"filament": f.pk, "kind": "in", "quantity_grams": "1000"} for f in self.filaments for _ in range(5)]
+        items.append({"filament": self.filaments[0].pk, "kind": "out", "quantity_grams": "4600"})
+        response = self.client.post("/api/filament-transactions/bulk/", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 11)
+        stocks = [Filament.objects.get(pk=f.pk).current_stock_grams for f in self.filaments]
+        self.assertEqual(stocks, [Decimal(400), Decimal(5000)])
+        self.assertEqual(set(FilamentTransaction.objects.values_list("created_by", flat=True)), {"pallet@example.com"})
+
+    def test_jobs_are_queued_with_their_events(self):
+        customer = Customer.objects.create(workspace=self.workspace, name="Ada")
+        order = Order.objects.create(
+            workspace=self.workspace, order_number="1", customer=customer,
+            status=OrderStatus.objects.create(status_name="Open"),
+        )
+        product = Product.objects.create(workspace=self.workspace, sku="BOX", title="Box")
+        item = OrderItem.objects.create(order=order, product=product, quantity=3)
+        items = [
+            {"order_item": item.pk, "product": product.pk, "filament_used": self.filaments[0].pk,
+             "status": status, "priority": 2}
+            for status in ("queued", "queued", "completed")
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/print-jobs/bulk/", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(PrintJob.objects.filter(workspace=self.workspace).count(), 3)
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list("event_type", flat=True)), ["print_job.completed"]
+        )
+
+        items[0]["priority"] = 0
+        response = self.client.post("/api/print-jobs/bulk/", {"mode": "partial", "items": items[:2]}, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertIn("priority", response.data["results"][0]["errors"])
+        self.assertEqual(PrintJob.objects.count(), 4)
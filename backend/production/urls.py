@@ -0,0 +1,26 @@
+from django.urls import path
+from rest_framework.routers import SimpleRouter
+
+from . import agent
+from .views import (
+    DashboardView, FilamentTransactionBulkView, FilamentViewSet, PrinterViewSet, PrintJobBulkView, PrintJobViewSet,
+)
+
+router = SimpleRouter()
+router.register("printers", PrinterViewSet, basename="printer")
+router.register("filaments", FilamentViewSet, basename="filament")
+router.register("print-jobs", PrintJobViewSet, basename="print-job")
+
+urlpatterns = [
+    # async views (production.agent); serve them through backend.asgi
+    path("agent/check-in/", agent.check_in, name="agent-check-in"),
+    path("agent/telemetry/", agent.upload_telemetry, name="agent-telemetry"),
+    path("agent/jobs/next/", agent.next_job, name="agent-next-job"),
+    path("print-jobs/<int:pk>/status/", agent.job_status, name="print-job-status"),
+    path("events/", agent.event_stream, name="event-stream"),
+    path("dashboard/", DashboardView.as_view(), name="dashboard"),
+    # before the router, whose detail routes would take "bulk" for a pk
+    path("print-jobs/bulk/", PrintJobBulkView.as_view(), name="print-job-bulk"),
+    path("filament-transactions/bulk/", FilamentTransactionBulkView.as_view(), name="filament-transaction-bulk"),
+    *router.urls,
+]
@@ -1,3 +1,85 @@
-from django.shortcuts import render
+from django.db import transaction
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from authapp.authentication import StatelessJWTAuthentication
+from core.api import BulkCreateView, WorkspaceReadOnlyViewSet
+from core.events import publish
+from core.permissions import IsWorkspaceMember
+from core.response_cache import bump_resource_version
+from integrations import outbox
+
+from . import dashboard
+from .models import Filament, FilamentTransaction, Printer, PrintJob
+from .serializers import (
+    FilamentSerializer, FilamentTransactionWriteSerializer, PrinterSerializer, PrintJobSerializer,
+    PrintJobWriteSerializer,
+)
+from .signals import job_completed_payload, refresh_stock
+
+
+class PrinterViewSet(WorkspaceReadOnlyViewSet):
+    queryset = Printer.objects.select_related("printer_type").order_by("machine_name")
+    serializer_class = PrinterSerializer
+    cache_resources = ("printers", "reference")
+    filter_fields = ("status",)
+
+
+class FilamentViewSet(WorkspaceReadOnlyViewSet):
+    queryset = Filament.objects.select_related("material", "color").order_by("filament_name", "pk")
+    serializer_class = FilamentSerializer
+    cache_resources = ("filaments", "catalog")
+
+
+class PrintJobViewSet(WorkspaceReadOnlyViewSet):
+    queryset = PrintJob.objects.select_related("product", "order_item__order")
+    serializer_class = PrintJobSerializer
+    # order numbers and product titles
+    cache_resources = ("print_jobs", "orders", "catalog")
+    filter_fields = ("status",)
+
+
+class DashboardView(APIView):
+    """Floor summary of the selected workspace (see :mod:`production.dashboard`)."""
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated, IsWorkspaceMember]
+
+    def get(self, request):
+        return Response(dashboard.cached_summary(self.workspace_id))
+
+
+class PrintJobBulkView(BulkCreateView):
+    """Queue many jobs at once; events and cache invalidation are sent once for the batch."""
+    serializer_class = PrintJobWriteSerializer
+
+    def build(self, validated_data):
+        return PrintJob(workspace_id=self.workspace_id, **validated_data)
+
+    def after_create(self, jobs):
+        workspace_id = self.workspace_id
+        outbox.record_many(workspace_id, [
+            outbox.event(workspace_id, "print_job.completed", job, job_completed_payload(job))
+            for job in jobs if job.status == PrintJob.Status.COMPLETED
+        ])
+        events = [{"type": "job", "id": job.pk, **job.event_state()} for job in jobs]
+
+        def run():
+            bump_resource_version(workspace_id, "print_jobs")
+            publish(workspace_id, events)
+
+        transaction.on_commit(run, using=self.get_queryset().db)
+
+
+class FilamentTransactionBulkView(BulkCreateView):
+    """Book many stock movements at once; each affected spool's stock is rebuilt once."""
+    serializer_class = FilamentTransactionWriteSerializer
+
+    def build(self, validated_data):
+        created_by = (getattr(self.request.user, "email", None) or "")[:100]
+        return FilamentTransaction(created_by=created_by, **validated_data)
+
+    def after_create(self, transactions):
+        using = self.get_queryset().db
+        for filament in {t.filament_id: t.filament for t in transactions}.values():
+            refresh_stock(filament, using)